@@ -0,0 +1,282 @@
+"""
+Controle de admissão do POST /mcp e GET /mcp.
+
+Sob pico, aceitar tudo só enfileira trabalho sem limite e a latência de todo
+mundo explode. Aqui ficam as peças que recusam cedo (e barato):
+
+- RateLimiter: token buckets global e por sessão (ou por endereço do
+  cliente, antes do initialize). Estourou: 429 com Retry-After.
+- AdmissionController: limita os requests em execução; os excedentes esperam
+  em uma fila limitada, com prioridade (métodos baratos como tools/list
+  passam na frente de tools/call). Fila cheia ou espera longa demais: 503.
+  Um request que responde em stream (SSE) segura a vaga até o stream
+  terminar (HeldStream), não só até o handler devolver o stream.
+- StreamCounter: conta os streams SSE abertos (GET /mcp e respostas SSE de
+  POST), para limitá-los.
+- BodyBudget: limita os bytes de corpos de POST sendo lidos ao mesmo tempo,
+  para que muitos uploads grandes simultâneos não estourem a memória.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class Rejected(Exception):
+    """
+    Request recusado: status HTTP (429 ou 503) e segundos para tentar de novo.
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after: float) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, n: float = 1.0) -> float:
+        """
+        Consome n tokens. Devolve 0 se conseguiu, ou quantos segundos faltam
+        para ter n tokens (sem consumir nada).
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        n = min(n, self.burst)
+        if self.tokens >= n:
+            self.tokens -= n
+            return 0.0
+        return (n - self.tokens) / self.rate
+
+    def refund(self, n: float = 1.0) -> None:
+        self.tokens = min(self.burst, self.tokens + n)
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        rate: float = 0.0,
+        burst: float = 0.0,
+        session_rate: float = 0.0,
+        session_burst: float = 0.0,
+        max_buckets: int = 10_000,
+    ) -> None:
+        """
+        rate / session_rate em requests por segundo (0 desliga); burst é
+        quantos podem chegar de uma vez (padrão: um segundo de rate).
+        """
+        self.session_rate = session_rate
+        self.session_burst = session_burst or session_rate
+        self.max_buckets = max_buckets
+        self._global = TokenBucket(rate, burst or rate) if rate > 0 else None
+        # Buckets por sessão, em ordem de uso: os mais antigos são descartados
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self.limited = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._global is not None or self.session_rate > 0
+
+    def _bucket(self, key: Hashable) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.session_rate, self.session_burst)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def check(self, key: Hashable, n: int = 1) -> None:
+        """
+        Consome n requests da sessão key e do limite global, ou levanta
+        Rejected (429) sem consumir nada.
+        """
+        bucket = self._bucket(key) if self.session_rate > 0 else None
+        wait = bucket.take(n) if bucket is not None else 0.0
+        if not wait and self._global is not None:
+            wait = self._global.take(n)
+            if wait and bucket is not None:
+                bucket.refund(n)
+        if wait:
+            self.limited += 1
+            raise Rejected("Rate limit exceeded", 429, wait)
+
+    def forget(self, key: Hashable) -> None:
+        self._buckets.pop(key, None)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_in_flight: int = 0,
+        max_queued: int = 1024,
+        queue_timeout: float = 10.0,
+        retry_after: float = 1.0,
+    ) -> None:
+        """
+        max_in_flight: requests executando ao mesmo tempo (0: sem limite).
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.queued = 0
+        # Heap de (prioridade, ordem de chegada, future): menor sai primeiro
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self.rejected = 0
+
+    async def acquire(self, priority: int = 0) -> None:
+        """
+        Espera uma vaga (prioridade menor passa na frente) ou levanta
+        Rejected (503). Quem consegue a vaga precisa chamar release().
+        """
+        if not self.max_in_flight or (self.in_flight < self.max_in_flight and not self.queued):
+            self.in_flight += 1
+            return
+        if self.queued >= self.max_queued:
+            self.rejected += 1
+            raise Rejected("Server overloaded", 503, self.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), waiter))
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as exc:
+            # Desistiu depois de já ter recebido a vaga: repassa adiante
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            if isinstance(exc, asyncio.TimeoutError):
+                self.rejected += 1
+                raise Rejected("Server overloaded", 503, self.retry_after) from None
+            raise
+        finally:
+            self.queued -= 1
+            # Quem desistiu continua no heap até algum release tirá-lo; se
+            # eles passam dos que ainda esperam, o heap é refeito sem eles
+            if len(self._waiters) > 2 * self.queued + 8:
+                self._waiters = [item for item in self._waiters if not item[2].done()]
+                heapq.heapify(self._waiters)
+
+    def release(self) -> None:
+        # A vaga passa direto para o próximo da fila (se houver)
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+
+class HeldStream:
+    """
+    Repassa um async iterator e chama release (uma vez só) quando ele
+    termina, falha, é cancelado ou fechado.
+    """
+
+    __slots__ = ("_chunks", "_release")
+
+    def __init__(self, chunks: AsyncIterator[Any], release: Callable[[], None]) -> None:
+        self._chunks = chunks
+        self._release: Optional[Callable[[], None]] = release
+
+    def __aiter__(self) -> "HeldStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return await self._chunks.__anext__()
+        except BaseException:
+            self._done()
+            raise
+
+    async def aclose(self) -> None:
+        self._done()
+        aclose = getattr(self._chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    def _done(self) -> None:
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def __del__(self) -> None:
+        # Stream descartado sem nunca ter sido lido
+        self._done()
+
+
+class StreamCounter:
+    def __init__(self, max_streams: int = 0) -> None:
+        """
+        max_streams: streams SSE abertos ao mesmo tempo (0: sem limite).
+        """
+        self.max_streams = max_streams
+        self.open = 0
+        self.rejected = 0
+
+    def check(self) -> None:
+        if self.max_streams and self.open >= self.max_streams:
+            self.rejected += 1
+            raise Rejected("Too many open streams", 503, 5.0)
+
+    async def count(self, chunks: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        """
+        Repassa chunks contando o stream como aberto enquanto é consumido.
+        """
+        self.open += 1
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            self.open -= 1
+
+
+class BodyBudget:
+    def __init__(self, max_bytes: int = 0) -> None:
+        """
+        max_bytes: bytes de corpos em memória ao mesmo tempo (0: sem limite).
+        """
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.rejected = 0
+
+    def reserve(self, n: int) -> None:
+        """
+        Reserva n bytes ou levanta Rejected (503) sem reservar nada. Quem
+        reserva precisa chamar release com o mesmo total.
+        """
+        if self.max_bytes and self.used + n > self.max_bytes:
+            self.rejected += 1
+            raise Rejected("Too many large requests in progress", 503, 1.0)
+        self.used += n
+
+    def release(self, n: int) -> None:
+        self.used -= n
@@ -0,0 +1,833 @@
+"""
+Benchmarks do projeto.
+
+Uso:
+
+    uv run bench.py codec     # custo de dumps/loads por backend e tamanho de mensagem
+    uv run bench.py load      # carga no /mcp: throughput, latências, memória por sessão
+    uv run bench.py asgi      # overhead por request: FastAPI (server:app) x raw_app
+    uv run bench.py schema    # validação de argumentos: schema_validator x jsonschema
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from rich.console import Console
+from rich.table import Table
+
+import codec
+from client import AsyncMCPClient, MCPProtocolError, SSEDecoder, rpc_extensions
+
+console = Console()
+
+
+def measure(fn: Callable[[], Any], min_time: float = 0.2) -> float:
+    """
+    Roda fn repetidamente por pelo menos min_time segundos e devolve o tempo
+    médio por chamada, em microssegundos.
+    """
+    runs = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(runs):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / runs * 1e6
+        runs *= 2
+
+
+# -----------------------------------------------------------------------------
+# codec
+# -----------------------------------------------------------------------------
+
+def sample_messages() -> Dict[str, Any]:
+    """
+    Mensagens JSON-RPC representativas, do menor para o maior.
+    """
+    def forecast(days: int) -> Dict[str, Any]:
+        text = "\n".join(f"Day {day}: 25°C, clear" for day in range(1, days + 1))
+        return {
+            "jsonrpc": "2.0",
+            "id": 5,
+            "result": {
+                "content": [{"type": "text", "text": text}],
+                "isError": False,
+            },
+        }
+
+    tool = {
+        "name": "get_weather",
+        "description": "Get current weather information for a location",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "location": {"type": "string", "description": "City name or zip code"},
+                "forecastDays": {"type": "integer", "description": "Number of days"},
+            },
+            "required": ["location"],
+        },
+    }
+    return {
+        "tools/call request": {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "tools/call",
+            "params": {"name": "get_weather", "arguments": {"location": "São Paulo"}},
+        },
+        "tools/list (50 tools)": {
+            "jsonrpc": "2.0",
+            "id": 2,
+            "result": {
+                "tools": [dict(tool, name=f"tool_{i}") for i in range(50)],
+                "nextCursor": None,
+            },
+        },
+        "forecast 1000 dias": forecast(1000),
+        "forecast 20000 dias": forecast(20000),
+    }
+
+
+def bench_codec(args: argparse.Namespace) -> None:
+    codecs = codec.available_codecs()
+    baseline = codecs["json"]
+    # json primeiro: é a referência da coluna de ganho
+    order = ["json"] + [name for name in codecs if name != "json"]
+
+    table = Table(title="Codec JSON (µs por operação)")
+    table.add_column("mensagem")
+    table.add_column("bytes", justify="right")
+    table.add_column("codec")
+    table.add_column("dumps", justify="right")
+    table.add_column("loads", justify="right")
+    table.add_column("ganho vs json", justify="right")
+
+    for label, message in sample_messages().items():
+        encoded = baseline.dumps(message)
+        base_total = 0.0
+        for name in order:
+            backend = codecs[name]
+            dumps_us = measure(lambda: backend.dumps(message), args.min_time)
+            loads_us = measure(lambda: backend.loads(encoded), args.min_time)
+            total = dumps_us + loads_us
+            if name == "json":
+                base_total = total
+            table.add_row(
+                label,
+                str(len(encoded)),
+                name,
+                f"{dumps_us:.2f}",
+                f"{loads_us:.2f}",
+                f"{base_total / total:.1f}x",
+            )
+        table.add_section()
+
+    console.print(table)
+
+
+# -----------------------------------------------------------------------------
+# load
+# -----------------------------------------------------------------------------
+
+OPERATIONS = (
+    "initialize",
+    "tools/list",
+    "tools/call",
+    "tools/call-sse",
+    "resources/read",
+    "elicitation",
+)
+
+DEFAULT_MIX = "tools/list=3,tools/call=3,tools/call-sse=2,resources/read=2,initialize=1,elicitation=1"
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """
+    "tools/list=3,tools/call=1" -> pesos por operação.
+    """
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(
+                f"operação desconhecida: {name} (use {', '.join(OPERATIONS)})"
+            )
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class OperationStats:
+    __slots__ = ("latencies", "first_event", "errors", "rejected")
+
+    def __init__(self) -> None:
+        # Segundos, a partir do horário previsto de início (no modo --rate,
+        # inclui a espera por um worker livre: sem coordinated omission)
+        self.latencies: List[float] = []
+        # Tempo até o primeiro evento SSE (tools/call-sse)
+        self.first_event: List[float] = []
+        self.errors = 0
+        self.rejected = 0
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value * 1000, 3)
+
+        result = {
+            "count": len(self.latencies),
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "throughput": round(len(self.latencies) / elapsed, 2),
+            "p50_ms": ms(percentile(self.latencies, 50)),
+            "p95_ms": ms(percentile(self.latencies, 95)),
+            "p99_ms": ms(percentile(self.latencies, 99)),
+            "max_ms": ms(max(self.latencies, default=None)),
+        }
+        if self.first_event:
+            result["first_event_p50_ms"] = ms(percentile(self.first_event, 50))
+            result["first_event_p95_ms"] = ms(percentile(self.first_event, 95))
+        return result
+
+
+def rss_kib(pid: int) -> Optional[int]:
+    """
+    Memória residente do processo (Linux), ou None se não dá para medir.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def answer_elicitation(message: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "action": "accept",
+        "content": {"fullName": "Bench User", "email": "bench@example.com", "acceptTerms": True},
+    }
+
+
+def check_reply(reply: Dict[str, Any], stats: OperationStats) -> None:
+    error = reply.get("error")
+    if error is not None:
+        if error.get("code") == -32000 and "retryAfter" in (error.get("data") or {}):
+            stats.rejected += 1
+        else:
+            stats.errors += 1
+    elif (reply.get("result") or {}).get("isError"):
+        stats.errors += 1
+
+
+async def call_sse(client: AsyncMCPClient, days: int, stats: OperationStats, start: float) -> None:
+    """
+    tools/call em streaming, medindo também o tempo até o primeiro evento.
+    """
+    payload = {
+        "jsonrpc": "2.0",
+        "id": client._new_id(),
+        "method": "tools/call",
+        "params": {
+            "name": "get_weather",
+            "arguments": {"location": f"city-{random.randrange(1000)}", "forecastDays": days},
+        },
+    }
+    decoder = SSEDecoder()
+    reply = None
+    first_event = None
+    async with client.client.stream(
+        "POST",
+        client.base_url,
+        headers=client._headers(),
+        content=codec.dumps(payload),
+        extensions=rpc_extensions(payload),
+    ) as response:
+        if not response.headers.get("Content-Type", "").startswith("text/event-stream"):
+            reply = codec.loads(await response.aread())
+        else:
+            async for chunk in response.aiter_bytes():
+                for data in decoder.feed(chunk):
+                    if first_event is None:
+                        first_event = time.perf_counter() - start
+                    message = codec.loads(data)
+                    if message.get("id") == payload["id"] and "method" not in message:
+                        reply = message
+    if first_event is not None:
+        stats.first_event.append(first_event)
+    if reply is None:
+        stats.errors += 1
+    else:
+        check_reply(reply, stats)
+
+
+async def run_operation(
+    op: str, client: AsyncMCPClient, args: argparse.Namespace, stats: OperationStats, start: float
+) -> None:
+    if op == "initialize":
+        # Sessão descartável: não mexe na sessão do cliente
+        payload = {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}}
+        response = await client.client.post(
+            client.base_url,
+            headers={"Accept": "application/json, text/event-stream", "Content-Type": "application/json"},
+            content=codec.dumps(payload),
+            extensions=rpc_extensions(payload),
+        )
+        check_reply(codec.loads(response.content), stats)
+        session_id = response.headers.get("Mcp-Session-Id")
+        if session_id:
+            await client.client.delete(client.base_url, headers={"Mcp-Session-Id": session_id})
+        return
+    if op == "tools/call-sse":
+        await call_sse(client, args.forecast_days, stats, start)
+        return
+
+    if op == "tools/list":
+        call: Awaitable[Dict[str, Any]] = client.list_tools()
+    elif op == "tools/call":
+        call = client.call_tool("get_weather", {"location": f"city-{random.randrange(1000)}"})
+    elif op == "resources/read":
+        call = client.read_resource("resource://docs/terms")
+    else:
+        call = client.call_tool("register_user", {"useElicitation": True})
+    check_reply(await call, stats)
+
+
+async def run_phase(
+    clients: List[AsyncMCPClient],
+    args: argparse.Namespace,
+    duration: float,
+) -> Tuple[Dict[str, OperationStats], float]:
+    """
+    Roda o mix de operações por duration segundos: com --rate, em taxa fixa
+    (open loop); sem, com --concurrency workers sempre ocupados.
+    """
+    ops, weights = list(args.mix), list(args.mix.values())
+    stats = {op: OperationStats() for op in ops}
+    counter = iter(range(sys.maxsize))
+
+    async def one(start: float) -> None:
+        op = random.choices(ops, weights)[0]
+        client = clients[next(counter) % len(clients)]
+        try:
+            await run_operation(op, client, args, stats[op], start)
+        except (httpx.HTTPError, MCPProtocolError, codec.DecodeError):
+            stats[op].errors += 1
+            return
+        stats[op].latencies.append(time.perf_counter() - start)
+
+    began = time.perf_counter()
+    deadline = began + duration
+    if args.rate:
+        slots = asyncio.Semaphore(args.concurrency)
+        tasks = set()
+
+        async def scheduled(start: float) -> None:
+            try:
+                await one(start)
+            finally:
+                slots.release()
+
+        for k in range(sys.maxsize):
+            start = began + k / args.rate
+            if start >= deadline:
+                break
+            await asyncio.sleep(max(0.0, start - time.perf_counter()))
+            await slots.acquire()
+            task = asyncio.create_task(scheduled(start))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+    else:
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                await one(time.perf_counter())
+
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return stats, time.perf_counter() - began
+
+
+async def memory_per_session(url: str, pid: int, sessions: int) -> Optional[float]:
+    """
+    Quanto a memória do servidor cresce por sessão aberta (KiB).
+    """
+    before = rss_kib(pid)
+    if before is None or sessions <= 0:
+        return None
+    headers = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+    body = codec.dumps({"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}})
+    async with httpx.AsyncClient(timeout=30) as http:
+        ids = []
+        for offset in range(0, sessions, 100):
+            responses = await asyncio.gather(
+                *(http.post(url, headers=headers, content=body) for _ in range(min(100, sessions - offset)))
+            )
+            ids += [r.headers.get("Mcp-Session-Id") for r in responses]
+        after = rss_kib(pid)
+        for offset in range(0, len(ids), 100):
+            await asyncio.gather(
+                *(http.delete(url, headers={"Mcp-Session-Id": sid}) for sid in ids[offset : offset + 100] if sid)
+            )
+    return round((after - before) / sessions, 2) if after is not None else None
+
+
+@asynccontextmanager
+async def bench_server(args: argparse.Namespace) -> AsyncIterator[Tuple[str, Optional[int]]]:
+    """
+    URL do /mcp e pid do servidor: --url (servidor externo, sem medir
+    memória), o server:app neste processo, ou server.py em um subprocesso.
+    """
+    if args.url:
+        yield args.url, None
+        return
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/mcp"
+    if args.server == "inprocess":
+        import uvicorn
+
+        import server
+
+        asgi_app = server.raw_app if args.app == "raw" else server.app
+        instance = uvicorn.Server(
+            uvicorn.Config(asgi_app, host="127.0.0.1", port=port, log_level="warning")
+        )
+        serving = asyncio.create_task(instance.serve())
+        while not instance.started:
+            if serving.done():
+                serving.result()
+            await asyncio.sleep(0.05)
+        try:
+            yield url, os.getpid()
+        finally:
+            instance.should_exit = True
+            server.notification_hub.close()
+            await serving
+        return
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(here, "server.py"), "--port", str(port), "--app", args.app],
+        cwd=here,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(200):
+            if process.poll() is not None:
+                raise RuntimeError(f"server.py terminou com código {process.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                await asyncio.sleep(0.05)
+        yield url, process.pid
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    async with bench_server(args) as (url, pid):
+        clients = [
+            AsyncMCPClient(url, max_in_flight=args.concurrency, on_request=answer_elicitation)
+            for _ in range(args.sessions)
+        ]
+        try:
+            for client in clients:
+                await client.initialize()
+            if args.warmup:
+                await run_phase(clients, args, args.warmup)
+            stats, elapsed = await run_phase(clients, args, args.duration)
+        finally:
+            for client in clients:
+                await client.aclose()
+        memory = await memory_per_session(url, pid, args.memory_sessions) if pid else None
+
+    operations = {op: s.summary(elapsed) for op, s in stats.items()}
+    return {
+        "config": {
+            "server": "url" if args.url else args.server,
+            "app": None if args.url else args.app,
+            "mix": args.mix,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "duration": args.duration,
+            "sessions": args.sessions,
+            "forecast_days": args.forecast_days,
+        },
+        "elapsed": round(elapsed, 3),
+        "throughput": round(sum(o["count"] for o in operations.values()) / elapsed, 2),
+        "operations": operations,
+        "memory_per_session_kib": memory,
+    }
+
+
+def print_load_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    def fmt(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value:.2f}"
+
+    def delta(op: str, key: str, value: Optional[float]) -> str:
+        # Variação em relação ao baseline (para latência, negativo é melhor)
+        old = ((baseline or {}).get("operations", {}).get(op) or {}).get(key)
+        if not old or value is None:
+            return fmt(value)
+        return f"{fmt(value)} ({(value - old) / old * 100:+.0f}%)"
+
+    table = Table(title=f"Carga no /mcp ({report['elapsed']:.1f}s, {report['throughput']:.1f} req/s)")
+    columns = ("operação", "req", "erros", "recusados", "req/s", "p50 ms", "p95 ms", "p99 ms", "max ms", "1º evento p50/p95 ms")
+    for column in columns:
+        table.add_column(column, justify="left" if column == "operação" else "right")
+    for op, summary in report["operations"].items():
+        first = "-"
+        if "first_event_p50_ms" in summary:
+            first = f"{fmt(summary['first_event_p50_ms'])} / {fmt(summary['first_event_p95_ms'])}"
+        table.add_row(
+            op,
+            str(summary["count"]),
+            str(summary["errors"]),
+            str(summary["rejected"]),
+            delta(op, "throughput", summary["throughput"]),
+            delta(op, "p50_ms", summary["p50_ms"]),
+            delta(op, "p95_ms", summary["p95_ms"]),
+            delta(op, "p99_ms", summary["p99_ms"]),
+            fmt(summary["max_ms"]),
+            first,
+        )
+    console.print(table)
+    memory = report["memory_per_session_kib"]
+    if memory is not None:
+        console.print(f"Memória do servidor por sessão: {memory:.2f} KiB")
+
+
+def bench_load(args: argparse.Namespace) -> None:
+    report = asyncio.run(run_load(args))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_load_report(report, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+# -----------------------------------------------------------------------------
+# asgi
+# -----------------------------------------------------------------------------
+
+ASGI_HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json, text/event-stream",
+}
+
+
+def asgi_messages(days: int) -> Dict[str, Dict[str, Any]]:
+    def call(name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "tools/call",
+            "params": {"name": name, "arguments": arguments},
+        }
+
+    return {
+        "notification": {"jsonrpc": "2.0", "method": "notifications/initialized"},
+        "tools/list": {"jsonrpc": "2.0", "id": 1, "method": "tools/list"},
+        "tools/call": call("get_weather", {"location": "São Paulo"}),
+        "tools/call-sse": call("get_weather", {"location": "São Paulo", "forecastDays": days}),
+    }
+
+
+async def asgi_request(
+    app: Any, body: bytes, headers: Dict[str, str]
+) -> Tuple[int, Dict[str, str], bytes]:
+    """
+    Um POST /mcp chamando a app ASGI direto (sem rede, sem servidor HTTP):
+    sobra só o custo da app.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/mcp",
+        "raw_path": b"/mcp",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+    pending = [{"type": "http.request", "body": body, "more_body": False}]
+    finished = asyncio.Event()
+    start: Dict[str, Any] = {}
+    chunks: List[bytes] = []
+
+    async def receive() -> Dict[str, Any]:
+        if pending:
+            return pending.pop()
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    finished.set()
+    response_headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in start["headers"]}
+    return start["status"], response_headers, b"".join(chunks)
+
+
+async def measure_asgi(app: Any, body: bytes, headers: Dict[str, str], min_time: float) -> float:
+    """
+    Como measure, para um request ASGI: µs por request.
+    """
+    runs = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(runs):
+            status, _, _ = await asgi_request(app, body, headers)
+            if status >= 300:
+                raise RuntimeError(f"resposta {status}")
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            return elapsed / runs * 1e6
+        runs *= 2
+
+
+async def run_asgi(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    import server
+
+    apps = {"fastapi": server.app, "raw": server.raw_app}
+    messages = asgi_messages(args.forecast_days)
+    results: Dict[str, Dict[str, float]] = {name: {} for name in messages}
+    for app_name, app in apps.items():
+        initialize = {
+            "jsonrpc": "2.0",
+            "id": 0,
+            "method": "initialize",
+            "params": {"protocolVersion": "2025-03-26", "capabilities": {}, "clientInfo": {"name": "bench"}},
+        }
+        _, headers, _ = await asgi_request(app, codec.dumps(initialize), ASGI_HEADERS)
+        session_headers = dict(ASGI_HEADERS, **{"Mcp-Session-Id": headers["mcp-session-id"]})
+        for name, message in messages.items():
+            body = codec.dumps(message)
+            await measure_asgi(app, body, session_headers, args.min_time / 4)  # aquecimento
+            results[name][app_name] = await measure_asgi(app, body, session_headers, args.min_time)
+    return results
+
+
+def bench_asgi(args: argparse.Namespace) -> None:
+    # Sem limite de taxa/admissão: só o custo por request interessa aqui
+    os.environ.setdefault("MCP_MAX_IN_FLIGHT", "0")
+    results = asyncio.run(run_asgi(args))
+
+    table = Table(title="POST /mcp direto na app ASGI (µs por request)")
+    table.add_column("request")
+    table.add_column("fastapi", justify="right")
+    table.add_column("raw", justify="right")
+    table.add_column("ganho", justify="right")
+    for name, times in results.items():
+        table.add_row(
+            name,
+            f"{times['fastapi']:.1f}",
+            f"{times['raw']:.1f}",
+            f"{times['fastapi'] / times['raw']:.2f}x",
+        )
+    console.print(table)
+
+
+# -----------------------------------------------------------------------------
+# schema
+# -----------------------------------------------------------------------------
+
+# Schema maior que os das tools do servidor: objetos aninhados, array,
+# enum, pattern e limites numéricos
+ORDER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "customer": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string", "minLength": 1},
+                "email": {"type": "string", "pattern": "^[^@]+@[^@]+$"},
+            },
+            "required": ["name", "email"],
+            "additionalProperties": False,
+        },
+        "items": {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "sku": {"type": "string"},
+                    "quantity": {"type": "integer", "minimum": 1},
+                    "price": {"type": "number", "exclusiveMinimum": 0},
+                },
+                "required": ["sku", "quantity", "price"],
+            },
+        },
+        "shipping": {"enum": ["standard", "express"]},
+    },
+    "required": ["customer", "items"],
+}
+
+
+def schema_cases() -> Dict[str, Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]]:
+    """
+    Nome -> (schema, argumentos válidos, argumentos inválidos).
+    """
+    import server
+
+    weather = server.tool_registry.get("get_weather").input_schema
+    order = {
+        "customer": {"name": "Ana", "email": "ana@example.com"},
+        "items": [{"sku": f"SKU-{i}", "quantity": i + 1, "price": 9.9} for i in range(10)],
+        "shipping": "express",
+    }
+    bad_order = dict(order, items=order["items"][:-1] + [{"sku": "SKU-9", "quantity": 0, "price": 9.9}])
+    return {
+        "get_weather": (
+            weather,
+            {"location": "São Paulo", "forecastDays": 3},
+            {"location": "São Paulo", "forecastDays": "3"},
+        ),
+        "order (10 itens)": (ORDER_SCHEMA, order, bad_order),
+    }
+
+
+def bench_schema(args: argparse.Namespace) -> None:
+    from schema_validator import compile_schema
+
+    try:
+        import jsonschema
+    except ImportError:
+        jsonschema = None
+        console.print("[yellow]jsonschema não instalado (uv sync --extra bench): só o validador compilado[/yellow]")
+
+    table = Table(title="Validação de argumentos (µs por chamada)")
+    table.add_column("schema")
+    table.add_column("argumentos")
+    table.add_column("compilado", justify="right")
+    if jsonschema is not None:
+        table.add_column("jsonschema", justify="right")
+        table.add_column("ganho", justify="right")
+
+    for label, (schema, valid, invalid) in schema_cases().items():
+        validate = compile_schema(schema)
+        reference = jsonschema.Draft202012Validator(schema) if jsonschema is not None else None
+        for case, arguments in (("válidos", valid), ("inválidos", invalid)):
+            if (validate(arguments) is None) != (case == "válidos"):
+                raise RuntimeError(f"{label}: argumentos {case} com resultado errado")
+            compiled_us = measure(lambda: validate(arguments), args.min_time)
+            row = [label, case, f"{compiled_us:.2f}"]
+            if reference is not None:
+                # Primeiro erro, como o validador compilado (e o que o
+                # servidor devolveria no -32602)
+                reference_us = measure(lambda: next(reference.iter_errors(arguments), None), args.min_time)
+                row += [f"{reference_us:.2f}", f"{reference_us / compiled_us:.1f}x"]
+            table.add_row(*row)
+        table.add_section()
+
+    console.print(table)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks do MCP playground")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    codec_parser = subparsers.add_parser("codec", help="compara os backends de JSON")
+    codec_parser.add_argument("--min-time", type=float, default=0.2)
+    codec_parser.set_defaults(func=bench_codec)
+
+    load_parser = subparsers.add_parser("load", help="gera carga no /mcp e mede latências")
+    load_parser.add_argument(
+        "--server",
+        choices=("subprocess", "inprocess"),
+        default="subprocess",
+        help="server.py em outro processo (padrão) ou server:app neste processo",
+    )
+    load_parser.add_argument(
+        "--app",
+        choices=("fastapi", "raw"),
+        default="fastapi",
+        help="aplicação servida (server.py --app)",
+    )
+    load_parser.add_argument("--url", help="usa um servidor já rodando (ex.: http://127.0.0.1:8000/mcp)")
+    load_parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=parse_mix(DEFAULT_MIX),
+        help=f"pesos das operações (padrão: {DEFAULT_MIX})",
+    )
+    load_parser.add_argument("--concurrency", type=int, default=32, help="requests simultâneos")
+    load_parser.add_argument(
+        "--rate",
+        type=float,
+        default=0.0,
+        help="requests/s em taxa fixa (0: o máximo que --concurrency permite)",
+    )
+    load_parser.add_argument("--duration", type=float, default=10.0, help="segundos medidos")
+    load_parser.add_argument("--warmup", type=float, default=1.0, help="segundos de aquecimento")
+    load_parser.add_argument("--sessions", type=int, default=4, help="sessões MCP usadas pela carga")
+    load_parser.add_argument("--forecast-days", type=int, default=30, help="tamanho do tools/call-sse")
+    load_parser.add_argument(
+        "--memory-sessions",
+        type=int,
+        default=1000,
+        help="sessões abertas para medir memória por sessão (0 desliga)",
+    )
+    load_parser.add_argument("--json", help="grava o relatório em JSON")
+    load_parser.add_argument("--baseline", help="relatório JSON anterior, para comparar")
+    load_parser.set_defaults(func=bench_load)
+
+    asgi_parser = subparsers.add_parser("asgi", help="compara o FastAPI com o raw_app, sem rede")
+    asgi_parser.add_argument("--min-time", type=float, default=0.5, help="segundos por medida")
+    asgi_parser.add_argument("--forecast-days", type=int, default=30, help="tamanho do tools/call-sse")
+    asgi_parser.set_defaults(func=bench_asgi)
+
+    schema_parser = subparsers.add_parser("schema", help="compara a validação de argumentos com o jsonschema")
+    schema_parser.add_argument("--min-time", type=float, default=0.2)
+    schema_parser.set_defaults(func=bench_schema)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,188 @@
-import json
-from typing import Any, Dict, Optional
+import asyncio
+import time
+import weakref
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Set, Tuple
 
 import httpx
 from rich.console import Console
 from rich.panel import Panel
 from rich import print as rprint
 
+import codec
+import compression
+from client_cache import ClientCache
+from metrics import Histogram
+
 console = Console()
 
+# Pool de conexões e timeouts usados pelos dois clientes. O read timeout é
+# longo porque streams SSE (elicitation, notificações) ficam abertos esperando.
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=100,
+    keepalive_expiry=30.0,
+)
+DEFAULT_TIMEOUT = httpx.Timeout(connect=5.0, read=300.0, write=30.0, pool=30.0)
+
+# Quedas de conexão no meio de um stream SSE: o cliente retoma com
+# GET /mcp + Last-Event-ID, até SSE_RESUME_ATTEMPTS vezes seguidas.
+SSE_RESUME_ATTEMPTS = 3
+SSE_RESUMABLE_ERRORS = (httpx.NetworkError, httpx.RemoteProtocolError)
+
 
-class MCPClient:
+class MCPProtocolError(Exception):
+    """
+    O servidor fechou a resposta sem mandar a response do request.
     """
-    Cliente MCP muito simples, falando com o servidor via Streamable HTTP.
 
-    Demonstra na prática:
 
-    - initialize + notifications/initialized
-    - tools/list
-    - tools/call (resposta normal)
-    - tools/call (streaming SSE)
-    - resources/list
-    - resources/read
-    - notificações assíncronas via GET /mcp (SSE)
-    - tools/call register_user com elicitation
+class MCPError(Exception):
+    """
+    O servidor respondeu o request com um erro JSON-RPC.
+    """
+
+    def __init__(self, error: Dict[str, Any]) -> None:
+        super().__init__(f"{error.get('code')}: {error.get('message')}")
+        self.code = error.get("code")
+        self.message = error.get("message")
+
+
+# Hook de timing: (método JSON-RPC, segundos até a resposta, status HTTP)
+TimingHook = Callable[[str, float, int], None]
+
+# Extensão do httpx.Request com o método JSON-RPC do corpo: o RequestTimer
+# lê daqui, sem decodificar o corpo de cada request
+METHOD_EXTENSION = "mcp_method"
+
+
+def rpc_extensions(payload: Any) -> Dict[str, Any]:
+    """
+    extensions de um POST com payload (uma mensagem ou um batch).
+    """
+    if isinstance(payload, list):
+        return {METHOD_EXTENSION: "batch"}
+    return {METHOD_EXTENSION: payload.get("method") or "response"}
+
+
+class RequestTimer:
+    """
+    Timing dos requests do lado do cliente, via event hooks do httpx: mede,
+    por método JSON-RPC, o tempo até os headers da resposta (para respostas
+    SSE, até o stream abrir). Os tempos ficam em latency (o mesmo histograma
+    do /metrics do servidor, para comparar os dois lados) e vão para
+    on_timing, se definido.
+    """
+
+    def __init__(self, on_timing: Optional[TimingHook] = None) -> None:
+        self.on_timing = on_timing
+        self.latency = Histogram(
+            "mcp_client_response_seconds",
+            "Time until the response headers, per JSON-RPC method",
+            label="method",
+        )
+        self._started: "weakref.WeakKeyDictionary[httpx.Request, float]" = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def method_of(request: httpx.Request) -> str:
+        if request.method != "POST":
+            return f"{request.method} stream" if request.method == "GET" else request.method
+        return request.extensions.get(METHOD_EXTENSION, "unknown")
+
+    def on_request(self, request: httpx.Request) -> None:
+        self._started[request] = time.perf_counter()
+
+    def on_response(self, response: httpx.Response) -> None:
+        started = self._started.pop(response.request, None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        method = self.method_of(response.request)
+        self.latency.observe(elapsed, method)
+        if self.on_timing is not None:
+            self.on_timing(method, elapsed, response.status_code)
+
+    def sync_hooks(self) -> Dict[str, List[Callable[..., Any]]]:
+        return {"request": [self.on_request], "response": [self.on_response]}
+
+    def async_hooks(self) -> Dict[str, List[Callable[..., Any]]]:
+        async def on_request(request: httpx.Request) -> None:
+            self.on_request(request)
+
+        async def on_response(response: httpx.Response) -> None:
+            self.on_response(response)
+
+        return {"request": [on_request], "response": [on_response]}
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Quantidade e média (ms) por método.
+        """
+        return {
+            method: {"count": count, "mean_ms": total / count * 1000 if count else 0.0}
+            for method, (count, total) in self.latency.snapshot().items()
+        }
+
+    def render(self) -> str:
+        """
+        Os tempos no formato texto do Prometheus.
+        """
+        return "\n".join(self.latency.render()) + "\n"
+
+
+class SSEDecoder:
     """
+    Decodificador incremental de SSE: recebe chunks de bytes e devolve o
+    conteúdo de cada evento completo (as linhas "data: ..." do evento,
+    juntadas com "\\n", como manda o SSE: um resultado grande pode vir em
+    várias linhas).
+
+    Trabalha direto nos bytes recebidos: o JSON vai para o codec sem passar
+    por str. O último "id: ..." visto fica em last_event_id, para retomar o
+    stream se a conexão cair.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = b""
+        self._data: List[bytes] = []
+        self.last_event_id: Optional[str] = None
 
-    def __init__(self, base_url: str = "http://127.0.0.1:8000/mcp") -> None:
+    def feed(self, chunk: bytes) -> List[bytes]:
+        *lines, self._buffer = (self._buffer + chunk).split(b"\n")
+        events = []
+        for line in lines:
+            line = line.rstrip(b"\r")
+            if line.startswith(b"data: "):
+                self._data.append(line[len(b"data: ") :])
+            elif line.startswith(b"id: "):
+                self.last_event_id = line[len(b"id: ") :].decode()
+            elif not line and self._data:
+                events.append(b"\n".join(self._data))
+                self._data = []
+        return events
+
+
+class BaseMCPClient:
+    """
+    Estado de sessão comum aos clientes síncrono e assíncrono.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        on_timing: Optional[TimingHook] = None,
+        compress: bool = True,
+    ) -> None:
         self.base_url = base_url
-        self.client = httpx.Client(timeout=None)
+        self.timer = RequestTimer(on_timing)
+        # Codificações que o httpx sabe descomprimir aqui (as mesmas
+        # bibliotecas do servidor); "identity" pede respostas sem compressão
+        self.accept_encoding = ", ".join(compression.available()) if compress else "identity"
         self.session_id: Optional[str] = None
         self._next_id = 1
+        # Última response de resources/read de cada URI (com o ETag em _meta)
+        self._resource_versions: Dict[str, Dict[str, Any]] = {}
+        # Com um ClientCache, as versões dos resources ficam nele (e no disco)
+        self.cache: Optional[ClientCache] = None
 
     def _new_id(self) -> int:
         current = self._next_id
@@ -39,12 +192,99 @@ class MCPClient:
     def _headers(self) -> Dict[str, str]:
         headers = {
             "Accept": "application/json, text/event-stream",
+            "Accept-Encoding": self.accept_encoding,
             "Content-Type": "application/json",
         }
         if self.session_id:
             headers["Mcp-Session-Id"] = self.session_id
         return headers
 
+    def _resume_headers(self, last_event_id: str) -> Dict[str, str]:
+        headers = {
+            "Accept": "text/event-stream",
+            "Accept-Encoding": self.accept_encoding,
+            "Last-Event-ID": last_event_id,
+        }
+        if self.session_id:
+            headers["Mcp-Session-Id"] = self.session_id
+        return headers
+
+    def _cache_scope(self, per_session: bool = True) -> str:
+        return f"{self.base_url} {self.session_id}" if per_session else self.base_url
+
+    def _observe(self, message: Dict[str, Any]) -> None:
+        """
+        Notification recebida em um stream SSE: pode invalidar o cache.
+        """
+        if self.cache is not None and "id" not in message:
+            self.cache.observe(message)
+
+    def _cached_resource(self, uri: str) -> Optional[Dict[str, Any]]:
+        if self.cache is not None:
+            return self.cache.get(self._cache_scope(per_session=False), "resources/read", {"uri": uri})
+        return self._resource_versions.get(uri)
+
+    def _read_resource_params(self, uri: str, cached: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        params: Dict[str, Any] = {"uri": uri}
+        if cached is not None:
+            params["_meta"] = {"ifNoneMatch": cached["result"]["_meta"]["etag"]}
+        return params
+
+    def _remember_resource(
+        self, uri: str, message: Dict[str, Any], cached: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Guarda a versão lida do resource ou, se o servidor respondeu que não
+        mudou, devolve a versão guardada (cached, com o id da response atual).
+        """
+        meta = (message.get("result") or {}).get("_meta") or {}
+        if meta.get("notModified"):
+            if cached is not None:
+                return dict(cached, id=message.get("id"))
+        elif "etag" in meta:
+            if self.cache is not None:
+                self.cache.put(self._cache_scope(per_session=False), "resources/read", {"uri": uri}, message)
+            else:
+                self._resource_versions[uri] = message
+        return message
+
+
+class MCPClient(BaseMCPClient):
+    """
+    Cliente MCP muito simples, falando com o servidor via Streamable HTTP.
+
+    Demonstra na prática:
+
+    - initialize + notifications/initialized
+    - tools/list
+    - tools/call (resposta normal)
+    - tools/call (streaming SSE)
+    - resources/list
+    - resources/read
+    - notificações assíncronas via GET /mcp (SSE)
+    - tools/call register_user com elicitation
+
+    Com cache (ClientCache), tools/list e resources/list são respondidos
+    localmente até o servidor mandar o list_changed correspondente (em um
+    stream SSE que o cliente esteja lendo) ou a entrada passar do ttl;
+    resources/read reaproveita a versão guardada quando o ETag não mudou.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://127.0.0.1:8000/mcp",
+        on_timing: Optional[TimingHook] = None,
+        compress: bool = True,
+        cache: Optional[ClientCache] = None,
+    ) -> None:
+        super().__init__(base_url, on_timing, compress)
+        self.cache = cache
+        self.client = httpx.Client(
+            limits=DEFAULT_LIMITS,
+            timeout=DEFAULT_TIMEOUT,
+            event_hooks=self.timer.sync_hooks(),
+        )
+
     def _print_title(self, title: str) -> None:
         console.print()
         console.print(
@@ -66,6 +306,65 @@ class MCPClient:
         # rprint já formata dict bonitinho e colorido
         rprint(data)
 
+    def _print_list_status(self, status: Optional[int]) -> None:
+        if status is None:
+            console.print("Do cache (sem request ao servidor)", style="bold cyan")
+        else:
+            self._print_status(status)
+
+    # -------------------------------------------------------------------------
+    # Cache
+    # -------------------------------------------------------------------------
+
+    def _request_list(self, method: str, cursor: Optional[str]) -> Tuple[Dict[str, Any], Optional[int]]:
+        """
+        Uma página de tools/list ou resources/list: (response, status HTTP).
+        Com cache, uma página já lida nesta sessão volta sem ir ao servidor
+        (status None).
+        """
+        params = {"cursor": cursor}
+        if self.cache is not None:
+            cached = self.cache.get(self._cache_scope(), method, params)
+            if cached is not None:
+                return cached, None
+        payload = {
+            "jsonrpc": "2.0",
+            "id": self._new_id(),
+            "method": method,
+            "params": params,
+        }
+        response = self.client.post(
+            self.base_url,
+            headers=self._headers(),
+            content=codec.dumps(payload),
+            extensions=rpc_extensions(payload),
+        )
+        message = codec.loads(response.content)
+        if self.cache is not None and "result" in message:
+            self.cache.put(self._cache_scope(), method, params, message)
+        return message, response.status_code
+
+    def _request_resource(self, uri: str) -> Tuple[Dict[str, Any], int]:
+        """
+        resources/read condicional: manda o ETag da versão guardada e, se o
+        servidor responder que não mudou, devolve essa versão.
+        """
+        cached = self._cached_resource(uri)
+        payload = {
+            "jsonrpc": "2.0",
+            "id": self._new_id(),
+            "method": "resources/read",
+            "params": self._read_resource_params(uri, cached),
+        }
+        response = self.client.post(
+            self.base_url,
+            headers=self._headers(),
+            content=codec.dumps(payload),
+            extensions=rpc_extensions(payload),
+        )
+        message = self._remember_resource(uri, codec.loads(response.content), cached)
+        return message, response.status_code
+
     # -------------------------------------------------------------------------
     # Workflows
     # -------------------------------------------------------------------------
@@ -94,13 +393,14 @@ class MCPClient:
         response = self.client.post(
             self.base_url,
             headers=self._headers(),
-            json=payload,
+            content=codec.dumps(payload),
+            extensions=rpc_extensions(payload),
         )
 
         self._print_status(response.status_code)
         self.session_id = response.headers.get("Mcp-Session-Id")
         console.print(f"[cyan]Mcp-Session-Id:[/] {self.session_id}")
-        self._print_json_body(response.json())
+        self._print_json_body(codec.loads(response.content))
 
     def send_initialized_notification(self) -> None:
         self._print_title("2) notifications/initialized")
@@ -111,29 +411,17 @@ class MCPClient:
         response = self.client.post(
             self.base_url,
             headers=self._headers(),
-            json=payload,
+            content=codec.dumps(payload),
+            extensions=rpc_extensions(payload),
         )
 
         self._print_status(response.status_code, "(esperado 202)")
 
     def list_tools(self) -> None:
         self._print_title("3) tools/list")
-        msg_id = self._new_id()
-        payload = {
-            "jsonrpc": "2.0",
-            "id": msg_id,
-            "method": "tools/list",
-            "params": {
-                "cursor": None,
-            },
-        }
-        response = self.client.post(
-            self.base_url,
-            headers=self._headers(),
-            json=payload,
-        )
-        self._print_status(response.status_code)
-        self._print_json_body(response.json())
+        message, status = self._request_list("tools/list", None)
+        self._print_list_status(status)
+        self._print_json_body(message)
 
     def call_get_weather_simple(self) -> None:
         self._print_title("4) tools/call get_weather (resposta simples)")
@@ -152,40 +440,70 @@ class MCPClient:
         response = self.client.post(
             self.base_url,
             headers=self._headers(),
-            json=payload,
+            content=codec.dumps(payload),
+            extensions=rpc_extensions(payload),
         )
         self._print_status(response.status_code)
-        self._print_json_body(response.json())
+        self._print_json_body(codec.loads(response.content))
 
     # -------------------------------------------------------------------------
     # SSE helpers
     # -------------------------------------------------------------------------
 
-    def _consume_sse_stream(self, response: httpx.Response) -> None:
-        """
-        Consome um stream SSE onde cada evento vem em uma linha "data: {...}".
-        Imprime cada mensagem JSON-RPC recebida.
+    def _iter_sse_data(self, response: httpx.Response) -> Iterator[bytes]:
         """
-        for raw_line in response.iter_lines():
-            if not raw_line:
-                continue
-
-            # httpx.iter_lines() geralmente retorna str, mas pode retornar bytes.
-            if isinstance(raw_line, (bytes, bytearray)):
-                line = raw_line.decode("utf-8")
-            else:
-                line = raw_line
+        Devolve o conteúdo ("data") de cada evento do stream SSE.
 
-            if not line.startswith("data: "):
-                continue
-
-            data_str = line[len("data: ") :]
+        Se a conexão cair no meio, retoma o stream com GET /mcp +
+        Last-Event-ID: o servidor reenvia o que se perdeu e continua.
+        """
+        decoder = SSEDecoder()
+        resumed: Optional[httpx.Response] = None
+        attempts = 0
+        try:
+            while True:
+                try:
+                    for chunk in response.iter_bytes():
+                        attempts = 0
+                        yield from decoder.feed(chunk)
+                    return
+                except SSE_RESUMABLE_ERRORS:
+                    if decoder.last_event_id is None or attempts >= SSE_RESUME_ATTEMPTS:
+                        raise
+                attempts += 1
+                time.sleep(0.1 * attempts)
+                console.print(
+                    f"[yellow][SSE] conexão caiu; retomando após o evento "
+                    f"{decoder.last_event_id}[/yellow]"
+                )
+                if resumed is not None:
+                    resumed.close()
+                resumed = response = self.client.send(
+                    self.client.build_request(
+                        "GET", self.base_url, headers=self._resume_headers(decoder.last_event_id)
+                    ),
+                    stream=True,
+                )
+                if response.status_code != 200:
+                    raise MCPProtocolError(
+                        f"Stream não pode ser retomado (HTTP {response.status_code})"
+                    )
+        finally:
+            if resumed is not None:
+                resumed.close()
 
+    def _consume_sse_stream(self, response: httpx.Response) -> None:
+        """
+        Consome um stream SSE onde cada evento traz uma mensagem JSON-RPC.
+        Imprime cada mensagem recebida.
+        """
+        for data in self._iter_sse_data(response):
             try:
-                payload = json.loads(data_str)
-            except json.JSONDecodeError:
-                console.print(f"[yellow][SSE] linha inválida:[/] {line!r}")
+                payload = codec.loads(data)
+            except codec.DecodeError:
+                console.print(f"[yellow][SSE] linha inválida:[/] {data!r}")
                 continue
+            self._observe(payload)
 
             console.print(
                 Panel.fit(
@@ -219,14 +537,15 @@ class MCPClient:
             "POST",
             self.base_url,
             headers=self._headers(),
-            json=payload,
+            content=codec.dumps(payload),
+            extensions=rpc_extensions(payload),
         ) as response:
             self._print_status(response.status_code)
             if response.headers.get("Content-Type", "").startswith("text/event-stream"):
                 self._consume_sse_stream(response)
             else:
                 console.print("[yellow]Resposta não é SSE, corpo:[/yellow]")
-                self._print_json_body(response.json())
+                self._print_json_body(codec.loads(response.read()))
 
     # -------------------------------------------------------------------------
     # Resources
@@ -234,62 +553,84 @@ class MCPClient:
 
     def list_resources(self) -> None:
         self._print_title("6) resources/list")
-        msg_id = self._new_id()
-        payload = {
-            "jsonrpc": "2.0",
-            "id": msg_id,
-            "method": "resources/list",
-            "params": {
-                "cursor": None,
-            },
-        }
-        response = self.client.post(
-            self.base_url,
-            headers=self._headers(),
-            json=payload,
-        )
-        self._print_status(response.status_code)
-        self._print_json_body(response.json())
+        message, status = self._request_list("resources/list", None)
+        self._print_list_status(status)
+        self._print_json_body(message)
 
     def read_terms_resource(self) -> None:
         self._print_title("7) resources/read resource://docs/terms")
-        msg_id = self._new_id()
-        payload = {
-            "jsonrpc": "2.0",
-            "id": msg_id,
-            "method": "resources/read",
-            "params": {
-                "uri": "resource://docs/terms",
-            },
-        }
-        response = self.client.post(
-            self.base_url,
-            headers=self._headers(),
-            json=payload,
-        )
-        self._print_status(response.status_code)
-        self._print_json_body(response.json())
+        message, status = self._request_resource("resource://docs/terms")
+        self._print_status(status)
+        self._print_json_body(message)
+
+    def read_resource(self, uri: str) -> Dict[str, Any]:
+        """
+        resources/read sem impressão, reaproveitando a versão já baixada
+        quando o ETag não mudou.
+        """
+        message, _ = self._request_resource(uri)
+        return message
+
+    # -------------------------------------------------------------------------
+    # Paginação (tools/list e resources/list)
+    # -------------------------------------------------------------------------
+
+    def _iter_pages(self, method: str, key: str) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre um método paginado item a item. A próxima página só é
+        buscada quando os itens da anterior já foram consumidos.
+        """
+        cursor: Optional[str] = None
+        while True:
+            message, _ = self._request_list(method, cursor)
+            if "error" in message:
+                raise MCPError(message["error"])
+
+            yield from message["result"][key]
+
+            cursor = message["result"].get("nextCursor")
+            if cursor is None:
+                return
+
+    def iter_tools(self) -> Iterator[Dict[str, Any]]:
+        return self._iter_pages("tools/list", "tools")
+
+    def iter_resources(self) -> Iterator[Dict[str, Any]]:
+        return self._iter_pages("resources/list", "resources")
 
     # -------------------------------------------------------------------------
     # Notificações assíncronas via GET /mcp (SSE)
     # -------------------------------------------------------------------------
 
-    def listen_notifications_via_get(self) -> None:
+    def listen_notifications_via_get(self, seconds: float = 2.0) -> None:
+        """
+        O stream GET fica aberto enquanto a sessão existir; o demo escuta
+        por alguns segundos e fecha.
+        """
         self._print_title("8) GET /mcp para notificações assíncronas (SSE)")
 
-        with self.client.stream(
-            "GET",
-            self.base_url,
-            headers={
-                "Accept": "text/event-stream",
-                **({"Mcp-Session-Id": self.session_id} if self.session_id else {}),
-            },
-        ) as response:
-            self._print_status(response.status_code)
-            if response.headers.get("Content-Type", "").startswith("text/event-stream"):
-                self._consume_sse_stream(response)
-            else:
-                console.print("[yellow]Resposta não é SSE.[/yellow]")
+        try:
+            with self.client.stream(
+                "GET",
+                self.base_url,
+                headers={
+                    "Accept": "text/event-stream",
+                    **({"Mcp-Session-Id": self.session_id} if self.session_id else {}),
+                },
+                timeout=httpx.Timeout(
+                    connect=DEFAULT_TIMEOUT.connect,
+                    read=seconds,
+                    write=DEFAULT_TIMEOUT.write,
+                    pool=DEFAULT_TIMEOUT.pool,
+                ),
+            ) as response:
+                self._print_status(response.status_code)
+                if response.headers.get("Content-Type", "").startswith("text/event-stream"):
+                    self._consume_sse_stream(response)
+                else:
+                    console.print("[yellow]Resposta não é SSE.[/yellow]")
+        except httpx.ReadTimeout:
+            console.print(f"[dim]Nenhuma notificação em {seconds:.0f}s; fechando o stream.[/dim]")
 
     # -------------------------------------------------------------------------
     # register_user + elicitation
@@ -314,7 +655,8 @@ class MCPClient:
             "POST",
             self.base_url,
             headers=self._headers(),
-            json=payload,
+            content=codec.dumps(payload),
+            extensions=rpc_extensions(payload),
         ) as response:
             self._print_status(response.status_code)
             if not response.headers.get("Content-Type", "").startswith(
@@ -323,24 +665,13 @@ class MCPClient:
                 console.print(
                     "[red]Resposta não é SSE, algo está incoerente com o demo.[/red]"
                 )
-                self._print_json_body(response.json())
+                self._print_json_body(codec.loads(response.read()))
                 return
 
             # Loop lendo eventos SSE até receber o resultado final da tool
-            for raw_line in response.iter_lines():
-                if not raw_line:
-                    continue
-
-                if isinstance(raw_line, (bytes, bytearray)):
-                    line = raw_line.decode("utf-8")
-                else:
-                    line = raw_line
-
-                if not line.startswith("data: "):
-                    continue
-
-                data_str = line[len("data: ") :]
-                payload = json.loads(data_str)
+            for data in self._iter_sse_data(response):
+                payload = codec.loads(data)
+                self._observe(payload)
 
                 console.print(
                     Panel.fit(
@@ -364,7 +695,7 @@ class MCPClient:
                     )
                     break
 
-    def _respond_to_elicitation(self, elic_id: int) -> None:
+    def _respond_to_elicitation(self, elic_id: Any) -> None:
         """
         Simula a interação do usuário respondendo à elicitation.
 
@@ -388,7 +719,8 @@ class MCPClient:
         response = self.client.post(
             self.base_url,
             headers=self._headers(),
-            json=response_payload,
+            content=codec.dumps(response_payload),
+            extensions=rpc_extensions(response_payload),
         )
         self._print_status(
             response.status_code,
@@ -396,6 +728,316 @@ class MCPClient:
         )
 
 
+ServerRequestHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+NotificationHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class AsyncMCPClient(BaseMCPClient):
+    """
+    Cliente MCP assíncrono para muitas chamadas concorrentes na mesma sessão.
+
+    Cada request vira uma task independente (submit), então centenas de
+    tools/call podem ficar em andamento ao mesmo tempo, reaproveitando as
+    conexões do pool do httpx.AsyncClient (e multiplexando em HTTP/2, se
+    http2=True e o pacote h2 estiver instalado).
+
+    Requests vindos do servidor no meio de um stream SSE (por exemplo,
+    elicitation/create) são respondidos por on_request; notifications vão
+    para on_notification.
+
+    Exemplo:
+
+        async with AsyncMCPClient() as client:
+            await client.initialize()
+            calls = [client.submit_tool_call("get_weather", {"location": city})
+                     for city in cities]
+            results = await asyncio.gather(*calls)
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://127.0.0.1:8000/mcp",
+        *,
+        http2: bool = False,
+        limits: httpx.Limits = DEFAULT_LIMITS,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        max_in_flight: int = 100,
+        on_request: Optional[ServerRequestHandler] = None,
+        on_notification: Optional[NotificationHandler] = None,
+        on_timing: Optional[TimingHook] = None,
+        compress: bool = True,
+    ) -> None:
+        super().__init__(base_url, on_timing, compress)
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            limits=limits,
+            timeout=timeout,
+            event_hooks=self.timer.async_hooks(),
+        )
+        self.on_request = on_request
+        self.on_notification = on_notification
+        # Requests em andamento, por id JSON-RPC
+        self.in_flight: Dict[int, asyncio.Task] = {}
+        # Limita os requests simultâneos para que esperem aqui, e não no pool
+        # do httpx (onde estourariam o pool timeout)
+        self._slots = asyncio.Semaphore(max_in_flight)
+        # Resources inscritos (resources/subscribe) e, entre eles, os que não
+        # mudaram desde a última leitura: esses nem vão ao servidor
+        self._subscribed_resources: Set[str] = set()
+        self._fresh_resources: Set[str] = set()
+        # notifications/resources/updated recebidas até agora, por URI
+        self._resource_updates: Dict[str, int] = {}
+
+    async def __aenter__(self) -> "AsyncMCPClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        for task in list(self.in_flight.values()):
+            task.cancel()
+        await self.client.aclose()
+
+    # -------------------------------------------------------------------------
+    # Requests
+    # -------------------------------------------------------------------------
+
+    def submit(self, method: str, params: Optional[Dict[str, Any]] = None) -> asyncio.Task:
+        """
+        Envia o request em background e devolve uma task com a response
+        JSON-RPC. A task fica em self.in_flight até terminar.
+        """
+        msg_id = self._new_id()
+        task = asyncio.create_task(self._send(msg_id, method, params))
+        self.in_flight[msg_id] = task
+        task.add_done_callback(lambda _: self.in_flight.pop(msg_id, None))
+        return task
+
+    async def request(
+        self, method: str, params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        return await self._send(self._new_id(), method, params)
+
+    async def notify(self, method: str, params: Optional[Dict[str, Any]] = None) -> None:
+        payload: Dict[str, Any] = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            payload["params"] = params
+        await self._post(payload)
+
+    async def _post(self, payload: Dict[str, Any]) -> httpx.Response:
+        return await self.client.post(
+            self.base_url,
+            headers=self._headers(),
+            content=codec.dumps(payload),
+            extensions=rpc_extensions(payload),
+        )
+
+    async def _send(
+        self, msg_id: int, method: str, params: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"jsonrpc": "2.0", "id": msg_id, "method": method}
+        if params is not None:
+            payload["params"] = params
+
+        async with self._slots:
+            async with self.client.stream(
+                "POST",
+                self.base_url,
+                headers=self._headers(),
+                content=codec.dumps(payload),
+                extensions=rpc_extensions(payload),
+            ) as response:
+                if method == "initialize":
+                    self.session_id = response.headers.get("Mcp-Session-Id")
+
+                if not response.headers.get("Content-Type", "").startswith(
+                    "text/event-stream"
+                ):
+                    return codec.loads(await response.aread())
+
+                async for message in self._aiter_sse(response):
+                    if message.get("id") == msg_id and "method" not in message:
+                        return message
+                    await self._handle_incoming(message)
+
+        raise MCPProtocolError(f"Stream encerrado sem response para o id {msg_id}")
+
+    async def listen_notifications(self) -> None:
+        """
+        Abre o stream GET /mcp e repassa cada notification para
+        on_notification (e requests do servidor para on_request) até o
+        servidor fechar o stream. Rode como task e cancele para parar.
+        """
+        async with self.client.stream(
+            "GET",
+            self.base_url,
+            headers={
+                "Accept": "text/event-stream",
+                **({"Mcp-Session-Id": self.session_id} if self.session_id else {}),
+            },
+        ) as response:
+            response.raise_for_status()
+            async for message in self._aiter_sse(response):
+                await self._handle_incoming(message)
+
+    async def _aiter_sse(self, response: httpx.Response) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Mensagens do stream SSE, retomando com Last-Event-ID se a conexão cair.
+        """
+        decoder = SSEDecoder()
+        resumed: Optional[httpx.Response] = None
+        attempts = 0
+        try:
+            while True:
+                try:
+                    async for chunk in response.aiter_bytes():
+                        attempts = 0
+                        for data in decoder.feed(chunk):
+                            yield codec.loads(data)
+                    return
+                except SSE_RESUMABLE_ERRORS:
+                    if decoder.last_event_id is None or attempts >= SSE_RESUME_ATTEMPTS:
+                        raise
+                attempts += 1
+                await asyncio.sleep(0.1 * attempts)
+                if resumed is not None:
+                    await resumed.aclose()
+                resumed = response = await self.client.send(
+                    self.client.build_request(
+                        "GET", self.base_url, headers=self._resume_headers(decoder.last_event_id)
+                    ),
+                    stream=True,
+                )
+                if response.status_code != 200:
+                    raise MCPProtocolError(
+                        f"Stream não pode ser retomado (HTTP {response.status_code})"
+                    )
+        finally:
+            if resumed is not None:
+                await resumed.aclose()
+
+    async def _handle_incoming(self, message: Dict[str, Any]) -> None:
+        """
+        Trata mensagens do servidor que não são a response esperada.
+        """
+        if "method" not in message:
+            return
+
+        if "id" not in message:
+            if message["method"] == "notifications/resources/updated":
+                uri = (message.get("params") or {}).get("uri")
+                self._fresh_resources.discard(uri)
+                self._resource_updates[uri] = self._resource_updates.get(uri, 0) + 1
+            if self.on_notification is not None:
+                await self.on_notification(message)
+            return
+
+        # Request do servidor (ex.: elicitation/create). A resposta vai em
+        # outro POST, fora do limite de in-flight: o stream atual depende dela.
+        if self.on_request is not None:
+            reply = {
+                "jsonrpc": "2.0",
+                "id": message["id"],
+                "result": await self.on_request(message),
+            }
+        else:
+            reply = {
+                "jsonrpc": "2.0",
+                "id": message["id"],
+                "error": {
+                    "code": -32601,
+                    "message": f"Method not supported by client: {message['method']}",
+                },
+            }
+        await self._post(reply)
+
+    # -------------------------------------------------------------------------
+    # Atalhos MCP
+    # -------------------------------------------------------------------------
+
+    async def initialize(self) -> Dict[str, Any]:
+        response = await self.request(
+            "initialize",
+            {
+                "protocolVersion": "2025-03-26",
+                "capabilities": {
+                    "roots": {"listChanged": True},
+                    "sampling": {},
+                    "elicitation": {},
+                },
+                "clientInfo": {
+                    "name": "ExampleAsyncClient",
+                    "version": "1.0.0",
+                },
+            },
+        )
+        await self.notify("notifications/initialized")
+        return response
+
+    async def list_tools(self, cursor: Optional[str] = None) -> Dict[str, Any]:
+        return await self.request("tools/list", {"cursor": cursor})
+
+    @staticmethod
+    def _tool_call_params(
+        name: str, arguments: Dict[str, Any], progress_token: Optional[Any]
+    ) -> Dict[str, Any]:
+        params: Dict[str, Any] = {"name": name, "arguments": arguments}
+        if progress_token is not None:
+            # O servidor manda notifications/progress com esse token (para
+            # on_notification)
+            params["_meta"] = {"progressToken": progress_token}
+        return params
+
+    async def call_tool(
+        self, name: str, arguments: Dict[str, Any], progress_token: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        return await self.request(
+            "tools/call", self._tool_call_params(name, arguments, progress_token)
+        )
+
+    def submit_tool_call(
+        self, name: str, arguments: Dict[str, Any], progress_token: Optional[Any] = None
+    ) -> asyncio.Task:
+        return self.submit("tools/call", self._tool_call_params(name, arguments, progress_token))
+
+    async def list_resources(self, cursor: Optional[str] = None) -> Dict[str, Any]:
+        return await self.request("resources/list", {"cursor": cursor})
+
+    async def read_resource(self, uri: str) -> Dict[str, Any]:
+        """
+        Lê o resource. Se a sessão está inscrita nele e nenhum
+        notifications/resources/updated chegou desde a última leitura, devolve
+        a versão guardada sem ir ao servidor (as notifications chegam por
+        listen_notifications, que precisa estar rodando).
+        """
+        if uri in self._fresh_resources and uri in self._resource_versions:
+            return self._resource_versions[uri]
+        cached = self._cached_resource(uri)
+        updates = self._resource_updates.get(uri, 0)
+        message = await self.request("resources/read", self._read_resource_params(uri, cached))
+        message = self._remember_resource(uri, message, cached)
+        # Se mudou de novo durante a leitura, a versão lida já pode estar velha
+        if (
+            uri in self._subscribed_resources
+            and "result" in message
+            and self._resource_updates.get(uri, 0) == updates
+        ):
+            self._fresh_resources.add(uri)
+        return message
+
+    async def subscribe_resource(self, uri: str) -> Dict[str, Any]:
+        response = await self.request("resources/subscribe", {"uri": uri})
+        if "result" in response:
+            self._subscribed_resources.add(uri)
+        return response
+
+    async def unsubscribe_resource(self, uri: str) -> Dict[str, Any]:
+        self._subscribed_resources.discard(uri)
+        self._fresh_resources.discard(uri)
+        return await self.request("resources/unsubscribe", {"uri": uri})
+
+
 def main() -> None:
     client = MCPClient()
 
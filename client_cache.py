@@ -0,0 +1,223 @@
+"""
+Cache de responses do lado do cliente (MCPClient).
+
+Guarda a response JSON-RPC inteira, já serializada, por (escopo, método,
+params). O escopo é o servidor e a sessão (Mcp-Session-Id): tools/list e
+resources/list dependem da sessão. Para resources/read o escopo é só o
+servidor, porque a leitura é sempre revalidada pelo ETag (ifNoneMatch): a
+versão guardada só é usada quando o servidor confirma que não mudou, e vale
+para qualquer sessão (inclusive de um processo anterior, pelo disco).
+
+- Em memória: LRU limitado por número de entradas e por bytes.
+- Em disco (opcional, directory): um arquivo por entrada, em um
+  subdiretório por método. Uma entrada que saiu da memória (ou de outro
+  processo) volta do disco; cada subdiretório guarda no máximo max_entries.
+- ttl: idade máxima de uma entrada (None: só a invalidação por notification).
+- observe recebe as notifications do servidor: list_changed descarta as
+  entradas do método correspondente, em todas as sessões.
+
+Os valores devolvidos são decodificados a cada get: quem recebe pode alterá-los
+sem mexer no cache.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import codec
+
+# notification -> métodos cujas responses ela invalida
+INVALIDATED_BY = {
+    "notifications/tools/list_changed": ("tools/list",),
+    "notifications/resources/list_changed": ("resources/list",),
+}
+
+
+def cache_key(scope: str, method: str, params: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(
+        [scope, method, params], sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+
+
+class ClientCache:
+    def __init__(
+        self,
+        max_entries: int = 256,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl: Optional[float] = 300.0,
+        directory: Optional[str] = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.directory = directory
+        # key -> (método, guardado em (time.time()), response serializada)
+        self._entries: "OrderedDict[str, Tuple[str, float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def get(
+        self, scope: str, method: str, params: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        key = cache_key(scope, method, params)
+        entry = self._entries.get(key)
+        if entry is None and self.directory is not None:
+            entry = self._load(key, method)
+            if entry is not None:
+                self.disk_hits += 1
+                self._remember(key, entry)
+        if entry is not None and self._expired(entry[1]):
+            self._forget(key, method)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return codec.loads(entry[2])
+
+    def put(
+        self,
+        scope: str,
+        method: str,
+        params: Optional[Dict[str, Any]],
+        message: Dict[str, Any],
+    ) -> None:
+        data = codec.dumps(message)
+        if len(data) > self.max_bytes:
+            return
+        key = cache_key(scope, method, params)
+        entry = (method, time.time(), data)
+        self._remember(key, entry)
+        if self.directory is not None:
+            self._store(key, entry)
+
+    def _remember(self, key: str, entry: Tuple[str, float, bytes]) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous[2])
+        self._entries[key] = entry
+        self._bytes += len(entry[2])
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, _, old) = self._entries.popitem(last=False)
+            self._bytes -= len(old)
+
+    def _forget(self, key: str, method: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[2])
+        if self.directory is not None:
+            try:
+                os.remove(self._path(key, method))
+            except FileNotFoundError:
+                pass
+
+    def invalidate(self, method: str) -> int:
+        """
+        Descarta as entradas de method (memória e disco). Devolve quantas
+        saíram da memória.
+        """
+        keys = [key for key, entry in self._entries.items() if entry[0] == method]
+        for key in keys:
+            self._bytes -= len(self._entries.pop(key)[2])
+        if self.directory is not None:
+            for path in self._files(method):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        self.invalidations += 1
+        return len(keys)
+
+    def observe(self, message: Dict[str, Any]) -> None:
+        """
+        Notification recebida do servidor (em qualquer stream SSE).
+        """
+        for method in INVALIDATED_BY.get(message.get("method"), ()):
+            self.invalidate(method)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+        if self.directory is None or not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            for path in self._files(name):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+    # -------------------------------------------------------------------------
+    # Disco
+    # -------------------------------------------------------------------------
+
+    def _method_dir(self, method: str) -> str:
+        return os.path.join(self.directory, method.replace("/", "_"))
+
+    def _path(self, key: str, method: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self._method_dir(method), f"{digest}.json")
+
+    def _files(self, method: str) -> List[str]:
+        try:
+            with os.scandir(self._method_dir(method)) as entries:
+                return [entry.path for entry in entries if entry.name.endswith(".json")]
+        except FileNotFoundError:
+            return []
+
+    def _load(self, key: str, method: str) -> Optional[Tuple[str, float, bytes]]:
+        try:
+            with open(self._path(key, method), "rb") as f:
+                record = codec.loads(f.read())
+        except (FileNotFoundError, *codec.DecodeError):
+            return None
+        # Colisão de hash (ou arquivo de outra versão): não é esta entrada
+        if record.get("key") != key:
+            return None
+        return method, record["storedAt"], codec.dumps(record["message"])
+
+    def _store(self, key: str, entry: Tuple[str, float, bytes]) -> None:
+        method, stored_at, data = entry
+        path = self._path(key, method)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        record = (
+            b'{"key":' + codec.dumps(key) + b',"storedAt":' + codec.dumps(stored_at)
+            + b',"message":' + data + b"}"
+        )
+        # Escreve e renomeia: um leitor nunca vê o arquivo pela metade
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(record)
+        os.replace(temporary, path)
+
+        files = self._files(method)
+        if len(files) > self.max_entries:
+            files.sort(key=os.path.getmtime)
+            for old in files[: len(files) - self.max_entries]:
+                try:
+                    os.remove(old)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,106 @@
+"""
+Codec JSON compartilhado entre server.py e client.py.
+
+Usa orjson ou msgspec quando estão instalados e cai para o json da stdlib
+caso contrário. Todos os backends trabalham direto com bytes (UTF-8), que é
+o que vai para o socket, evitando a cópia intermediária str -> bytes.
+
+O backend pode ser forçado com a variável de ambiente MCP_JSON_CODEC
+("orjson", "msgspec" ou "json").
+"""
+
+import json
+import os
+from typing import Any, Callable, Dict, Tuple, Type, Union
+
+
+class Codec:
+    """
+    Par dumps/loads de um backend JSON.
+
+    - dumps(value) -> bytes (JSON compacto, UTF-8, sem escapar não-ASCII)
+    - loads(bytes | str) -> value
+    - decode_errors: exceções lançadas por loads com JSON inválido
+    """
+
+    def __init__(
+        self,
+        name: str,
+        dumps: Callable[[Any], bytes],
+        loads: Callable[[Union[bytes, str]], Any],
+        decode_errors: Tuple[Type[BaseException], ...],
+    ) -> None:
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+        self.decode_errors = decode_errors
+
+
+def _stdlib_codec() -> Codec:
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def dumps(value: Any) -> bytes:
+        return encoder.encode(value).encode("utf-8")
+
+    return Codec("json", dumps, json.loads, (ValueError,))
+
+
+def _orjson_codec() -> Codec:
+    import orjson
+
+    return Codec("orjson", orjson.dumps, orjson.loads, (orjson.JSONDecodeError,))
+
+
+def _msgspec_codec() -> Codec:
+    import msgspec
+
+    encoder = msgspec.json.Encoder()
+    decoder = msgspec.json.Decoder()
+    return Codec(
+        "msgspec",
+        encoder.encode,
+        decoder.decode,
+        (msgspec.DecodeError,),
+    )
+
+
+# Em ordem de preferência
+_FACTORIES: Dict[str, Callable[[], Codec]] = {
+    "orjson": _orjson_codec,
+    "msgspec": _msgspec_codec,
+    "json": _stdlib_codec,
+}
+
+
+def available_codecs() -> Dict[str, Codec]:
+    """
+    Todos os backends que podem ser carregados neste ambiente.
+    """
+    codecs: Dict[str, Codec] = {}
+    for name, factory in _FACTORIES.items():
+        try:
+            codecs[name] = factory()
+        except ImportError:
+            continue
+    return codecs
+
+
+def get_codec(name: str = "") -> Codec:
+    """
+    Devolve o backend pedido ou, sem nome, o mais rápido disponível.
+    """
+    if name:
+        return _FACTORIES[name]()
+    for factory in _FACTORIES.values():
+        try:
+            return factory()
+        except ImportError:
+            continue
+    raise RuntimeError("unreachable: json da stdlib sempre está disponível")
+
+
+codec = get_codec(os.environ.get("MCP_JSON_CODEC", ""))
+
+dumps = codec.dumps
+loads = codec.loads
+DecodeError = codec.decode_errors
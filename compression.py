@@ -0,0 +1,239 @@
+"""
+Compressão das respostas HTTP, compartilhada entre server.py e client.py.
+
+gzip sempre está disponível (zlib); zstd e br entram quando zstandard e
+brotli estão instalados (as mesmas bibliotecas que o httpx usa para
+descomprimir).
+
+- negotiate escolhe, pelo Accept-Encoding, a melhor codificação que as duas
+  pontas suportam (preferência: zstd, br, gzip).
+- compress comprime um corpo inteiro.
+- prefixed comprime uma vez o começo fixo de corpos que só mudam no final
+  (as respostas em cache do servidor, em que só o id muda).
+- compress_chunks / compress_async_chunks comprimem um stream. Com
+  flush_each, cada chunk sai comprimido por inteiro na hora (sync flush),
+  para que eventos SSE não fiquem presos no buffer do compressor; sem ele, o
+  compressor acumula e a taxa de compressão é melhor.
+
+Os níveis são baixos de propósito: o ganho de banda dos níveis altos não
+compensa o custo de CPU por request.
+"""
+
+import struct
+import zlib
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+# Cabeçalho gzip mínimo (RFC 1952): deflate, sem flags nem mtime, SO
+# desconhecido
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+
+class StreamCompressor:
+    """
+    compress(data) -> bytes, flush() -> bytes (tudo o que entrou até agora,
+    decodificável), finish() -> bytes (fim do stream).
+    """
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def flush(self) -> bytes:
+        raise NotImplementedError
+
+    def finish(self) -> bytes:
+        raise NotImplementedError
+
+
+class GzipCompressor(StreamCompressor):
+    __slots__ = ("_z",)
+
+    def __init__(self) -> None:
+        # wbits 31: formato gzip (cabeçalho + CRC), não zlib puro
+        self._z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._z.compress(data)
+
+    def flush(self) -> bytes:
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor(StreamCompressor):
+    __slots__ = ("_c",)
+
+    def __init__(self) -> None:
+        self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+class ZstdCompressor(StreamCompressor):
+    __slots__ = ("_c",)
+
+    def __init__(self) -> None:
+        self._c = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+def _available() -> Dict[str, Callable[[], StreamCompressor]]:
+    # Em ordem de preferência
+    encoders: Dict[str, Callable[[], StreamCompressor]] = {}
+    if zstandard is not None:
+        encoders["zstd"] = ZstdCompressor
+    if brotli is not None:
+        encoders["br"] = BrotliCompressor
+    encoders["gzip"] = GzipCompressor
+    return encoders
+
+
+ENCODERS = _available()
+
+
+def available() -> List[str]:
+    return list(ENCODERS)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """
+    "gzip, br;q=0.8, *;q=0" -> {"gzip": 1.0, "br": 0.8, "*": 0.0}
+    """
+    accepted: Dict[str, float] = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def negotiate(header: Optional[str], allowed: Sequence[str] = ()) -> Optional[str]:
+    """
+    Codificação a usar para o Accept-Encoding header (None: sem compressão).
+    allowed restringe as codificações do servidor (vazio: todas as
+    disponíveis). Em empate de q, vale a ordem de preferência.
+    """
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best: Optional[str] = None
+    best_q = 0.0
+    for name in ENCODERS:
+        if allowed and name not in allowed:
+            continue
+        q = accepted.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compress(encoding: str, data: bytes) -> bytes:
+    compressor = ENCODERS[encoding]()
+    return compressor.compress(data) + compressor.finish()
+
+
+def prefixed(encoding: str, prefix: bytes) -> Optional[Callable[[bytes], bytes]]:
+    """
+    Comprime prefix uma vez e devolve finish(tail) -> o corpo prefix + tail
+    comprimido, pagando por request só a compressão de tail. Só bytes ficam
+    guardados (nenhum compressor vivo). None se a codificação não permite
+    (br: um stream brotli não pode ser emendado).
+
+    - gzip: o deflate de prefix termina em sync flush (sem o bloco final);
+      tail vira os últimos blocos, em um deflate à parte, e o trailer usa o
+      CRC-32 de prefix como ponto de partida;
+    - zstd: tail vai em um frame próprio, emendado ao de prefix (frames
+      concatenados formam um stream válido, RFC 8878).
+    """
+    if encoding == "gzip":
+        z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+        head = GZIP_HEADER + z.compress(prefix) + z.flush(zlib.Z_SYNC_FLUSH)
+        crc = zlib.crc32(prefix)
+
+        def finish_gzip(tail: bytes) -> bytes:
+            # tail é curto: janela e memória mínimas
+            z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, -9, 1)
+            size = (len(prefix) + len(tail)) & 0xFFFFFFFF
+            return (
+                head + z.compress(tail) + z.flush()
+                + struct.pack("<II", zlib.crc32(tail, crc), size)
+            )
+
+        return finish_gzip
+    if encoding == "zstd" and zstandard is not None:
+        head = compress(encoding, prefix)
+        return lambda tail: head + compress(encoding, tail)
+    return None
+
+
+def compress_chunks(
+    encoding: str, chunks: Iterable[bytes], flush_each: bool = False
+) -> Iterator[bytes]:
+    compressor = ENCODERS[encoding]()
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if flush_each:
+            out += compressor.flush()
+        if out:
+            yield out
+    yield compressor.finish()
+
+
+async def compress_async_chunks(
+    encoding: str, chunks: AsyncIterator[bytes], flush_each: bool = False
+) -> AsyncIterator[bytes]:
+    compressor = ENCODERS[encoding]()
+    try:
+        async for chunk in chunks:
+            out = compressor.compress(chunk)
+            if flush_each:
+                out += compressor.flush()
+            if out:
+                yield out
+        yield compressor.finish()
+    finally:
+        # Conexão encerrada no meio: fecha o stream de origem já
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
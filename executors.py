@@ -0,0 +1,105 @@
+"""
+Execução de tools fora do event loop.
+
+Uma tool CPU-bound ou bloqueante rodando direto no event loop trava todas
+as sessões (inclusive os streams SSE). Tools registradas com
+execution="thread" ou execution="process" são funções síncronas executadas
+aqui:
+
+- "thread": ThreadPoolExecutor, para código bloqueante (I/O, bibliotecas
+  que liberam o GIL).
+- "process": ProcessPoolExecutor, para CPU pura (usa todos os cores). A
+  função e os argumentos precisam ser picklable (função de módulo).
+
+Os pools são criados só no primeiro uso. Se um worker do pool de processos
+morre (crash, OOM kill), o pool fica quebrado (BrokenProcessPool): ele é
+descartado e o próximo uso cria outro.
+
+Cancelamento: um pedido cancelado antes de começar nunca roda. Depois de
+começar, só funções em thread que recebem o parâmetro cancelled (um
+threading.Event) podem parar no meio; em processo, o trabalho vai até o fim
+e o resultado é descartado.
+"""
+
+import asyncio
+import inspect
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+EXECUTION_MODES = ("async", "thread", "process")
+
+
+def accepts_cancel_event(fn: Callable[..., Any]) -> bool:
+    return "cancelled" in inspect.signature(fn).parameters
+
+
+class ToolExecutor:
+    def __init__(
+        self,
+        thread_workers: Optional[int] = None,
+        process_workers: Optional[int] = None,
+    ) -> None:
+        cpus = os.cpu_count() or 1
+        self.thread_workers = thread_workers or min(32, cpus + 4)
+        self.process_workers = process_workers or cpus
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self, mode: str) -> Executor:
+        if mode == "thread":
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(
+                    self.thread_workers, thread_name_prefix="mcp-tool"
+                )
+            return self._threads
+        if mode == "process":
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(self.process_workers)
+            return self._processes
+        raise ValueError(f"Unknown execution mode: {mode}")
+
+    async def run(self, mode: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Executa fn(*args) no pool de mode. Cancelar a chamada cancela o
+        trabalho que ainda não começou e, em thread, sinaliza cancelled.
+        """
+        cancelled: Optional[threading.Event] = None
+        kwargs: Dict[str, Any] = {}
+        if mode == "thread" and accepts_cancel_event(fn):
+            cancelled = threading.Event()
+            kwargs["cancelled"] = cancelled
+        pool = self._pool(mode)
+        try:
+            future = pool.submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            # Quebrou depois da última chamada: esta já vai para um pool novo
+            self._discard(pool)
+            pool = self._pool(mode)
+            future = pool.submit(fn, *args, **kwargs)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # O worker morreu durante esta chamada: ela falha, as próximas não
+            self._discard(pool)
+            raise
+        except asyncio.CancelledError:
+            # wrap_future já cancela o future; se ele já estava rodando, só
+            # resta avisar a função (quando ela aceita)
+            if cancelled is not None:
+                cancelled.set()
+            raise
+
+    def _discard(self, pool: Executor) -> None:
+        if self._processes is pool:
+            self._processes = None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = None
+        self._processes = None
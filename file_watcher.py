@@ -0,0 +1,155 @@
+"""
+Detecção de mudanças nos arquivos dos resources.
+
+- Com watchfiles instalado (vem com uvicorn[standard]), usa os eventos do
+  sistema operacional (inotify, FSEvents, ...): nada é lido enquanto nada
+  muda. Os diretórios dos arquivos observados são vigiados sem recursão.
+- Sem ele (ou com backend="poll"), faz polling com os.stat só dos arquivos
+  observados.
+
+Mudanças em rajada (um editor salvando em várias escritas, uma cópia
+grande) são agrupadas: depois da primeira, esperamos debounce segundos
+juntando as seguintes e entregamos o conjunto de caminhos de uma vez.
+"""
+
+import asyncio
+import os
+from typing import Callable, Dict, Optional, Set, Tuple
+
+try:
+    import watchfiles
+except ImportError:
+    watchfiles = None
+
+ChangeHandler = Callable[[Set[str]], None]
+
+# (st_size, st_mtime_ns), ou None se o arquivo não existe
+FileStat = Optional[Tuple[int, int]]
+
+
+def _stat(path: str) -> FileStat:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+class FileWatcher:
+    def __init__(
+        self,
+        on_change: ChangeHandler,
+        debounce: float = 0.2,
+        poll_interval: float = 1.0,
+        backend: str = "",
+    ) -> None:
+        """
+        backend: "watchfiles", "poll" ou "" (watchfiles se estiver instalado).
+        """
+        if backend == "watchfiles" and watchfiles is None:
+            raise RuntimeError("watchfiles is not installed")
+        self.on_change = on_change
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.backend = backend or ("watchfiles" if watchfiles is not None else "poll")
+        # Caminho absoluto -> quantos interessados
+        self._paths: Dict[str, int] = {}
+        self._stats: Dict[str, FileStat] = {}
+        self._pending: Set[str] = set()
+        self._flush: Optional[asyncio.TimerHandle] = None
+        # Avisa o loop do watchfiles que o conjunto de diretórios mudou
+        self._dirs_changed = asyncio.Event()
+
+    def __contains__(self, path: object) -> bool:
+        return path in self._paths
+
+    def watch(self, path: str) -> None:
+        path = os.path.abspath(path)
+        count = self._paths.get(path, 0)
+        self._paths[path] = count + 1
+        if count:
+            return
+        directory = os.path.dirname(path)
+        if not any(os.path.dirname(p) == directory for p in self._paths if p != path):
+            self._dirs_changed.set()
+        self._stats[path] = _stat(path)
+
+    def unwatch(self, path: str) -> None:
+        path = os.path.abspath(path)
+        count = self._paths.get(path, 0)
+        if count > 1:
+            self._paths[path] = count - 1
+        elif count == 1:
+            del self._paths[path]
+            del self._stats[path]
+            self._pending.discard(path)
+
+    async def run(self) -> None:
+        try:
+            if self.backend == "watchfiles":
+                await self._run_watchfiles()
+            else:
+                await self._run_polling()
+        finally:
+            if self._flush is not None:
+                self._flush.cancel()
+                self._flush = None
+
+    def _report(self, paths: Set[str]) -> None:
+        self._pending |= paths
+        if self._pending and self._flush is None:
+            loop = asyncio.get_running_loop()
+            self._flush = loop.call_later(self.debounce, self._deliver)
+
+    def _deliver(self) -> None:
+        self._flush = None
+        # Só o que de fato mudou desde a última entrega (stat diferente)
+        changed = set()
+        for path in self._pending:
+            if path not in self._paths:
+                continue
+            current = _stat(path)
+            if current != self._stats.get(path):
+                self._stats[path] = current
+                changed.add(path)
+        self._pending.clear()
+        if changed:
+            self.on_change(changed)
+
+    async def _run_polling(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            changed = {
+                path for path, last in self._stats.items() if _stat(path) != last
+            }
+            if changed:
+                self._report(changed)
+
+    async def _run_watchfiles(self) -> None:
+        while True:
+            self._dirs_changed.clear()
+            directories = {os.path.dirname(path) for path in self._paths}
+            if not directories:
+                await self._dirs_changed.wait()
+                continue
+
+            stop = asyncio.Event()
+
+            async def stop_on_new_directory() -> None:
+                await self._dirs_changed.wait()
+                stop.set()
+
+            restart = asyncio.create_task(stop_on_new_directory())
+            try:
+                async for changes in watchfiles.awatch(
+                    *directories, stop_event=stop, recursive=False
+                ):
+                    self._report(
+                        {
+                            path
+                            for path in (os.path.abspath(p) for _, p in changes)
+                            if path in self._paths
+                        }
+                    )
+            finally:
+                restart.cancel()
@@ -0,0 +1,181 @@
+"""
+Métricas no formato texto do Prometheus, sem dependências.
+
+Feito para o caminho quente: observar um valor é uma busca binária nos
+limites dos buckets e dois incrementos (bem abaixo de 1 µs), sem locks (tudo
+roda no event loop). Valores que já existem em outro lugar (sessões ativas,
+streams abertos, fila do admission) não são contados à parte: são gauges
+calculados só na hora do scrape.
+
+Cada métrica tem no máximo um label (o método, a tool, ...).
+"""
+
+import bisect
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+# Segundos: de 100 µs a 10 s
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# Segundos: de 1 µs a 100 ms (serializar / desserializar JSON)
+CODEC_BUCKETS = (
+    0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005,
+    0.0001, 0.00025, 0.0005, 0.001, 0.01, 0.1,
+)
+
+GaugeValue = Union[float, Dict[str, float]]
+
+
+def _label(name: Optional[str], value: Optional[str], extra: str = "") -> str:
+    pairs = []
+    if name is not None and value is not None:
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Counter:
+    __slots__ = ("name", "help", "label", "values")
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None) -> None:
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values: Dict[Optional[str], float] = {}
+
+    def inc(self, label_value: Optional[str] = None, amount: float = 1.0) -> None:
+        values = self.values
+        values[label_value] = values.get(label_value, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for value, total in self.values.items():
+            lines.append(f"{self.name}{_label(self.label, value)} {_number(total)}")
+        return lines
+
+
+class Histogram:
+    __slots__ = ("name", "help", "label", "buckets", "series")
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        label: Optional[str] = None,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        # label -> [contagem por bucket (+Inf no fim)..., soma]
+        self.series: Dict[Optional[str], List[float]] = {}
+
+    def observe(self, value: float, label_value: Optional[str] = None) -> None:
+        series = self.series.get(label_value)
+        if series is None:
+            series = self.series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def snapshot(self) -> Dict[Optional[str], Tuple[int, float]]:
+        """
+        (quantidade, soma) por label.
+        """
+        return {label: (sum(s[:-1]), s[-1]) for label, s in self.series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for value, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _label(self.label, value, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            inf = _label(self.label, value, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {cumulative}")
+            lines.append(f"{self.name}_sum{_label(self.label, value)} {series[-1]!r}")
+            lines.append(f"{self.name}_count{_label(self.label, value)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """
+    Valor lido na hora do scrape: fn devolve um número ou, com label, um
+    dict valor do label -> número.
+    """
+
+    __slots__ = ("name", "help", "label", "fn", "kind")
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        fn: Callable[[], GaugeValue],
+        label: Optional[str] = None,
+        kind: str = "gauge",
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.label = label
+        self.fn = fn
+        # "counter" para totais que já são contados em outro lugar
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        value = self.fn()
+        if isinstance(value, dict):
+            for label_value, number in value.items():
+                lines.append(f"{self.name}{_label(self.label, label_value)} {_number(number)}")
+        else:
+            lines.append(f"{self.name} {_number(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[Union[Counter, Histogram, Gauge]] = []
+
+    def counter(self, name: str, help: str, label: Optional[str] = None) -> Counter:
+        metric = Counter(name, help, label)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        label: Optional[str] = None,
+    ) -> Histogram:
+        metric = Histogram(name, help, buckets, label)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        fn: Callable[[], GaugeValue],
+        label: Optional[str] = None,
+        kind: str = "gauge",
+    ) -> Gauge:
+        metric = Gauge(name, help, fn, label, kind)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,169 @@
+"""
+Hub de notifications servidor -> cliente (streams GET /mcp).
+
+Cada stream GET de uma sessão é uma Subscription com uma fila limitada.
+publish() serializa a notification uma vez e entrega os mesmos bytes a todos
+os interessados (todas as sessões ou só algumas).
+
+Cliente lento não segura o servidor: a fila nunca bloqueia quem publica.
+
+- Notifications "de estado" (list_changed, resources/updated da mesma URI,
+  progress do mesmo token) são coalescidas: se já há uma pendente com a mesma
+  chave, ela é substituída pela mais nova, sem ocupar outro lugar na fila.
+- As demais (logs, por exemplo) entram no fim; com a fila cheia, a mais
+  antiga é descartada e contada em dropped.
+
+Um stream parado custa só a Subscription (fila vazia + um asyncio.Event):
+não há task por assinante.
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, List, Optional, Set
+
+Encoder = Callable[[Dict[str, Any]], bytes]
+
+
+def coalesce_key(message: Dict[str, Any]) -> Optional[Hashable]:
+    """
+    Chave de coalescência da notification, ou None se cada uma importa.
+    """
+    method = message.get("method", "")
+    if method.endswith("/list_changed"):
+        return method
+    params = message.get("params") or {}
+    if method == "notifications/resources/updated":
+        return (method, params.get("uri"))
+    if method == "notifications/progress":
+        return (method, params.get("progressToken"))
+    return None
+
+
+class Subscription:
+    """
+    Fila de eventos SSE (já serializados) de um stream GET.
+    """
+
+    __slots__ = ("session_id", "maxsize", "closed", "dropped", "_events", "_by_key", "_wakeup")
+
+    def __init__(self, session_id: str, maxsize: int) -> None:
+        self.session_id = session_id
+        self.maxsize = maxsize
+        self.closed = False
+        self.dropped = 0
+        # Cada entrada é [chave, bytes]: lista para a coalescência trocar os
+        # bytes sem mudar a posição na fila
+        self._events: Deque[List[Any]] = deque()
+        self._by_key: Dict[Hashable, List[Any]] = {}
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def push(self, key: Optional[Hashable], event: bytes) -> None:
+        if key is not None:
+            pending = self._by_key.get(key)
+            if pending is not None:
+                pending[1] = event
+                return
+
+        if len(self._events) >= self.maxsize:
+            old_key, _ = self._events.popleft()
+            if old_key is not None:
+                del self._by_key[old_key]
+            self.dropped += 1
+
+        entry = [key, event]
+        self._events.append(entry)
+        if key is not None:
+            self._by_key[key] = entry
+        self._wakeup.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._wakeup.set()
+
+    async def get(self, timeout: float) -> List[bytes]:
+        """
+        Espera até timeout segundos e devolve todos os eventos pendentes
+        (lista vazia se não chegou nada ou se a subscription foi fechada).
+        """
+        if not self._events and not self.closed:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+
+        events = [event for _, event in self._events]
+        self._events.clear()
+        self._by_key.clear()
+        return events
+
+
+class NotificationHub:
+    def __init__(self, encode: Encoder, queue_size: int = 256) -> None:
+        self.encode = encode
+        self.queue_size = queue_size
+        self._by_session: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+
+    def subscribe(self, session_id: str) -> Subscription:
+        subscription = Subscription(session_id, self.queue_size)
+        self._by_session.setdefault(session_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.close()
+        subscriptions = self._by_session.get(subscription.session_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._by_session[subscription.session_id]
+
+    def close_session(self, session_id: str) -> None:
+        """
+        Encerra os streams GET da sessão (por exemplo, depois do DELETE).
+        """
+        for subscription in self._by_session.pop(session_id, ()):
+            subscription.close()
+
+    def close(self) -> None:
+        for session_id in list(self._by_session):
+            self.close_session(session_id)
+
+    def publish(
+        self,
+        message: Dict[str, Any],
+        session_ids: Optional[Iterable[str]] = None,
+    ) -> int:
+        """
+        Entrega message aos streams de session_ids (todas as sessões se None).
+        Devolve a quantos streams foi entregue.
+        """
+        if session_ids is None:
+            targets: Iterable[Set[Subscription]] = list(self._by_session.values())
+        else:
+            targets = [self._by_session[sid] for sid in session_ids if sid in self._by_session]
+
+        event: Optional[bytes] = None
+        key = coalesce_key(message)
+        delivered = 0
+        for subscriptions in targets:
+            for subscription in subscriptions:
+                if event is None:
+                    event = self.encode(message)
+                subscription.push(key, event)
+                delivered += 1
+        self.published += 1
+        return delivered
+
+    def stats(self) -> Dict[str, int]:
+        subscriptions = [s for subs in self._by_session.values() for s in subs]
+        return {
+            "sessions": len(self._by_session),
+            "subscriptions": len(subscriptions),
+            "pending": sum(len(s) for s in subscriptions),
+            "dropped": sum(s.dropped for s in subscriptions),
+            "published": self.published,
+        }
@@ -0,0 +1,175 @@
+"""
+Aplicação ASGI enxuta, alternativa ao FastAPI para o /mcp.
+
+Os handlers do servidor são os mesmos; o que sai do caminho é o framework:
+middlewares, roteamento com dependências, o Request completo e, nas
+respostas em stream, o task group do StreamingResponse. Aqui:
+
+- a rota é um lookup em dict por (método HTTP, path);
+- o corpo é lido direto do receive, em bytes;
+- o Response devolvido pelo handler não é executado como app ASGI: seus
+  headers e bytes (ou os chunks, em stream) vão direto para o send.
+
+Os handlers recebem um RawRequest, que tem só o que eles usam do Request do
+Starlette (headers, client, stream()).
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from starlette.datastructures import Address, Headers
+from starlette.requests import ClientDisconnect
+from starlette.responses import Response, StreamingResponse
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+Handler = Callable[["RawRequest"], Awaitable[Response]]
+Lifespan = Callable[[Any], Any]
+
+
+class RawRequest:
+    __slots__ = ("scope", "_receive", "_headers")
+
+    def __init__(self, scope: Scope, receive: Receive) -> None:
+        self.scope = scope
+        self._receive = receive
+        self._headers: Optional[Headers] = None
+
+    @property
+    def headers(self) -> Headers:
+        if self._headers is None:
+            self._headers = Headers(scope=self.scope)
+        return self._headers
+
+    @property
+    def client(self) -> Optional[Address]:
+        client = self.scope.get("client")
+        return Address(*client) if client is not None else None
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        while True:
+            message = await self._receive()
+            if message["type"] == "http.disconnect":
+                raise ClientDisconnect()
+            chunk = message.get("body", b"")
+            if chunk:
+                yield chunk
+            if not message.get("more_body", False):
+                return
+
+
+class RawASGIApp:
+    def __init__(
+        self,
+        routes: Dict[Tuple[str, str], Handler],
+        lifespan: Optional[Lifespan] = None,
+    ) -> None:
+        """
+        routes: (método HTTP, path) -> handler. lifespan: o mesmo context
+        manager assíncrono usado no FastAPI (recebe a app).
+        """
+        self.routes = routes
+        self.lifespan = lifespan
+        self._paths = {path for _, path in routes}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        kind = scope["type"]
+        if kind == "http":
+            await self.handle_http(scope, receive, send)
+        elif kind == "lifespan":
+            await self.handle_lifespan(receive, send)
+
+    async def handle_http(self, scope: Scope, receive: Receive, send: Send) -> None:
+        handler = self.routes.get((scope["method"], scope["path"]))
+        if handler is None:
+            status = 405 if scope["path"] in self._paths else 404
+            await send_response(Response(status_code=status), receive, send)
+            return
+        try:
+            response = await handler(RawRequest(scope, receive))
+        except ClientDisconnect:
+            return
+        await send_response(response, receive, send)
+
+    async def handle_lifespan(self, receive: Receive, send: Send) -> None:
+        await receive()  # lifespan.startup
+        context = self.lifespan(self) if self.lifespan is not None else None
+        try:
+            if context is not None:
+                await context.__aenter__()
+        except BaseException as exc:
+            await send({"type": "lifespan.startup.failed", "message": str(exc)})
+            raise
+        await send({"type": "lifespan.startup.complete"})
+        await receive()  # lifespan.shutdown
+        if context is not None:
+            await context.__aexit__(None, None, None)
+        await send({"type": "lifespan.shutdown.complete"})
+
+
+async def send_response(response: Response, receive: Receive, send: Send) -> None:
+    """
+    Envia response sem executá-lo como app ASGI. O background do response
+    roda mesmo se o envio falhar (cliente que desconectou antes do corpo).
+    """
+    start = {
+        "type": "http.response.start",
+        "status": response.status_code,
+        "headers": response.raw_headers,
+    }
+    try:
+        if isinstance(response, StreamingResponse):
+            await send_stream(response.body_iterator, receive, send, start)
+        else:
+            await send(start)
+            await send({"type": "http.response.body", "body": response.body})
+    finally:
+        if response.background is not None:
+            await response.background()
+
+
+async def send_stream(
+    chunks: AsyncIterator[Any],
+    receive: Receive,
+    send: Send,
+    start: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Envia os chunks à medida que ficam prontos. Se o cliente desconectar, o
+    envio é interrompido na hora (mesmo com o stream parado esperando
+    notificações), como no StreamingResponse. start: o http.response.start,
+    enviado antes dos chunks; se ele falhar, os chunks também são fechados.
+    """
+    current = asyncio.current_task()
+    disconnected = False
+
+    async def watch_disconnect() -> None:
+        nonlocal disconnected
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        disconnected = True
+        current.cancel()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        if start is not None:
+            await send(start)
+        async for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+    except asyncio.CancelledError:
+        if not disconnected:
+            raise
+        # Task.uncancel() só existe a partir do 3.11; no 3.10 não há contagem
+        # de cancelamentos a desfazer
+        uncancel = getattr(current, "uncancel", None)
+        if uncancel is not None:
+            uncancel()
+    finally:
+        watcher.cancel()
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,241 @@
+"""
+Streams SSE retomáveis (Last-Event-ID).
+
+Cada stream SSE (a resposta em streaming de um POST ou um GET /mcp) ganha
+um id, e cada evento um id "<stream>-<seq>". Os eventos enviados ficam em um
+ring buffer limitado por número de eventos e por bytes; se a conexão cair,
+o cliente abre um GET /mcp com Last-Event-ID e recebe o que perdeu, e o
+stream continua de onde parou.
+
+max_events e max_bytes são limites rígidos: um leitor parado não segura
+memória, os eventos mais antigos saem mesmo sem terem sido entregues (e ele
+recomeça no próximo evento inteiro, como em uma retomada tardia). Para que
+isso não aconteça com um leitor que só está devagar, o produtor espera
+(wait_for_room) enquanto o que falta entregar passa de max_events eventos ou
+de metade de max_bytes.
+
+Quem produz os eventos não depende da conexão: uma tool em streaming segue
+rodando enquanto o cliente reconecta, sem refazer o trabalho. Um stream sem
+leitor por mais de ttl segundos é descartado (e o produtor, cancelado).
+"""
+
+import asyncio
+import itertools
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+Event = Tuple[int, bytes]
+
+
+def parse_event_id(event_id: str) -> Optional[Tuple[str, int]]:
+    stream_id, _, seq = event_id.rpartition("-")
+    if not stream_id or not seq.isdigit():
+        return None
+    return stream_id, int(seq)
+
+
+class ReplayStream:
+    __slots__ = (
+        "id",
+        "session_id",
+        "max_events",
+        "max_bytes",
+        "source",
+        "error",
+        "done",
+        "readers",
+        "touched",
+        "next_seq",
+        "delivered",
+        "_events",
+        "_in_event",
+        "_size",
+        "_pending",
+        "_new_data",
+        "_room",
+    )
+
+    def __init__(self, session_id: str, max_events: int, max_bytes: int) -> None:
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        # O que produz os eventos: a task do POST ou a Subscription do GET
+        self.source: Any = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.readers = 0
+        self.touched = time.monotonic()
+        self.next_seq = 0
+        # Maior seq já entregue a um leitor
+        self.delivered = -1
+        # (seq, bytes, começa um evento)
+        self._events: Deque[Tuple[int, bytes, bool]] = deque()
+        self._in_event = False
+        self._size = 0
+        # Bytes ainda não entregues (seq > delivered)
+        self._pending = 0
+        self._new_data = asyncio.Event()
+        self._room = asyncio.Event()
+
+    def append(self, data: bytes, end: bool = True) -> None:
+        """
+        Registra um evento SSE (b"data: ...\\n\\n"), acrescentando o id.
+
+        Um evento grande pode chegar aos pedaços (linhas "data:" de um
+        resultado em streaming): cada pedaço ocupa um seq, mas só o último
+        (end=True) leva o id, então o Last-Event-ID sempre aponta para o fim
+        de um evento e a retomada recomeça no início do seguinte.
+        """
+        seq = self.next_seq
+        self.next_seq += 1
+        event = b"id: " + f"{self.id}-{seq}".encode() + b"\n" + data if end else data
+        self._events.append((seq, event, not self._in_event))
+        self._in_event = not end
+        self._size += len(event)
+        self._pending += len(event)
+        self._trim()
+        self._new_data.set()
+
+    def _trim(self) -> None:
+        # Os mais antigos saem primeiro: os já entregues e, com o leitor
+        # parado, também os que ele ainda não recebeu
+        while len(self._events) > 1 and (
+            len(self._events) > self.max_events or self._size > self.max_bytes
+        ):
+            seq, old, _ = self._events.popleft()
+            self._size -= len(old)
+            if seq > self.delivered:
+                self._pending -= len(old)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.error = error
+        self.touched = time.monotonic()
+        self._new_data.set()
+
+    def since(self, seq: int) -> List[Event]:
+        """
+        Eventos ainda guardados com seq maior que seq. Se o começo de um
+        evento em pedaços já saiu do buffer, o resto dele é pulado.
+        """
+        if not self._events:
+            return []
+        start = seq + 1 - self._events[0][0]
+        if start < 0:
+            start = 0
+            while start < len(self._events) and not self._events[start][2]:
+                start += 1
+        return [(s, event) for s, event, _ in itertools.islice(self._events, start, None)]
+
+    async def wait(self) -> None:
+        self._new_data.clear()
+        await self._new_data.wait()
+
+    def attach(self) -> None:
+        self.readers += 1
+
+    def detach(self) -> None:
+        self.readers -= 1
+        self.touched = time.monotonic()
+        # Sem leitor, o produtor não tem por que esperar
+        self._room.set()
+
+    def ack(self, seq: int) -> None:
+        if seq > self.delivered:
+            if self._events:
+                start = max(self.delivered + 1 - self._events[0][0], 0)
+                for s, event, _ in itertools.islice(self._events, start, None):
+                    if s > seq:
+                        break
+                    self._pending -= len(event)
+            self.delivered = seq
+            self._room.set()
+
+    async def wait_for_room(self) -> None:
+        """
+        Backpressure do produtor: com um leitor conectado, não deixa o
+        produtor passar mais que max_events eventos (ou metade de max_bytes)
+        à frente do que já foi entregue. A outra metade é a folga do próximo
+        evento: ele não empurra para fora do buffer o que o leitor ainda não
+        viu. Sem leitor, o produtor segue e o buffer guarda os mais recentes.
+        """
+        while self.readers and (
+            self.next_seq - 1 - self.delivered >= self.max_events
+            or self._pending > self.max_bytes // 2
+        ):
+            self._room.clear()
+            await self._room.wait()
+
+
+class ReplayStore:
+    def __init__(
+        self,
+        on_expire: Callable[[ReplayStream], None],
+        max_events: int = 1000,
+        max_bytes: int = 1024 * 1024,
+        ttl: float = 60.0,
+        max_streams: int = 10_000,
+    ) -> None:
+        self.on_expire = on_expire
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_streams = max_streams
+        # Em ordem de criação: os primeiros sem leitor são os descartados
+        # quando passamos de max_streams
+        self._streams: Dict[str, ReplayStream] = {}
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def create(self, session_id: str) -> ReplayStream:
+        if len(self._streams) >= self.max_streams:
+            for stream in list(self._streams.values()):
+                if stream.readers == 0:
+                    self.expire(stream)
+                    break
+        stream = ReplayStream(session_id, self.max_events, self.max_bytes)
+        self._streams[stream.id] = stream
+        return stream
+
+    def find(self, event_id: str, session_id: str) -> Optional[Tuple[ReplayStream, int]]:
+        """
+        Stream e seq do Last-Event-ID, se o stream ainda existe e é da sessão.
+        """
+        parsed = parse_event_id(event_id)
+        if parsed is None:
+            return None
+        stream = self._streams.get(parsed[0])
+        if stream is None or stream.session_id != session_id:
+            return None
+        return stream, parsed[1]
+
+    def discard(self, stream: ReplayStream) -> None:
+        self._streams.pop(stream.id, None)
+
+    def expire(self, stream: ReplayStream) -> None:
+        self.discard(stream)
+        self.on_expire(stream)
+
+    def sweep(self) -> int:
+        deadline = time.monotonic() - self.ttl
+        expired = [
+            stream
+            for stream in self._streams.values()
+            if stream.readers == 0 and stream.touched < deadline
+        ]
+        for stream in expired:
+            self.expire(stream)
+        return len(expired)
+
+    def close(self) -> None:
+        for stream in list(self._streams.values()):
+            self.expire(stream)
+
+    async def run_sweeper(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
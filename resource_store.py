@@ -0,0 +1,172 @@
+"""
+Conteúdo dos resources, lido de arquivos em disco.
+
+- Arquivos pequenos ficam em um cache LRU de bytes (limitado pelo total de
+  bytes, não pelo número de arquivos).
+- Arquivos grandes nunca são carregados inteiros: são lidos via mmap, em
+  pedaços, direto para a resposta.
+- Cada versão de um arquivo tem um ETag (sha256 do conteúdo), para o cliente
+  não baixar de novo o que não mudou.
+
+As entradas do cache são indexadas por (caminho, tamanho, mtime), então uma
+alteração no arquivo invalida o cache sem precisar de aviso explícito.
+"""
+
+import hashlib
+import mmap
+import os
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+# Múltiplo de 3: pedaços em base64 podem ser concatenados sem padding no meio
+CHUNK_SIZE = 3 * 64 * 1024
+
+TEXT_MIME_TYPES = {"application/json", "application/xml", "application/yaml"}
+
+
+def is_text_mime(mime_type: str) -> bool:
+    return mime_type.startswith("text/") or mime_type in TEXT_MIME_TYPES
+
+
+class ResourceFile:
+    __slots__ = ("uri", "path", "mime_type")
+
+    def __init__(self, uri: str, path: str, mime_type: str) -> None:
+        self.uri = uri
+        self.path = path
+        self.mime_type = mime_type
+
+
+class ResourceInfo:
+    """
+    Snapshot do arquivo no momento da leitura (resultado do os.stat).
+    """
+
+    __slots__ = ("file", "size", "mtime_ns")
+
+    def __init__(self, file: ResourceFile, size: int, mtime_ns: int) -> None:
+        self.file = file
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    @property
+    def key(self) -> Tuple[str, int, int]:
+        return (self.file.path, self.size, self.mtime_ns)
+
+
+class ResourceStore:
+    """
+    Mapeia URIs de resources para arquivos em disco.
+    """
+
+    def __init__(
+        self,
+        small_limit: int = 256 * 1024,
+        cache_bytes: int = 32 * 1024 * 1024,
+        chunk_size: int = CHUNK_SIZE,
+        max_etags: int = 4096,
+    ) -> None:
+        self.small_limit = small_limit
+        self.cache_bytes = cache_bytes
+        self.chunk_size = chunk_size
+        self.max_etags = max_etags
+        self._files: Dict[str, ResourceFile] = {}
+        # Caminho -> URIs servidas por ele (para achar o resource de um
+        # arquivo que mudou)
+        self._uris_by_path: Dict[str, Set[str]] = {}
+        # key -> (conteúdo, etag), em ordem de uso (LRU)
+        self._cache: "OrderedDict[Tuple[str, int, int], Tuple[bytes, str]]" = OrderedDict()
+        self._cached_bytes = 0
+        # ETags dos arquivos grandes (caros de recalcular)
+        self._etags: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+
+    def __contains__(self, uri: object) -> bool:
+        return uri in self._files
+
+    def add(self, uri: str, path: str, mime_type: str) -> ResourceFile:
+        self.remove(uri)
+        file = ResourceFile(uri, os.path.abspath(path), mime_type)
+        self._files[uri] = file
+        self._uris_by_path.setdefault(file.path, set()).add(uri)
+        return file
+
+    def remove(self, uri: str) -> Optional[ResourceFile]:
+        file = self._files.pop(uri, None)
+        if file is not None:
+            uris = self._uris_by_path[file.path]
+            uris.discard(uri)
+            if not uris:
+                del self._uris_by_path[file.path]
+        return file
+
+    def get(self, uri: str) -> Optional[ResourceFile]:
+        return self._files.get(uri)
+
+    def uris_at(self, path: str) -> Set[str]:
+        return self._uris_by_path.get(path, set())
+
+    def stat(self, uri: str) -> ResourceInfo:
+        """
+        Levanta KeyError para URI desconhecida e OSError se o arquivo sumiu.
+        """
+        file = self._files[uri]
+        st = os.stat(file.path)
+        return ResourceInfo(file, st.st_size, st.st_mtime_ns)
+
+    def is_small(self, info: ResourceInfo) -> bool:
+        return info.size <= self.small_limit
+
+    def read_small(self, info: ResourceInfo) -> Tuple[bytes, str]:
+        """
+        Conteúdo e ETag de um arquivo pequeno, passando pelo cache LRU.
+        """
+        key = info.key
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        with open(info.file.path, "rb") as f:
+            data = f.read()
+        entry = (data, hashlib.sha256(data).hexdigest())
+
+        self._cache[key] = entry
+        self._cached_bytes += len(data)
+        while self._cached_bytes > self.cache_bytes and len(self._cache) > 1:
+            _, (old_data, _) = self._cache.popitem(last=False)
+            self._cached_bytes -= len(old_data)
+        return entry
+
+    def etag(self, info: ResourceInfo) -> str:
+        """
+        ETag de um arquivo grande. Bloqueante (lê o arquivo todo via mmap na
+        primeira vez): chame fora do event loop.
+        """
+        key = info.key
+        etag = self._etags.get(key)
+        if etag is not None:
+            return etag
+
+        digest = hashlib.sha256()
+        for chunk in self.iter_chunks(info):
+            digest.update(chunk)
+        etag = digest.hexdigest()
+
+        self._etags[key] = etag
+        if len(self._etags) > self.max_etags:
+            self._etags.popitem(last=False)
+        return etag
+
+    def iter_chunks(self, info: ResourceInfo) -> Iterator[bytes]:
+        """
+        Lê o arquivo em pedaços de chunk_size via mmap: só as páginas do
+        pedaço atual precisam estar em memória.
+        """
+        if info.size == 0:
+            return
+        with open(info.file.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Se o arquivo mudar no meio, não passa do tamanho do stat
+                end = min(info.size, len(mm))
+                for start in range(0, end, self.chunk_size):
+                    yield mm[start : min(start + self.chunk_size, end)]
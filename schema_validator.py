@@ -0,0 +1,274 @@
+"""
+Validação dos argumentos das tools pelo inputSchema (JSON Schema).
+
+O schema é compilado uma vez, no registro da tool, em uma função Python
+gerada para ele (como o fastjsonschema faz): a chamada não percorre o
+schema, só executa as comparações já escritas. Schemas iguais compartilham
+a mesma função.
+
+Um validador recebe o valor e devolve None (válido) ou a mensagem do
+primeiro erro, com o caminho do campo ("arguments.forecastDays must be of
+type integer").
+
+Suporta o que os inputSchema costumam usar: type, enum, const, properties,
+required, additionalProperties, min/maxProperties, items, min/maxItems,
+min/maxLength, pattern, minimum, maximum, exclusiveMinimum/Maximum (numéricos),
+multipleOf, allOf, anyOf e oneOf. Palavras de anotação (description, title,
+default, examples, format, ...) são ignoradas; qualquer outra palavra de
+validação levanta ValueError na compilação, para que um schema nunca seja
+aceito sem ser de fato verificado.
+"""
+
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+Validator = Callable[[Any], Optional[str]]
+
+TYPE_CHECKS = {
+    "object": "isinstance({v}, dict)",
+    "array": "isinstance({v}, list)",
+    "string": "isinstance({v}, str)",
+    "boolean": "isinstance({v}, bool)",
+    "null": "{v} is None",
+    # 1.0 é um integer válido em JSON Schema; True não
+    "integer": (
+        "(isinstance({v}, int) and not isinstance({v}, bool)"
+        " or isinstance({v}, float) and {v}.is_integer())"
+    ),
+    "number": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+}
+
+ANNOTATIONS = {
+    "$schema", "$id", "$comment", "title", "description", "default",
+    "examples", "format", "readOnly", "writeOnly", "deprecated",
+    "contentMediaType", "contentEncoding",
+}
+OBJECT_KEYWORDS = {"properties", "required", "additionalProperties", "minProperties", "maxProperties"}
+ARRAY_KEYWORDS = {"items", "minItems", "maxItems"}
+STRING_KEYWORDS = {"minLength", "maxLength", "pattern"}
+NUMBER_KEYWORDS = {"minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum", "multipleOf"}
+SUPPORTED = (
+    ANNOTATIONS | OBJECT_KEYWORDS | ARRAY_KEYWORDS | STRING_KEYWORDS | NUMBER_KEYWORDS
+    | {"type", "enum", "const", "allOf", "anyOf", "oneOf"}
+)
+
+
+def json_equal(a: Any, b: Any) -> bool:
+    """
+    Igualdade do JSON: 1 == 1.0, mas true != 1 (em Python, True == 1).
+    """
+    if isinstance(a, bool) or isinstance(b, bool):
+        return a is b
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(json_equal(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(json_equal(a[k], b[k]) for k in a)
+    return a == b
+
+
+class _Compiler:
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+        self.namespace: Dict[str, Any] = {}
+        self._counter = 0
+
+    def name(self, prefix: str) -> str:
+        self._counter += 1
+        return f"{prefix}{self._counter}"
+
+    def const(self, value: Any) -> str:
+        name = self.name("C")
+        self.namespace[name] = value
+        return name
+
+    def emit(self, indent: int, line: str) -> None:
+        self.lines.append("    " * indent + line)
+
+    def fail(self, indent: int, path: str, message: str) -> None:
+        self.emit(indent, f"return {path} + {message!r}")
+
+    def function(self, schema: Any) -> str:
+        """
+        Gera def <nome>(value, path) para schema e devolve o nome.
+        """
+        name = self.name("validate")
+        self.emit(0, f"def {name}(value, path='arguments'):")
+        self.node(schema, "value", "path", 1)
+        self.emit(1, "return None")
+        return name
+
+    def node(self, schema: Any, v: str, path: str, indent: int) -> None:
+        if schema is True or schema == {}:
+            return
+        if schema is False:
+            self.fail(indent, path, " is not allowed")
+            return
+        if not isinstance(schema, dict):
+            raise ValueError(f"Invalid schema: {schema!r}")
+        unsupported = set(schema) - SUPPORTED
+        if unsupported:
+            raise ValueError(f"Unsupported schema keywords: {', '.join(sorted(unsupported))}")
+
+        types = schema.get("type")
+        if isinstance(types, str):
+            types = [types]
+        if types is not None:
+            for kind in types:
+                if kind not in TYPE_CHECKS:
+                    raise ValueError(f"Unknown schema type: {kind}")
+            check = " or ".join(TYPE_CHECKS[kind].format(v=v) for kind in types)
+            self.emit(indent, f"if not ({check}):")
+            self.fail(indent + 1, path, f" must be of type {' or '.join(types)}")
+
+        if "enum" in schema:
+            values = tuple(schema["enum"])
+            if all(isinstance(item, str) for item in values):
+                self.emit(indent, f"if not isinstance({v}, str) or {v} not in {self.const(frozenset(values))}:")
+            else:
+                self.namespace["json_equal"] = json_equal
+                self.emit(indent, f"if not any(json_equal({v}, item) for item in {self.const(values)}):")
+            allowed = ", ".join(json.dumps(item) for item in values)
+            self.fail(indent + 1, path, f" must be one of {allowed}")
+        if "const" in schema:
+            self.namespace["json_equal"] = json_equal
+            self.emit(indent, f"if not json_equal({v}, {self.const(schema['const'])}):")
+            self.fail(indent + 1, path, f" must be {json.dumps(schema['const'])}")
+
+        # As palavras de cada tipo só valem para valores daquele tipo: sem
+        # um type único garantido acima, ficam atrás de um isinstance
+        groups = (
+            ("object", OBJECT_KEYWORDS, self.object_keywords),
+            ("array", ARRAY_KEYWORDS, self.array_keywords),
+            ("string", STRING_KEYWORDS, self.string_keywords),
+            ("number", NUMBER_KEYWORDS, self.number_keywords),
+        )
+        for kind, keywords, compile_group in groups:
+            if not keywords & set(schema):
+                continue
+            if types is not None and kind not in types and not (kind == "number" and "integer" in types):
+                continue
+            if types is not None and len(types) == 1:
+                compile_group(schema, v, path, indent)
+            else:
+                self.emit(indent, f"if {TYPE_CHECKS[kind].format(v=v)}:")
+                compile_group(schema, v, path, indent + 1)
+
+        for sub in schema.get("allOf", ()):
+            self.node(sub, v, path, indent)
+        if "anyOf" in schema:
+            options = self.const(tuple(self.subfunction(sub) for sub in schema["anyOf"]))
+            self.emit(indent, f"if all(option({v}, {path}) is not None for option in {options}):")
+            self.fail(indent + 1, path, " must match at least one of the allowed schemas")
+        if "oneOf" in schema:
+            options = self.const(tuple(self.subfunction(sub) for sub in schema["oneOf"]))
+            self.emit(indent, f"if sum(option({v}, {path}) is None for option in {options}) != 1:")
+            self.fail(indent + 1, path, " must match exactly one of the allowed schemas")
+
+    def subfunction(self, schema: Any) -> Validator:
+        compiler = _Compiler()
+        name = compiler.function(schema)
+        return compiler.build(name)
+
+    def object_keywords(self, schema: Dict[str, Any], v: str, path: str, indent: int) -> None:
+        for key in schema.get("required", ()):
+            self.emit(indent, f"if {key!r} not in {v}:")
+            self.fail(indent + 1, path, f".{key} is required")
+        if "minProperties" in schema:
+            self.emit(indent, f"if len({v}) < {int(schema['minProperties'])}:")
+            self.fail(indent + 1, path, f" must have at least {schema['minProperties']} properties")
+        if "maxProperties" in schema:
+            self.emit(indent, f"if len({v}) > {int(schema['maxProperties'])}:")
+            self.fail(indent + 1, path, f" must have at most {schema['maxProperties']} properties")
+        properties = schema.get("properties", {})
+        for key, sub in properties.items():
+            if sub is True or sub == {}:
+                continue
+            item = self.name("v")
+            self.emit(indent, f"if {key!r} in {v}:")
+            self.emit(indent + 1, f"{item} = {v}[{key!r}]")
+            self.node(sub, item, f"({path} + {'.' + key!r})", indent + 1)
+        extra = schema.get("additionalProperties", True)
+        if extra is True:
+            return
+        known = self.const(frozenset(properties))
+        key_var = self.name("k")
+        self.emit(indent, f"for {key_var} in {v}:")
+        self.emit(indent + 1, f"if {key_var} not in {known}:")
+        if extra is False:
+            self.emit(indent + 2, f"return {path} + ' has unexpected property ' + repr({key_var})")
+        else:
+            item = self.name("v")
+            self.emit(indent + 2, f"{item} = {v}[{key_var}]")
+            self.node(extra, item, f"({path} + '.' + {key_var})", indent + 2)
+
+    def array_keywords(self, schema: Dict[str, Any], v: str, path: str, indent: int) -> None:
+        if "minItems" in schema:
+            self.emit(indent, f"if len({v}) < {int(schema['minItems'])}:")
+            self.fail(indent + 1, path, f" must have at least {schema['minItems']} items")
+        if "maxItems" in schema:
+            self.emit(indent, f"if len({v}) > {int(schema['maxItems'])}:")
+            self.fail(indent + 1, path, f" must have at most {schema['maxItems']} items")
+        items = schema.get("items", True)
+        if items is True or items == {}:
+            return
+        if not isinstance(items, (dict, bool)):
+            raise ValueError("Only a single schema is supported in items")
+        index, item = self.name("i"), self.name("v")
+        self.emit(indent, f"for {index}, {item} in enumerate({v}):")
+        self.node(items, item, f"({path} + '[' + str({index}) + ']')", indent + 1)
+
+    def string_keywords(self, schema: Dict[str, Any], v: str, path: str, indent: int) -> None:
+        if "minLength" in schema:
+            self.emit(indent, f"if len({v}) < {int(schema['minLength'])}:")
+            self.fail(indent + 1, path, f" must have at least {schema['minLength']} characters")
+        if "maxLength" in schema:
+            self.emit(indent, f"if len({v}) > {int(schema['maxLength'])}:")
+            self.fail(indent + 1, path, f" must have at most {schema['maxLength']} characters")
+        if "pattern" in schema:
+            pattern = self.const(re.compile(schema["pattern"]))
+            self.emit(indent, f"if {pattern}.search({v}) is None:")
+            self.fail(indent + 1, path, f" must match {schema['pattern']}")
+
+    def number_keywords(self, schema: Dict[str, Any], v: str, path: str, indent: int) -> None:
+        bounds = (
+            ("minimum", "<", "must be >="),
+            ("maximum", ">", "must be <="),
+            ("exclusiveMinimum", "<=", "must be >"),
+            ("exclusiveMaximum", ">=", "must be <"),
+        )
+        for keyword, operator, message in bounds:
+            if keyword in schema:
+                limit = schema[keyword]
+                if isinstance(limit, bool) or not isinstance(limit, (int, float)):
+                    raise ValueError(f"{keyword} must be a number")
+                self.emit(indent, f"if {v} {operator} {limit!r}:")
+                self.fail(indent + 1, path, f" {message} {limit}")
+        if "multipleOf" in schema:
+            step = schema["multipleOf"]
+            self.emit(indent, f"if {v} % {step!r}:")
+            self.fail(indent + 1, path, f" must be a multiple of {step}")
+
+    def build(self, name: str) -> Validator:
+        source = "\n".join(self.lines)
+        exec(compile(source, f"<schema {name}>", "exec"), self.namespace)
+        validator = self.namespace[name]
+        validator.source = source
+        return validator
+
+
+_compiled: Dict[str, Validator] = {}
+
+
+def compile_schema(schema: Dict[str, Any]) -> Validator:
+    """
+    Validador para schema (levanta ValueError se o schema é inválido ou usa
+    algo não suportado). Compilado uma vez por schema distinto.
+    """
+    key = json.dumps(schema, sort_keys=True, separators=(",", ":"))
+    validator = _compiled.get(key)
+    if validator is None:
+        compiler = _Compiler()
+        validator = compiler.build(compiler.function(schema))
+        _compiled[key] = validator
+    return validator
@@ -1,21 +1,1199 @@
 import asyncio
-import json
+import base64
+import bisect
+import codecs
+import mimetypes
+import os
+import signal
+import threading
+import time
 import uuid
-from typing import Any, Dict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 from fastapi import FastAPI, Request, Response
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+import codec
+import compression
+from admission import AdmissionController, BodyBudget, HeldStream, RateLimiter, Rejected, StreamCounter
+from executors import EXECUTION_MODES, ToolExecutor
+from file_watcher import FileWatcher
+from metrics import CODEC_BUCKETS, Registry
+from notifications import NotificationHub, Subscription
+from raw_asgi import RawASGIApp
+from replay import ReplayStore, ReplayStream
+from resource_store import ResourceInfo, ResourceStore, is_text_mime
+from schema_validator import Validator, compile_schema
+from sessions import Session, SessionManager, make_backend
+from tool_cache import InFlight, ToolResultCache, cache_key
+from tracing import Trace, Tracer, span
+from worker_bus import WorkerBus
+
+# Sessões: expiram após MCP_SESSION_TTL segundos sem uso e ficam limitadas a
+# MCP_MAX_SESSIONS. MCP_SESSION_BACKEND=sqlite guarda em MCP_SESSION_DB, para
+# sobreviver a restarts e ser compartilhado entre processos.
+session_manager = SessionManager(
+    make_backend(
+        os.environ.get("MCP_SESSION_BACKEND", "memory"),
+        os.environ.get("MCP_SESSION_DB", "sessions.sqlite3"),
+    ),
+    ttl=float(os.environ.get("MCP_SESSION_TTL", "1800")),
+    max_sessions=int(os.environ.get("MCP_MAX_SESSIONS", "10000")),
+    sweep_interval=float(os.environ.get("MCP_SESSION_SWEEP_INTERVAL", "60")),
+)
+
+
+class PendingRequestsFull(Exception):
+    pass
+
+
+class PendingRequests:
+    """
+    Requests que o servidor mandou para o cliente (por exemplo,
+    elicitation/create) e que aguardam a response, indexados por
+    (sessão, id).
+
+    Os ids são gerados aqui (únicos, então duas chamadas concorrentes nunca
+    se confundem) e a chave inclui a sessão: uma response só resolve requests
+    da própria sessão. A tabela é limitada no total e por sessão.
+
+    O id começa com o owner (o worker que está esperando), para que uma
+    response recebida por outro worker possa ser encaminhada a ele.
+    """
+
+    def __init__(
+        self,
+        owner: str,
+        max_pending: int = 10_000,
+        max_per_session: int = 100,
+    ) -> None:
+        self.owner = owner
+        self.max_pending = max_pending
+        self.max_per_session = max_per_session
+        self._futures: Dict[Tuple[Optional[str], str], asyncio.Future] = {}
+        self._per_session: Dict[Optional[str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    def create(self, session_id: Optional[str]) -> Tuple[str, asyncio.Future]:
+        if len(self._futures) >= self.max_pending:
+            raise PendingRequestsFull("too many pending server requests")
+        if self._per_session.get(session_id, 0) >= self.max_per_session:
+            raise PendingRequestsFull("too many pending server requests for this session")
+
+        request_id = f"{self.owner}.{uuid.uuid4().hex}"
+        fut = asyncio.get_running_loop().create_future()
+        self._futures[(session_id, request_id)] = fut
+        self._per_session[session_id] = self._per_session.get(session_id, 0) + 1
+        return request_id, fut
+
+    def resolve(self, session_id: Optional[str], request_id: Any, message: Dict[str, Any]) -> bool:
+        """
+        Entrega a response do cliente. Devolve False se não havia ninguém
+        esperando (id desconhecido, de outra sessão ou já expirado).
+        """
+        if not isinstance(request_id, str):
+            return False
+        fut = self._futures.get((session_id, request_id))
+        if fut is None or fut.done():
+            return False
+        fut.set_result(message)
+        return True
+
+    @staticmethod
+    def owner_of(request_id: Any) -> Optional[str]:
+        if not isinstance(request_id, str) or "." not in request_id:
+            return None
+        return request_id.split(".", 1)[0]
+
+    def discard(self, session_id: Optional[str], request_id: str) -> None:
+        fut = self._futures.pop((session_id, request_id), None)
+        if fut is None:
+            return
+        fut.cancel()
+        remaining = self._per_session[session_id] - 1
+        if remaining:
+            self._per_session[session_id] = remaining
+        else:
+            del self._per_session[session_id]
+
+
+# Tempo máximo (s) esperando o cliente responder um request do servidor
+ELICITATION_TIMEOUT = float(os.environ.get("MCP_ELICITATION_TIMEOUT", "300"))
+
+# Identifica este processo entre os workers (modo --workers)
+WORKER_ID = str(os.getpid())
+
+pending_requests = PendingRequests(
+    owner=WORKER_ID,
+    max_pending=int(os.environ.get("MCP_MAX_PENDING", "10000")),
+    max_per_session=int(os.environ.get("MCP_MAX_PENDING_PER_SESSION", "100")),
+)
+
+
+# Com vários workers, responses de elicitation podem chegar a um worker
+# diferente do que está com o stream aberto: o WorkerBus as encaminha.
+worker_bus: Optional[WorkerBus] = None
+if os.environ.get("MCP_WORKER_BUS_DIR"):
+    worker_bus = WorkerBus(os.environ["MCP_WORKER_BUS_DIR"], worker_id=WORKER_ID)
+
+
+async def on_worker_message(envelope: Dict[str, Any]) -> None:
+    """
+    Response de um request deste worker que chegou por outro worker.
+    """
+    message = envelope["message"]
+    pending_requests.resolve(envelope["sessionId"], message.get("id"), message)
+
+
+async def route_response(session_id: Optional[str], message: Dict[str, Any]) -> None:
+    """
+    Entrega a response do cliente a quem está esperando por ela: este worker
+    ou, no modo multi-worker, o worker indicado no id.
+    """
+    msg_id = message.get("id")
+    if pending_requests.resolve(session_id, msg_id, message):
+        return
+    owner = PendingRequests.owner_of(msg_id)
+    if worker_bus is not None and owner is not None and owner != WORKER_ID:
+        await worker_bus.send(owner, {"sessionId": session_id, "message": message})
+
+
+def close_streams_on_exit() -> None:
+    """
+    Streams GET /mcp não terminam sozinhos, e o uvicorn espera todas as
+    conexões antes de parar. Ao receber SIGINT/SIGTERM, fechamos os streams
+    e deixamos o handler original do uvicorn seguir com o shutdown.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(signum)
+        if not callable(previous):
+            continue
+
+        def handler(signum: int, frame: Any, previous: Callable[..., Any] = previous) -> None:
+            loop.call_soon_threadsafe(notification_hub.close)
+            previous(signum, frame)
+
+        signal.signal(signum, handler)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Tarefas de fundo que vivem enquanto o servidor está no ar.
+    """
+    sweeper = asyncio.create_task(session_manager.run_sweeper())
+    watcher = asyncio.create_task(resource_watcher.run())
+    replay_sweeper = asyncio.create_task(
+        replay_store.run_sweeper(min(SSE_REPLAY_TTL, 10.0))
+    )
+    close_streams_on_exit()
+    if worker_bus is not None:
+        await worker_bus.start(on_worker_message)
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+        replay_sweeper.cancel()
+        watcher.cancel()
+        tool_executor.shutdown()
+        tracer.close()
+        notification_hub.close()
+        replay_store.close()
+        if worker_bus is not None:
+            await worker_bus.stop()
+        session_manager.backend.close()
+
+
+app = FastAPI(title="MCP Streamable HTTP demo", lifespan=lifespan)
+
+# Quantos itens de um batch JSON-RPC são processados ao mesmo tempo
+BATCH_CONCURRENCY = int(os.environ.get("MCP_BATCH_CONCURRENCY", "16"))
+
+# Pools das tools com execution="thread" / "process" (0: padrão do Python,
+# min(32, cpus + 4) threads e um processo por CPU)
+THREAD_POOL_SIZE = int(os.environ.get("MCP_THREAD_POOL_SIZE", "0"))
+PROCESS_POOL_SIZE = int(os.environ.get("MCP_PROCESS_POOL_SIZE", "0"))
+
+tool_executor = ToolExecutor(
+    thread_workers=THREAD_POOL_SIZE or None,
+    process_workers=PROCESS_POOL_SIZE or None,
+)
+
+# Admissão (admission.py). Limites de taxa em requests/s (0 desliga),
+# global e por sessão; requests executando ao mesmo tempo (0: sem limite),
+# quantos esperam na fila e por quanto tempo; streams SSE abertos
+RATE_LIMIT = float(os.environ.get("MCP_RATE_LIMIT", "0"))
+RATE_BURST = float(os.environ.get("MCP_RATE_BURST", "0"))
+SESSION_RATE_LIMIT = float(os.environ.get("MCP_SESSION_RATE_LIMIT", "0"))
+SESSION_RATE_BURST = float(os.environ.get("MCP_SESSION_RATE_BURST", "0"))
+MAX_IN_FLIGHT = int(os.environ.get("MCP_MAX_IN_FLIGHT", "256"))
+MAX_QUEUED = int(os.environ.get("MCP_MAX_QUEUED", "1024"))
+QUEUE_TIMEOUT = float(os.environ.get("MCP_QUEUE_TIMEOUT", "10"))
+MAX_STREAMS = int(os.environ.get("MCP_MAX_STREAMS", "10000"))
+# Corpo de um POST /mcp (bytes) e total de bytes de corpos sendo lidos ao
+# mesmo tempo (0: sem limite)
+MAX_BODY_BYTES = int(os.environ.get("MCP_MAX_BODY_BYTES", str(4 * 1024 * 1024)))
+BODY_BUFFER_BYTES = int(os.environ.get("MCP_BODY_BUFFER_BYTES", str(64 * 1024 * 1024)))
+
+rate_limiter = RateLimiter(
+    rate=RATE_LIMIT,
+    burst=RATE_BURST,
+    session_rate=SESSION_RATE_LIMIT,
+    session_burst=SESSION_RATE_BURST,
+    max_buckets=session_manager.max_sessions,
+)
+admission = AdmissionController(
+    max_in_flight=MAX_IN_FLIGHT,
+    max_queued=MAX_QUEUED,
+    queue_timeout=QUEUE_TIMEOUT,
+)
+stream_counter = StreamCounter(max_streams=MAX_STREAMS)
+body_budget = BodyBudget(max_bytes=BODY_BUFFER_BYTES)
+
+# Compressão das respostas (compression.py): codificações aceitas, em ordem
+# de preferência (vazio desliga), e tamanho mínimo para comprimir uma
+# resposta JSON (streams são sempre comprimidos)
+COMPRESSION = [
+    name.strip()
+    for name in os.environ.get("MCP_COMPRESSION", "zstd,br,gzip").split(",")
+    if name.strip() in compression.ENCODERS
+]
+COMPRESS_MIN_BYTES = int(os.environ.get("MCP_COMPRESS_MIN_BYTES", "1024"))
+
+# Tracing (tracing.py): fração dos requests traçados (0 desliga), só de alguns
+# métodos (separados por vírgula; vazio: todos), só os mais lentos que
+# MCP_TRACE_SLOW_MS. Profiling: um cProfile a cada MCP_PROFILE_EVERY
+# requests de MCP_PROFILE_METHODS (0 desliga)
+TRACE_SAMPLE = float(os.environ.get("MCP_TRACE_SAMPLE", "0"))
+TRACE_METHODS = os.environ.get("MCP_TRACE_METHODS", "")
+TRACE_SLOW_MS = float(os.environ.get("MCP_TRACE_SLOW_MS", "0"))
+TRACE_DIR = os.environ.get("MCP_TRACE_DIR", "traces")
+PROFILE_EVERY = int(os.environ.get("MCP_PROFILE_EVERY", "0"))
+PROFILE_METHODS = os.environ.get("MCP_PROFILE_METHODS", "tools/call")
+PROFILE_DIR = os.environ.get("MCP_PROFILE_DIR", "profiles")
+
+tracer = Tracer(
+    sample_rate=TRACE_SAMPLE,
+    methods=[m.strip() for m in TRACE_METHODS.split(",") if m.strip()],
+    slow_ms=TRACE_SLOW_MS,
+    directory=TRACE_DIR,
+    profile_every=PROFILE_EVERY,
+    profile_methods=[m.strip() for m in PROFILE_METHODS.split(",") if m.strip()],
+    profile_directory=PROFILE_DIR,
+)
+
+# Métricas (GET /metrics). Contadores e histogramas são atualizados no caminho
+# quente; o resto é lido do estado do servidor só na hora do scrape.
+metrics_registry = Registry()
+request_count = metrics_registry.counter(
+    "mcp_requests_total", "JSON-RPC requests and notifications handled", label="method"
+)
+request_errors = metrics_registry.counter(
+    "mcp_request_errors_total", "Requests answered with a JSON-RPC error", label="method"
+)
+request_latency = metrics_registry.histogram(
+    "mcp_request_duration_seconds",
+    "Handler time per method (for streams, until the stream is returned)",
+    label="method",
+)
+tool_calls = metrics_registry.counter("mcp_tool_calls_total", "Tool calls executed", label="tool")
+tool_errors = metrics_registry.counter(
+    "mcp_tool_errors_total", "Tool calls that failed, timed out or returned isError", label="tool"
+)
+tool_latency = metrics_registry.histogram(
+    "mcp_tool_duration_seconds", "Tool execution time", label="tool"
+)
+serialization_time = metrics_registry.histogram(
+    "mcp_serialization_seconds", "Time encoding JSON-RPC messages", CODEC_BUCKETS
+)
+parse_time = metrics_registry.histogram(
+    "mcp_parse_seconds", "Time decoding POST /mcp bodies", CODEC_BUCKETS
+)
+metrics_registry.gauge(
+    "mcp_active_sessions", "Sessions in the session store", lambda: session_manager.backend.count()
+)
+metrics_registry.gauge("mcp_open_sse_streams", "Open SSE responses", lambda: stream_counter.open)
+metrics_registry.gauge(
+    "mcp_pending_elicitations", "Server requests awaiting a client response", lambda: len(pending_requests)
+)
+metrics_registry.gauge("mcp_admission_in_flight", "Requests executing", lambda: admission.in_flight)
+metrics_registry.gauge("mcp_admission_queue_depth", "Requests waiting for a slot", lambda: admission.queued)
+metrics_registry.gauge(
+    "mcp_admission_rejected_total", "Requests rejected with 503", lambda: admission.rejected, kind="counter"
+)
+metrics_registry.gauge(
+    "mcp_rate_limited_total", "Requests rejected with 429", lambda: rate_limiter.limited, kind="counter"
+)
+metrics_registry.gauge(
+    "mcp_streams_rejected_total", "SSE streams rejected for too many open streams", lambda: stream_counter.rejected, kind="counter"
+)
+metrics_registry.gauge(
+    "mcp_body_buffer_bytes", "Bytes of POST bodies being read", lambda: body_budget.used
+)
+metrics_registry.gauge(
+    "mcp_body_rejected_total", "POST bodies rejected for the buffer limit", lambda: body_budget.rejected, kind="counter"
+)
+metrics_registry.gauge(
+    "mcp_notification_queue_depth",
+    "Notifications waiting in GET /mcp stream queues",
+    lambda: notification_hub.stats()["pending"],
+)
+metrics_registry.gauge("mcp_replay_streams", "SSE streams kept for resumption", lambda: len(replay_store))
+metrics_registry.gauge(
+    "mcp_tool_cache_hits_total",
+    "Tool result cache hits",
+    lambda: {tool: stats["hits"] for tool, stats in tool_cache_stats().items()},
+    label="tool",
+    kind="counter",
+)
+metrics_registry.gauge(
+    "mcp_tool_cache_misses_total",
+    "Tool result cache misses",
+    lambda: {tool: stats["misses"] for tool, stats in tool_cache_stats().items()},
+    label="tool",
+    kind="counter",
+)
+
+# Itens por página em tools/list e resources/list
+PAGE_SIZE = int(os.environ.get("MCP_PAGE_SIZE", "100"))
+
+# Diretório com o conteúdo dos resources. Arquivos até SMALL_RESOURCE_BYTES
+# são servidos do cache em memória; os maiores, em streaming via mmap.
+RESOURCE_DIR = os.environ.get(
+    "MCP_RESOURCE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources")
+)
+SMALL_RESOURCE_BYTES = int(os.environ.get("MCP_SMALL_RESOURCE_BYTES", str(256 * 1024)))
+RESOURCE_CACHE_BYTES = int(os.environ.get("MCP_RESOURCE_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+# Detecção de mudanças para resources/subscribe: "watchfiles", "poll" ou ""
+# (watchfiles se estiver instalado). Mudanças em rajada dentro de
+# RESOURCE_DEBOUNCE segundos viram uma notification só.
+RESOURCE_WATCH = os.environ.get("MCP_RESOURCE_WATCH", "")
+RESOURCE_DEBOUNCE = float(os.environ.get("MCP_RESOURCE_DEBOUNCE", "0.2"))
+RESOURCE_POLL_INTERVAL = float(os.environ.get("MCP_RESOURCE_POLL_INTERVAL", "1"))
+
+resource_store = ResourceStore(
+    small_limit=SMALL_RESOURCE_BYTES,
+    cache_bytes=RESOURCE_CACHE_BYTES,
+)
+
+# Streams GET /mcp abertos, que recebem as notifications do servidor
+SSE_KEEPALIVE = float(os.environ.get("MCP_SSE_KEEPALIVE", "15"))
+NOTIFICATION_QUEUE_SIZE = int(os.environ.get("MCP_NOTIFICATION_QUEUE_SIZE", "256"))
+
+# make_sse_event é definido mais abaixo; o hub só o chama ao publicar
+notification_hub = NotificationHub(
+    encode=lambda message: make_sse_event(message),
+    queue_size=NOTIFICATION_QUEUE_SIZE,
+)
+
+
+# Eventos SSE guardados para retomar streams com Last-Event-ID
+SSE_REPLAY_EVENTS = int(os.environ.get("MCP_SSE_REPLAY_EVENTS", "1000"))
+SSE_REPLAY_BYTES = int(os.environ.get("MCP_SSE_REPLAY_BYTES", str(1024 * 1024)))
+SSE_REPLAY_TTL = float(os.environ.get("MCP_SSE_REPLAY_TTL", "60"))
+SSE_REPLAY_STREAMS = int(os.environ.get("MCP_SSE_REPLAY_STREAMS", "10000"))
+
+
+def expire_stream(stream: ReplayStream) -> None:
+    """
+    Stream sem leitor há mais de SSE_REPLAY_TTL: para quem o alimenta.
+    """
+    if isinstance(stream.source, asyncio.Task):
+        stream.source.cancel()
+    elif isinstance(stream.source, Subscription):
+        notification_hub.unsubscribe(stream.source)
+
+
+replay_store = ReplayStore(
+    on_expire=expire_stream,
+    max_events=SSE_REPLAY_EVENTS,
+    max_bytes=SSE_REPLAY_BYTES,
+    ttl=SSE_REPLAY_TTL,
+    max_streams=SSE_REPLAY_STREAMS,
+)
+
+
+def publish_notification(
+    message: Dict[str, Any], session_ids: Optional[Iterable[str]] = None
+) -> int:
+    """
+    Entrega uma notification aos streams GET /mcp abertos: de todas as
+    sessões ou só das session_ids.
+    """
+    return notification_hub.publish(message, session_ids)
+
+
+# -----------------------------------------------------------------------------
+# Responses pré-serializadas
+# -----------------------------------------------------------------------------
+
+class PreEncoded:
+    """
+    Mensagem JSON-RPC já serializada em bytes (UTF-8).
+
+    compressed(encoding), quando definido, devolve data já comprimido (ou
+    None, e aí a compressão é feita na hora): é assim que as respostas do
+    ResponseCache aproveitam a compressão guardada junto com o result.
+    """
+
+    __slots__ = ("data", "compressed")
+
+    def __init__(
+        self, data: bytes, compressed: Optional[Callable[[str], Optional[bytes]]] = None
+    ) -> None:
+        self.data = data
+        self.compressed = compressed
+
+
+class EncodedStream:
+    """
+    Uma única mensagem JSON-RPC serializada aos pedaços (por exemplo, um
+    resource grande), enviada sem nunca existir inteira em memória.
+
+    Os pedaços são produzidos por um iterator síncrono: o StreamingResponse
+    o consome em uma thread, então leituras de disco não travam o event loop.
+    Em um batch a mensagem também não é montada inteira: ver batch_chunks e
+    encoded_chunks (SSE).
+    """
+
+    __slots__ = ("chunks",)
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self.chunks = chunks
+
+
+class StreamedMessage:
+    """
+    Uma única mensagem JSON-RPC (o resultado de uma tool em streaming)
+    serializada enquanto é produzida. Cada pedaço é um trecho de JSON sem
+    quebras de linha: no SSE, vira uma linha "data:" do mesmo evento (o
+    cliente junta as linhas com "\\n", que o JSON aceita entre tokens).
+    """
+
+    __slots__ = ("lines",)
+
+    def __init__(self, lines: AsyncIterator[bytes]) -> None:
+        self.lines = lines
+
+
+class ToolProgress:
+    """
+    Item de progresso de uma tool em streaming: vira notifications/progress
+    se o cliente mandou um progressToken.
+    """
+
+    __slots__ = ("progress", "total", "message")
+
+    def __init__(
+        self, progress: float, total: Optional[float] = None, message: Optional[str] = None
+    ) -> None:
+        self.progress = progress
+        self.total = total
+        self.message = message
+
+
+class CachedResult:
+    __slots__ = ("head", "_finishers")
+
+    def __init__(self, result: bytes) -> None:
+        self.head = b'{"jsonrpc":"2.0","result":' + result + b',"id":'
+        # encoding -> compression.prefixed(encoding, head)
+        self._finishers: Dict[str, Optional[Callable[[bytes], bytes]]] = {}
+
+    def compress(self, encoding: str, tail: bytes) -> Optional[bytes]:
+        if encoding not in self._finishers:
+            self._finishers[encoding] = compression.prefixed(encoding, self.head)
+        finish = self._finishers[encoding]
+        return finish(tail) if finish is not None else None
+
+
+class ResponseCache:
+    """
+    Cache do "result" de métodos estáticos (initialize, tools/list,
+    resources/list) já serializado em bytes.
+
+    Entre duas chamadas só o id muda, então guardamos o result pronto e a
+    cada request só emendamos o id, sem remontar o dict nem serializar o
+    result inteiro.
+
+    Páginas usam chaves (método, cursor). Como o cursor vem do cliente, o
+    cache é limitado a max_entries (descarta a entrada mais antiga).
+
+    O id vai no fim da response: tudo antes dele é fixo, então a compressão
+    desse começo também fica guardada na entrada, uma por codificação (ver
+    compression.prefixed), e cada request só comprime o id.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, CachedResult] = {}
+
+    def reply(
+        self,
+        key: Hashable,
+        msg_id: Any,
+        build: Callable[[], Dict[str, Any]],
+    ) -> PreEncoded:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = CachedResult(codec.dumps(build()))
+            if len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = entry
+        tail = codec.dumps(msg_id) + b"}"
+        return PreEncoded(entry.head + tail, lambda encoding: entry.compress(encoding, tail))
+
+    def invalidate(self, method_name: str) -> None:
+        """
+        Descarta as entradas de um método (a chave é o nome do método ou uma
+        tupla começando por ele).
+        """
+        for key in list(self._entries):
+            if key == method_name or (isinstance(key, tuple) and key[0] == method_name):
+                del self._entries[key]
+
+
+response_cache = ResponseCache()
+
+
+# -----------------------------------------------------------------------------
+# Registro de métodos JSON-RPC e tools
+# -----------------------------------------------------------------------------
+
+class CallContext:
+    """
+    Contexto de uma mensagem JSON-RPC sendo processada.
+
+    Os handlers não montam objetos HTTP: devolvem a mensagem JSON-RPC e, se
+    precisarem, pedem headers extras pela resposta via response_headers.
+    """
+
+    def __init__(
+        self,
+        session: Optional[Session] = None,
+        in_batch: bool = False,
+        trace: Optional[Trace] = None,
+        encoding: Optional[str] = None,
+    ) -> None:
+        self.session = session
+        self.session_id = session.id if session is not None else None
+        self.in_batch = in_batch
+        self.response_headers: Dict[str, str] = {}
+        # Trace do request (tracing.py), se ele caiu na amostra
+        self.trace = trace
+        # Compressão negociada com o cliente (Accept-Encoding), ou None
+        self.encoding = encoding
+
+
+# Um handler devolve:
+# - um dict: a response JSON-RPC (enviada como application/json)
+# - um PreEncoded: a response JSON-RPC já serializada
+# - um EncodedStream: a response JSON-RPC serializada aos pedaços
+# - um async iterator de dicts: mensagens enviadas via SSE (a última pode
+#   ser um StreamedMessage, ver stream_tool_output)
+# - None: nada a responder (notifications / responses recebidas)
+Message = Union[Dict[str, Any], PreEncoded, EncodedStream, StreamedMessage]
+RpcResult = Union[Message, AsyncIterator[Message], None]
+
+MethodHandler = Callable[[Dict[str, Any], CallContext], Awaitable[RpcResult]]
+ToolHandler = Callable[
+    [Dict[str, Any], Dict[str, Any], CallContext], Awaitable[RpcResult]
+]
+
+
+@dataclass
+class MethodEntry:
+    """
+    Um método JSON-RPC registrado (request ou notification).
+    """
+
+    name: str
+    handler: MethodHandler
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class ToolEntry:
+    """
+    Uma tool registrada, com os metadados expostos em tools/list.
+    """
+
+    name: str
+    handler: ToolHandler
+    description: str
+    input_schema: Dict[str, Any]
+    # inputSchema compilado (schema_validator.py)
+    validate: Validator
+    meta: Dict[str, Any] = field(default_factory=dict)
+    cache: Optional["ToolResultCache[CachedToolReply]"] = None
+    # Chamadas simultâneas permitidas (max_concurrency=...)
+    limit: Optional[asyncio.Semaphore] = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "inputSchema": self.input_schema,
+        }
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(key: str) -> str:
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        raw = base64.b64decode(cursor.encode("ascii"), altchars=b"-_", validate=True)
+        return raw.decode("utf-8")
+    except (ValueError, UnicodeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+T = TypeVar("T")
+
+
+class Catalog(Generic[T]):
+    """
+    Índice de tools ou resources.
+
+    O dict dá o lookup O(1) do dispatch; a lista ordenada de chaves dá a
+    paginação. O cursor (opaco para o cliente) é a última chave devolvida,
+    então continua válido mesmo se itens entrarem ou saírem entre uma
+    página e outra.
+    """
+
+    def __init__(self) -> None:
+        self._items: Dict[str, T] = {}
+        self._keys: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._items
+
+    def get(self, key: Any) -> Optional[T]:
+        return self._items.get(key)
+
+    def values(self) -> List[T]:
+        return [self._items[key] for key in self._keys]
+
+    def add(self, key: str, item: T) -> None:
+        if key not in self._items:
+            bisect.insort(self._keys, key)
+        self._items[key] = item
+
+    def remove(self, key: str) -> Optional[T]:
+        item = self._items.pop(key, None)
+        if item is not None:
+            del self._keys[bisect.bisect_left(self._keys, key)]
+        return item
+
+    def page(self, cursor: Optional[str], size: int) -> Tuple[List[T], Optional[str]]:
+        """
+        Devolve os itens da página que começa depois do cursor e o cursor da
+        próxima página (None na última).
+        """
+        start = 0
+        if cursor is not None:
+            if not isinstance(cursor, str):
+                raise InvalidCursor(cursor)
+            start = bisect.bisect_right(self._keys, decode_cursor(cursor))
+        keys = self._keys[start : start + size]
+        next_cursor = None
+        if keys and start + size < len(self._keys):
+            next_cursor = encode_cursor(keys[-1])
+        return [self._items[key] for key in keys], next_cursor
+
+
+# Dispatch por dict: o custo de achar o handler não cresce com o número de
+# métodos/tools registrados.
+method_registry: Dict[str, MethodEntry] = {}
+tool_registry: Catalog[ToolEntry] = Catalog()
+resource_registry: Catalog[Dict[str, Any]] = Catalog()
+
+
+def notify_list_changed(kind: str) -> None:
+    """
+    Chamado quando o registro de tools ou resources muda: invalida o
+    "<kind>/list" cacheado e avisa os clientes com
+    notifications/<kind>/list_changed.
+    """
+    response_cache.invalidate(f"{kind}/list")
+    publish_notification(
+        {
+            "jsonrpc": "2.0",
+            "method": f"notifications/{kind}/list_changed",
+        }
+    )
 
-app = FastAPI(title="MCP Streamable HTTP demo")
 
-# Armazena futures para respostas de elicitation
-elicitation_futures: Dict[int, asyncio.Future] = {}
+def register_method(name: str, handler: MethodHandler, **meta: Any) -> MethodEntry:
+    """
+    Registra (ou substitui) o handler de um método JSON-RPC.
+    """
+    entry = MethodEntry(name=name, handler=handler, meta=meta)
+    method_registry[name] = entry
+    return entry
+
 
-# Armazena informações simples de sessão, só para demonstração
-session_store: Dict[str, Dict[str, Any]] = {}
+def unregister_method(name: str) -> Optional[MethodEntry]:
+    return method_registry.pop(name, None)
+
+
+def register_tool(
+    name: str,
+    handler: ToolHandler,
+    *,
+    description: str,
+    schema: Dict[str, Any],
+    **meta: Any,
+) -> ToolEntry:
+    """
+    Registra (ou substitui) uma tool. Pode ser chamado com o servidor
+    rodando: a próxima chamada de tools/list / tools/call já enxerga a mudança.
+
+    Opções em meta:
+    - execution: "async" (padrão, handler assíncrono no event loop),
+      "thread" ou "process" (handler é uma função síncrona
+      fn(arguments) -> str | result, executada no pool correspondente)
+    - max_concurrency: chamadas simultâneas da tool
+    - timeout: segundos até a chamada ser cancelada
+    - streaming: handler é um async generator que produz o resultado aos
+      pedaços (ver stream_tool_output)
+    - cache_ttl, cache_size, cache_bytes: cache de resultados
+
+    O schema é compilado aqui em um validador dos argumentos (levanta
+    ValueError se ele usa algo que o schema_validator não suporta).
+    """
+    validate = compile_schema(schema)
+    execution = meta.get("execution", "async")
+    if execution not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode for tool {name}: {execution}")
+    if execution != "async":
+        if meta.get("streaming"):
+            raise ValueError(f"Streaming tool {name} must use execution='async'")
+        handler = pooled_handler(handler, execution)
+    elif meta.get("streaming"):
+        handler = streaming_handler(handler)
+
+    entry = ToolEntry(
+        name=name,
+        handler=handler,
+        description=description,
+        input_schema=schema,
+        validate=validate,
+        meta=meta,
+    )
+    if "max_concurrency" in meta:
+        entry.limit = asyncio.Semaphore(meta["max_concurrency"])
+    if "cache_ttl" in meta:
+        entry.cache = ToolResultCache(
+            ttl=meta["cache_ttl"],
+            max_entries=meta.get("cache_size", 256),
+            max_bytes=meta.get("cache_bytes", 16 * 1024 * 1024),
+        )
+    tool_registry.add(name, entry)
+    notify_list_changed("tools")
+    return entry
 
 
-def make_sse_event(payload: Dict[str, Any]) -> bytes:
+def pooled_handler(fn: Callable[..., Any], mode: str) -> ToolHandler:
+    """
+    Adapta uma função síncrona fn(arguments) para ToolHandler, executando-a
+    no pool de mode. fn devolve o texto do resultado ou o "result" inteiro.
+    """
+
+    async def handler(msg: Dict[str, Any], arguments: Dict[str, Any], ctx: CallContext) -> RpcResult:
+        result = await tool_executor.run(mode, fn, arguments)
+        if isinstance(result, str):
+            return make_tool_result(msg.get("id"), result)
+        return {"jsonrpc": "2.0", "id": msg.get("id"), "result": result}
+
+    return handler
+
+
+def streaming_handler(fn: Callable[..., AsyncIterator[Any]]) -> ToolHandler:
+    """
+    Adapta um async generator fn(msg, arguments, ctx) para ToolHandler.
+    """
+
+    async def handler(msg: Dict[str, Any], arguments: Dict[str, Any], ctx: CallContext) -> RpcResult:
+        return stream_tool_output(msg, ctx, fn(msg, arguments, ctx))
+
+    return handler
+
+
+def unregister_tool(name: str) -> Optional[ToolEntry]:
+    entry = tool_registry.remove(name)
+    if entry is not None:
+        notify_list_changed("tools")
+    return entry
+
+
+# Cache de resultados de tools (declarado no registro, com cache_ttl=...).
+# Cada mensagem é guardada já serializada e sem o id do request:
+# (True, b'{"result":...}') para a response final, (False, mensagem) para
+# notifications. Uma resposta em SSE guarda a sequência inteira de eventos.
+CachedPart = Tuple[bool, bytes]
+CachedToolReply = Tuple[bool, List[CachedPart]]
+
+
+def cached_part(message: Message, msg_id: Any) -> Optional[CachedPart]:
+    """
+    Forma reaproveitável de uma mensagem da tool, ou None se ela não pode
+    ser repetida (request ao cliente, mensagem já serializada).
+    """
+    if not isinstance(message, dict):
+        return None
+    if "method" in message:
+        if "id" in message:
+            return None
+        return (False, codec.dumps(message))
+    if message.get("id") != msg_id:
+        return None
+    body = {k: v for k, v in message.items() if k not in ("jsonrpc", "id")}
+    return (True, codec.dumps(body))
+
+
+def is_failure(message: Dict[str, Any]) -> bool:
+    return "error" in message or bool((message.get("result") or {}).get("isError"))
+
+
+def render_part(part: CachedPart, msg_id: Any) -> PreEncoded:
+    is_response, data = part
+    if not is_response:
+        return PreEncoded(data)
+    return PreEncoded(b'{"jsonrpc":"2.0","id":' + codec.dumps(msg_id) + b"," + data[1:])
+
+
+def replay_tool_reply(reply: CachedToolReply, msg_id: Any) -> RpcResult:
+    streaming, parts = reply
+    if not streaming:
+        return render_part(parts[0], msg_id)
+
+    async def events() -> AsyncIterator[Message]:
+        for part in parts:
+            yield render_part(part, msg_id)
+
+    return events()
+
+
+async def call_tool_cached(
+    entry: ToolEntry, msg: Dict[str, Any], arguments: Dict[str, Any], ctx: CallContext
+) -> RpcResult:
+    """
+    tools/call de uma tool com cache: devolve o resultado guardado ou, se
+    outra chamada idêntica já está executando, espera e reaproveita o dela.
+    """
+    cache = entry.cache
+    msg_id = msg.get("id")
+    key = cache_key(arguments)
+
+    cached = cache.get(key)
+    if cached is not None:
+        return replay_tool_reply(cached, msg_id)
+
+    if ctx.in_batch and cache.running(key):
+        # Esperar pode travar o batch: se a execução em andamento é um stream
+        # do mesmo batch, ele só é lido depois que todos os itens terminam
+        return await run_tool(entry, msg, arguments, ctx)
+
+    flight, first = cache.join(key)
+    if not first:
+        shared = await flight.wait()
+        if shared is not None:
+            return replay_tool_reply(shared, msg_id)
+        # A execução compartilhada não gerou nada reaproveitável
+        return await run_tool(entry, msg, arguments, ctx)
+
+    try:
+        result = await run_tool(entry, msg, arguments, ctx)
+    except BaseException:
+        cache.finish(key, flight, None)
+        raise
+
+    if isinstance(result, dict):
+        part = cached_part(result, msg_id)
+        if part is None:
+            cache.finish(key, flight, None)
+        else:
+            cache.finish(key, flight, (False, [part]), len(part[1]), not is_failure(result))
+        return result
+    if result is None or isinstance(result, (PreEncoded, EncodedStream)):
+        cache.finish(key, flight, None)
+        return result
+    # Se o stream for fechado sem ser lido, quem espera também é liberado
+    return HeldStream(
+        record_tool_stream(cache, key, flight, result, msg_id),
+        lambda: cache.finish(key, flight, None),
+    )
+
+
+async def record_tool_stream(
+    cache: ToolResultCache[CachedToolReply],
+    key: str,
+    flight: InFlight[CachedToolReply],
+    messages: AsyncIterator[Message],
+    msg_id: Any,
+) -> AsyncIterator[Message]:
+    """
+    Repassa o stream da tool e grava a sequência de eventos para o cache.
+    Passando de cache.max_bytes (ou com uma mensagem que não dá para
+    guardar), para de gravar e libera na hora as chamadas idênticas que
+    esperam: elas executam por conta própria, em paralelo, em vez de esperar
+    este stream acabar para nada.
+    """
+    parts: Optional[List[CachedPart]] = []
+    size = 0
+    complete = False
+    failed = False
+    try:
+        async for message in messages:
+            if isinstance(message, dict) and "method" not in message:
+                failed = failed or is_failure(message)
+            part = cached_part(message, msg_id) if parts is not None else None
+            if part is None:
+                if parts is not None:
+                    parts = None
+                    cache.finish(key, flight, None)
+                yield message
+                continue
+            size += len(part[1])
+            if size > cache.max_bytes:
+                parts = None
+                cache.finish(key, flight, None)
+            else:
+                parts.append(part)
+            # Já serializada: o SSE não precisa codificar de novo
+            yield render_part(part, msg_id)
+        complete = parts is not None and bool(parts) and parts[-1][0]
+    finally:
+        if complete:
+            cache.finish(key, flight, (True, parts), size, not failed)
+        else:
+            cache.finish(key, flight, None)
+
+
+def tool_cache_stats() -> Dict[str, Dict[str, int]]:
+    return {
+        entry.name: entry.cache.stats()
+        for entry in tool_registry.values()
+        if entry.cache is not None
+    }
+
+
+def register_resource(
+    uri: str,
+    *,
+    name: str,
+    description: str,
+    mime_type: str,
+    path: str,
+) -> Dict[str, Any]:
+    """
+    Registra (ou substitui) um resource exposto em resources/list, cujo
+    conteúdo é lido do arquivo em path.
+    """
+    entry = {
+        "uri": uri,
+        "name": name,
+        "description": description,
+        "mimeType": mime_type,
+    }
+    previous = resource_store.get(uri)
+    file = resource_store.add(uri, path, mime_type)
+    resource_registry.add(uri, entry)
+    notify_list_changed("resources")
+    if previous is not None and uri in resource_subscribers:
+        # Substituído com quem já estava inscrito: vigia o arquivo novo
+        resource_watcher.unwatch(previous.path)
+        resource_watcher.watch(file.path)
+        notify_resource_updated(uri)
+    return entry
+
+
+def unregister_resource(uri: str) -> Optional[Dict[str, Any]]:
+    file = resource_store.remove(uri)
+    if file is not None and resource_subscribers.pop(uri, None):
+        resource_watcher.unwatch(file.path)
+    entry = resource_registry.remove(uri)
+    if entry is not None:
+        notify_list_changed("resources")
+    return entry
+
+
+def register_resource_directory(directory: str, uri_prefix: str) -> int:
+    """
+    Registra cada arquivo de directory (recursivamente) como
+    <uri_prefix><caminho relativo>. Devolve quantos arquivos foram registrados.
+    """
+    count = 0
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            relative = os.path.relpath(path, directory).replace(os.sep, "/")
+            mime_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            register_resource(
+                uri_prefix + relative,
+                name=relative,
+                description=f"File {relative}",
+                mime_type=mime_type,
+                path=path,
+            )
+            count += 1
+    return count
+
+
+# URI -> sessões inscritas via resources/subscribe
+resource_subscribers: Dict[str, Set[str]] = {}
+
+
+def subscribe_resource(session_id: str, uri: str) -> None:
+    sessions = resource_subscribers.setdefault(uri, set())
+    if not sessions:
+        # Só vigiamos arquivos com alguém inscrito
+        resource_watcher.watch(resource_store.get(uri).path)
+    sessions.add(session_id)
+
+
+def unsubscribe_resource(session_id: str, uri: str) -> None:
+    sessions = resource_subscribers.get(uri)
+    if not sessions or session_id not in sessions:
+        return
+    sessions.discard(session_id)
+    if not sessions:
+        del resource_subscribers[uri]
+        file = resource_store.get(uri)
+        if file is not None:
+            resource_watcher.unwatch(file.path)
+
+
+def unsubscribe_session(session_id: str) -> None:
+    for uri in list(resource_subscribers):
+        unsubscribe_resource(session_id, uri)
+
+
+def notify_resource_updated(uri: str) -> None:
+    """
+    Manda notifications/resources/updated para as sessões inscritas em uri.
+    """
+    sessions = resource_subscribers.get(uri)
+    if not sessions:
+        return
+    # Sessões que expiraram sem DELETE deixam de ser avisadas
+    for session_id in [s for s in sessions if session_manager.backend.get(s) is None]:
+        unsubscribe_resource(session_id, uri)
+    publish_notification(
+        {
+            "jsonrpc": "2.0",
+            "method": "notifications/resources/updated",
+            "params": {"uri": uri},
+        },
+        list(resource_subscribers.get(uri, ())),
+    )
+
+
+def on_resource_files_changed(paths: Set[str]) -> None:
+    for path in paths:
+        for uri in list(resource_store.uris_at(path)):
+            notify_resource_updated(uri)
+
+
+resource_watcher = FileWatcher(
+    on_change=on_resource_files_changed,
+    debounce=RESOURCE_DEBOUNCE,
+    poll_interval=RESOURCE_POLL_INTERVAL,
+    backend=RESOURCE_WATCH,
+)
+
+
+def method(name: str, **meta: Any) -> Callable[[MethodHandler], MethodHandler]:
+    """
+    Decorator: @method("tools/list") registra o handler do método.
+    """
+
+    def decorator(fn: MethodHandler) -> MethodHandler:
+        register_method(name, fn, **meta)
+        return fn
+
+    return decorator
+
+
+def tool(
+    name: str,
+    *,
+    description: str,
+    schema: Dict[str, Any],
+    **meta: Any,
+) -> Callable[[ToolHandler], ToolHandler]:
+    """
+    Decorator: @tool("get_weather", description=..., schema=...) registra a tool.
+    """
+
+    def decorator(fn: ToolHandler) -> ToolHandler:
+        register_tool(name, fn, description=description, schema=schema, **meta)
+        return fn
+
+    return decorator
+
+
+def encode_message(message: Message) -> bytes:
+    if isinstance(message, PreEncoded):
+        return message.data
+    started = time.perf_counter()
+    data = codec.dumps(message)
+    serialization_time.observe(time.perf_counter() - started)
+    return data
+
+
+def json_response(
+    body: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Equivalente ao JSONResponse, mas serializando com o codec do projeto.
+    """
+    return Response(
+        codec.dumps(body),
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def make_sse_event(payload: Message) -> bytes:
     """
     Converte um dict em um evento SSE simples no formato:
 
@@ -23,193 +1201,981 @@ def make_sse_event(payload: Dict[str, Any]) -> bytes:
 
     (seguido de linha em branco)
     """
-    data = json.dumps(payload, ensure_ascii=False)
-    text = f"data: {data}\n\n"
-    return text.encode("utf-8")
+    return b"data: " + encode_message(payload) + b"\n\n"
 
 
-@app.post("/mcp")
-async def mcp_post(request: Request):
+def make_tool_result(msg_id: Any, text: str, is_error: bool = False) -> Dict[str, Any]:
+    return {
+        "jsonrpc": "2.0",
+        "id": msg_id,
+        "result": {
+            "content": [
+                {"type": "text", "text": text}
+            ],
+            "isError": is_error,
+        },
+    }
+
+
+def make_error(msg_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {
+        "jsonrpc": "2.0",
+        "id": msg_id,
+        "error": {
+            "code": code,
+            "message": message,
+        },
+    }
+
+
+def request_meta(msg: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Endpoint principal MCP (Streamable HTTP).
+    params._meta do request. Ele só traz dicas opcionais (progressToken,
+    ifNoneMatch): se não é um objeto, é ignorado ({}).
+    """
+    params = msg.get("params")
+    meta = params.get("_meta") if isinstance(params, dict) else None
+    return meta if isinstance(meta, dict) else {}
 
-    - Sempre recebe JSON (um único objeto).
-    - Se tiver "method": tratamos como request ou notification.
-    - Se tiver "id" e "result" (sem "method"): tratamos como response (por exemplo, de elicitation).
+
+def make_progress(token: Any, item: ToolProgress) -> Dict[str, Any]:
+    params: Dict[str, Any] = {"progressToken": token, "progress": item.progress}
+    if item.total is not None:
+        params["total"] = item.total
+    if item.message is not None:
+        params["message"] = item.message
+    return {"jsonrpc": "2.0", "method": "notifications/progress", "params": params}
+
+
+async def stream_tool_output(
+    msg: Dict[str, Any], ctx: CallContext, output: AsyncIterator[Any]
+) -> AsyncIterator[Message]:
+    """
+    Transforma a saída de uma tool em streaming nas mensagens SSE do
+    tools/call. output produz:
+
+    - str: um pedaço do resultado, que vira um item de texto de "content"
+      (a concatenação dos textos é a saída inteira);
+    - ToolProgress: notifications/progress, com o progressToken do request;
+    - dict: uma notification qualquer (log, por exemplo).
+
+    Cada pedaço é serializado e enviado assim que a tool o produz, sem montar
+    o resultado em memória. Como o resultado é um evento SSE só, aberto desde
+    o primeiro pedaço de texto, as notifications que vêm depois dele vão pelo
+    stream GET /mcp da sessão.
+    """
+    msg_id = msg.get("id")
+    token = request_meta(msg).get("progressToken")
+
+    def notification(item: Any) -> Optional[Dict[str, Any]]:
+        if isinstance(item, ToolProgress):
+            return make_progress(token, item) if token is not None else None
+        return item
+
+    first: Optional[str] = None
+    try:
+        async for item in output:
+            if isinstance(item, str):
+                if item:
+                    first = item
+                    break
+                continue
+            message = notification(item)
+            if message is not None:
+                yield message
+    except Exception as exc:
+        yield make_tool_result(msg_id, f"Tool failed: {exc}", is_error=True)
+        return
+    if first is None:
+        yield {"jsonrpc": "2.0", "id": msg_id, "result": {"content": [], "isError": False}}
+        return
+
+    def text_item(text: str) -> bytes:
+        return codec.dumps({"type": "text", "text": text})
+
+    async def lines() -> AsyncIterator[bytes]:
+        yield b'{"jsonrpc":"2.0","id":' + codec.dumps(msg_id) + b',"result":{"content":['
+        yield text_item(first)
+        is_error = b"false"
+        try:
+            async for item in output:
+                if isinstance(item, str):
+                    if item:
+                        yield b"," + text_item(item)
+                else:
+                    message = notification(item)
+                    if message is not None and ctx.session_id is not None:
+                        publish_notification(message, [ctx.session_id])
+                # Uma tool que produz tudo de uma vez não trava o event loop
+                await asyncio.sleep(0)
+        except Exception as exc:
+            # O resultado já começou: o erro entra nele, com isError
+            yield b"," + text_item(f"Tool failed: {exc}")
+            is_error = b"true"
+        yield b'],"isError":' + is_error + b"}}"
+
+    yield StreamedMessage(lines())
+
+
+def sse_stream(
+    messages: AsyncIterator[Message], session_id: Optional[str]
+) -> AsyncIterator[bytes]:
     """
-    body = await request.json()
+    Stream SSE retomável: as mensagens são produzidas em uma task própria e
+    guardadas no replay_store. Se a conexão cair, a task continua e o
+    cliente retoma com GET /mcp + Last-Event-ID.
+    """
+    if session_id is None:
+        return sse_events(messages)
+
+    stream = replay_store.create(session_id)
+
+    async def produce() -> None:
+        error: Optional[Exception] = None
+        try:
+            async for message in messages:
+                if isinstance(message, StreamedMessage):
+                    # Cada linha sai assim que fica pronta; o id vai no fim
+                    async for line in message.lines:
+                        stream.append(b"data: " + line + b"\n", end=False)
+                        await stream.wait_for_room()
+                    stream.append(b"\n")
+                elif isinstance(message, EncodedStream):
+                    stream.append(b"data: ", end=False)
+                    async for chunk in encoded_chunks(message):
+                        stream.append(chunk, end=False)
+                        await stream.wait_for_room()
+                    stream.append(b"\n", end=False)
+                    stream.append(b"\n")
+                else:
+                    stream.append(make_sse_event(message))
+                await stream.wait_for_room()
+        except Exception as exc:
+            error = exc
+        finally:
+            stream.finish(error)
+
+    stream.source = asyncio.create_task(produce())
+    return replay_events(stream, -1)
+
+
+async def sse_events(messages: AsyncIterator[Message]) -> AsyncIterator[bytes]:
+    """
+    Stream SSE simples, sem replay.
+    """
+    async for message in messages:
+        if isinstance(message, StreamedMessage):
+            async for line in message.lines:
+                yield b"data: " + line + b"\n"
+            yield b"\n"
+        elif isinstance(message, EncodedStream):
+            yield b"data: "
+            async for chunk in encoded_chunks(message):
+                yield chunk
+            yield b"\n\n"
+        else:
+            yield make_sse_event(message)
+
+
+async def encoded_chunks(message: EncodedStream) -> AsyncIterator[bytes]:
+    """
+    Os pedaços de um EncodedStream dentro de um stream SSE. Todos vão na mesma
+    linha "data:" (eles cortam strings JSON ao meio); cada um é lido em uma
+    thread, para o disco não travar o event loop.
+    """
+    chunks = iter(message.chunks)
+    while True:
+        chunk = await asyncio.to_thread(next, chunks, None)
+        if chunk is None:
+            return
+        yield chunk
 
-    if isinstance(body, list):
-        # Para simplificar, não suportamos batch neste demo
-        return JSONResponse(
-            {
-                "jsonrpc": "2.0",
-                "id": None,
-                "error": {
-                    "code": -32600,
-                    "message": "Batch requests are not supported in this demo"
-                },
-            },
-            status_code=400,
+
+async def replay_events(stream: ReplayStream, after: int) -> AsyncIterator[bytes]:
+    """
+    Entrega os eventos de stream com seq maior que after, até ele terminar.
+    """
+    stream.attach()
+    try:
+        seq = after
+        while True:
+            events = stream.since(seq)
+            if events:
+                seq = events[-1][0]
+                yield b"".join(event for _, event in events)
+                stream.ack(seq)
+            elif stream.done:
+                if stream.error is not None:
+                    raise stream.error
+                return
+            else:
+                await stream.wait()
+    finally:
+        stream.detach()
+
+
+def to_response(result: RpcResult, ctx: CallContext) -> Response:
+    """
+    Converte o resultado de um handler na resposta HTTP correspondente.
+    """
+    if result is None:
+        return Response(status_code=202, headers=ctx.response_headers)
+    if isinstance(result, EncodedStream):
+        chunks: Any = result.chunks
+        if ctx.encoding is not None:
+            # Iterator síncrono: a compressão roda na thread do StreamingResponse
+            chunks = compression.compress_chunks(ctx.encoding, chunks)
+        return StreamingResponse(
+            chunks,
+            media_type="application/json",
+            headers=encoded_headers(ctx.encoding, ctx.response_headers),
         )
+    if isinstance(result, (dict, PreEncoded)):
+        with span(ctx.trace, "serialize"):
+            data = encode_message(result)
+        compressed = result.compressed if isinstance(result, PreEncoded) else None
+        return body_response(data, ctx, compressed)
+    return sse_response(sse_stream(result, ctx.session_id), ctx)
+
+
+def encoded_headers(encoding: Optional[str], headers: Dict[str, str]) -> Dict[str, str]:
+    if encoding is None:
+        return headers
+    return dict(headers, **{"Content-Encoding": encoding, "Vary": "Accept-Encoding"})
+
+
+def body_response(
+    data: bytes,
+    ctx: CallContext,
+    compressed: Optional[Callable[[str], Optional[bytes]]] = None,
+) -> Response:
+    """
+    Resposta JSON com o corpo pronto, comprimido se o cliente aceita e se
+    passa de COMPRESS_MIN_BYTES (abaixo disso, o ganho não paga o custo).
+    compressed é o de PreEncoded.
+    """
+    encoding = ctx.encoding if len(data) >= COMPRESS_MIN_BYTES else None
+    if encoding is not None:
+        with span(ctx.trace, "compress", encoding=encoding, bytes=len(data)):
+            ready = compressed(encoding) if compressed is not None else None
+            data = ready if ready is not None else compression.compress(encoding, data)
+    return Response(
+        data,
+        media_type="application/json",
+        headers=encoded_headers(encoding, ctx.response_headers),
+    )
+
+
+def sse_response(events: AsyncIterator[bytes], ctx: CallContext) -> Response:
+    """
+    Resposta SSE. Comprimida, cada chunk é descarregado do compressor na hora
+    (sync flush): o cliente recebe cada evento assim que ele é produzido.
+    """
+    chunks = stream_counter.count(events)
+    if ctx.encoding is not None:
+        chunks = compression.compress_async_chunks(ctx.encoding, chunks, flush_each=True)
+    return StreamingResponse(
+        chunks,
+        media_type="text/event-stream",
+        headers=encoded_headers(ctx.encoding, ctx.response_headers),
+    )
+
+
+async def dispatch(msg: Any, ctx: CallContext) -> RpcResult:
+    """
+    Processa uma única mensagem JSON-RPC (request, notification ou response).
+    """
+    if not isinstance(msg, dict):
+        return make_error(None, -32600, "Invalid Request")
 
-    method = body.get("method")
+    method = msg.get("method")
 
     # Requests / notifications
     if method is not None:
-        if method == "initialize":
-            return await handle_initialize(body)
+        if not isinstance(method, str):
+            return make_error(msg.get("id"), -32600, "Invalid Request")
+        entry = method_registry.get(method)
+        if entry is None:
+            # Um label por método desconhecido deixaria o /metrics sem limite
+            request_count.inc("unknown")
+            request_errors.inc("unknown")
+            return make_error(msg.get("id"), -32601, f"Method not found: {method}")
+        if ctx.in_batch and not entry.meta.get("batchable", True):
+            return make_error(
+                msg.get("id"), -32600, f"{method} cannot be part of a batch"
+            )
+        request_count.inc(method)
+        started = time.perf_counter()
+        try:
+            result = await entry.handler(msg, ctx)
+        except Exception:
+            request_errors.inc(method)
+            raise
+        finally:
+            ended = time.perf_counter()
+            request_latency.observe(ended - started, method)
+            if ctx.trace is not None:
+                ctx.trace.add("handler", started, ended, method=method, id=msg.get("id"))
+        if isinstance(result, dict) and "error" in result:
+            request_errors.inc(method)
+        return result
 
-        if method == "notifications/initialized":
-            # Notification simples: retornamos 202 Accepted sem corpo
-            return Response(status_code=202)
+    # Responses (por exemplo, respostas de elicitation)
+    if msg.get("id") is not None:
+        await route_response(ctx.session_id, msg)
+    return None
 
-        if method == "tools/list":
-            return await handle_tools_list(body)
 
-        if method == "tools/call":
-            return await handle_tools_call(body)
+async def merge_streams(
+    streams: List[AsyncIterator[Message]],
+    limit: asyncio.Semaphore,
+) -> AsyncIterator[Message]:
+    """
+    Intercala as mensagens de vários streams em um só, na ordem em que ficam
+    prontas. Usado para multiplexar as tools com SSE de um batch.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def pump(stream: AsyncIterator[Message]) -> None:
+        try:
+            async with limit:
+                async for message in stream:
+                    await queue.put(message)
+        finally:
+            await close_stream(stream)
+            await queue.put(done)
+
+    tasks = [asyncio.create_task(pump(stream)) for stream in streams]
+    try:
+        pending = len(tasks)
+        while pending:
+            message = await queue.get()
+            if message is done:
+                pending -= 1
+                continue
+            yield message
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Propaga exceções das tools (não só o cancelamento)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def handle_batch(batch: List[Any], ctx: CallContext) -> Response:
+    """
+    Processa um batch JSON-RPC.
 
-        if method == "resources/list":
-            return await handle_resources_list(body)
+    Os itens rodam concorrentemente (até BATCH_CONCURRENCY por vez).
+    Notifications e responses não geram entrada no array de resposta. Se algum
+    item responder com streaming, todas as respostas vão em um único stream SSE.
+    """
+    if not batch:
+        return json_response(make_error(None, -32600, "Invalid Request"), status_code=400)
+
+    limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+    trace = ctx.trace
+
+    async def run(item: Any) -> RpcResult:
+        async with limit:
+            try:
+                result = await admitted(item, dispatch(item, ctx), trace)
+            except Rejected as exc:
+                # Sem vaga: só este item é recusado
+                result = rejected_error(item.get("id"), exc)
+            except Exception as exc:
+                # Um item com erro não derruba o resto do batch
+                msg_id = item.get("id") if isinstance(item, dict) else None
+                result = make_error(msg_id, -32603, f"Internal error: {exc}")
+        if isinstance(item, dict) and "method" in item and "id" not in item:
+            # Notification: nunca gera response
+            return None
+        return result
+
+    results = await asyncio.gather(*(run(item) for item in batch))
+
+    if any(is_message_stream(r) for r in results):
+        try:
+            stream_counter.check()
+        except Rejected as exc:
+            # Sem stream disponível: só os itens em streaming são recusados
+            for index, result in enumerate(results):
+                if is_message_stream(result):
+                    await close_stream(result)
+                    results[index] = rejected_error(batch[index].get("id"), exc)
+
+    replies = [r for r in results if isinstance(r, (dict, PreEncoded, EncodedStream))]
+    streams = [r for r in results if is_message_stream(r)]
+
+    if not replies and not streams:
+        return Response(status_code=202)
+
+    if not streams:
+        if any(isinstance(r, EncodedStream) for r in replies):
+            # Um resource grande no batch: o array também sai aos pedaços
+            return to_response(EncodedStream(batch_chunks(replies)), ctx)
+        with span(trace, "serialize"):
+            body = b"[" + b",".join(encode_message(r) for r in replies) + b"]"
+        return body_response(body, ctx)
+
+    async def multiplexed() -> AsyncIterator[Message]:
+        for reply in replies:
+            yield reply
+        async for message in merge_streams(streams, limit):
+            yield message
+
+    return sse_response(sse_stream(multiplexed(), ctx.session_id), ctx)
+
+
+def batch_chunks(replies: List[Message]) -> Iterator[bytes]:
+    yield b"["
+    for index, reply in enumerate(replies):
+        if index:
+            yield b","
+        if isinstance(reply, EncodedStream):
+            yield from reply.chunks
+        else:
+            yield encode_message(reply)
+    yield b"]"
+
+
+def check_session(request: Request) -> Union[Session, Response]:
+    """
+    Valida o Mcp-Session-Id do request: devolve a sessão ou a resposta de
+    erro (400 sem header, 404 para sessão desconhecida ou expirada, como pede
+    a especificação, para o cliente refazer o initialize).
+    """
+    session_id = request.headers.get("Mcp-Session-Id")
+    if not session_id:
+        return json_response(
+            make_error(None, -32600, "Missing Mcp-Session-Id header"),
+            status_code=400,
+        )
+    session = session_manager.get(session_id)
+    if session is None:
+        return json_response(
+            make_error(None, -32001, f"Session not found: {session_id}"),
+            status_code=404,
+        )
+    return session
 
-        if method == "resources/read":
-            return await handle_resources_read(body)
 
-        # Método desconhecido
-        return JSONResponse(
-            {
-                "jsonrpc": "2.0",
-                "id": body.get("id"),
-                "error": {
-                    "code": -32601,
-                    "message": f"Method not found: {method}",
-                },
-            },
-            status_code=200,
+@app.post("/mcp")
+async def mcp_post(request: Request):
+    """
+    Endpoint principal MCP (Streamable HTTP).
+
+    - Recebe JSON: um único objeto ou um batch (lista).
+    - Se tiver "method": tratamos como request ou notification.
+    - Se tiver "id" e "result" (sem "method"): tratamos como response (por exemplo, de elicitation).
+    """
+    received = time.perf_counter()
+    try:
+        data = await read_body(request)
+    except BodyTooLarge as exc:
+        return json_response(
+            make_error(None, -32700, f"Parse error: request body exceeds {exc.limit} bytes"),
+            status_code=413,
+        )
+    except Rejected as exc:
+        return json_response(
+            rejected_error(None, exc),
+            status_code=exc.status_code,
+            headers={"Retry-After": exc.retry_after_header},
         )
+    size = len(data)
+    try:
+        started = time.perf_counter()
+        body = codec.loads(data)
+        parsed = time.perf_counter()
+        parse_time.observe(parsed - started)
+    except codec.DecodeError:
+        return json_response(make_error(None, -32700, "Parse error"), status_code=400)
+    finally:
+        # Os bytes não ficam presos durante a execução (uma tool longa com
+        # argumentos grandes manteria o corpo e o objeto em memória)
+        del data
+        body_budget.release(size)
+
+    trace = start_trace(body, request, received) if tracer.enabled else None
+    if trace is None:
+        return await handle_post(request, body)
+    trace.add("read_body", received, started, bytes=size)
+    trace.add("parse", started, parsed)
+    try:
+        response = await handle_post(request, body, trace)
+    except BaseException:
+        tracer.finish(trace)
+        raise
+    return traced_response(response, trace)
+
+
+class BodyTooLarge(Exception):
+    def __init__(self, limit: int) -> None:
+        super().__init__(f"Request body exceeds {limit} bytes")
+        self.limit = limit
+
+
+async def read_body(request: Request) -> Union[bytes, bytearray]:
+    """
+    Lê o corpo do POST respeitando MAX_BODY_BYTES (levanta BodyTooLarge
+    assim que passa do limite, sem ler o resto) e reservando os bytes no
+    body_budget (levanta Rejected se não há espaço; quem recebe o corpo
+    libera len(corpo) depois do parse).
 
-    # Responses (por exemplo, respostas de elicitation)
-    msg_id = body.get("id")
-    if msg_id is not None and msg_id in elicitation_futures:
-        fut = elicitation_futures[msg_id]
-        if not fut.done():
-            fut.set_result(body.get("result"))
+    O corpo costuma chegar em um chunk só, que é devolvido como está; em
+    vários, vão para um único bytearray (sem lista de pedaços + join).
+    """
+    declared = request.headers.get("content-length")
+    if MAX_BODY_BYTES and declared is not None and declared.isdigit():
+        if int(declared) > MAX_BODY_BYTES:
+            raise BodyTooLarge(MAX_BODY_BYTES)
+
+    data: Union[bytes, bytearray] = b""
+    try:
+        async for chunk in request.stream():
+            if not chunk:
+                continue
+            size = len(data) + len(chunk)
+            if MAX_BODY_BYTES and size > MAX_BODY_BYTES:
+                raise BodyTooLarge(MAX_BODY_BYTES)
+            body_budget.reserve(len(chunk))
+            if not data:
+                data = chunk
+            else:
+                if isinstance(data, bytes):
+                    data = bytearray(data)
+                data += chunk
+    except BaseException:
+        body_budget.release(len(data))
+        raise
+    return data
+
+
+async def handle_post(request: Request, body: Any, trace: Optional[Trace] = None) -> Response:
+    # Só o initialize pode vir sem sessão
+    session = None
+    if not (isinstance(body, dict) and body.get("method") == "initialize"):
+        checked = check_session(request)
+        if isinstance(checked, Response):
+            return checked
+        session = checked
+
+    try:
+        rate_limiter.check(
+            session.id if session else request.client and request.client.host,
+            count_requests(body),
+        )
+    except Rejected as exc:
+        return rejected_response(body, exc)
+
+    encoding = (
+        compression.negotiate(request.headers.get("accept-encoding"), COMPRESSION)
+        if COMPRESSION
+        else None
+    )
+    if isinstance(body, list):
+        ctx = CallContext(session=session, in_batch=True, trace=trace, encoding=encoding)
+        return await handle_batch(body, ctx)
+
+    ctx = CallContext(session=session, trace=trace, encoding=encoding)
+    try:
+        result = await admitted(body, dispatch(body, ctx), trace)
+    except Rejected as exc:
+        return rejected_response(body, exc)
+    if is_message_stream(result):
+        # Respostas SSE contam no limite de streams abertos, como o GET
+        try:
+            stream_counter.check()
+        except Rejected as exc:
+            await close_stream(result)
+            return rejected_response(body, exc)
+    return to_response(result, ctx)
+
+
+def start_trace(body: Any, request: Request, received: float) -> Optional[Trace]:
+    if isinstance(body, list):
+        method = "batch"
+        rpc_id: Any = [item.get("id") for item in body if isinstance(item, dict)]
+    elif isinstance(body, dict):
+        method = body.get("method") or "response"
+        rpc_id = body.get("id")
+        if not isinstance(method, str):
+            method = "invalid"
+    else:
+        method, rpc_id = "invalid", None
+    return tracer.start(method, rpc_id, request.headers.get("Mcp-Session-Id"), received)
+
+
+def traced_response(response: Response, trace: Trace) -> Response:
+    """
+    Devolve o Mcp-Trace-Id ao cliente e encerra o trace: agora, ou, para
+    respostas em stream, quando o último chunk for enviado.
+    """
+    response.headers["Mcp-Trace-Id"] = trace.trace_id
+    if trace.session_id is None:
+        # initialize: a sessão nasce com a resposta
+        trace.session_id = response.headers.get("Mcp-Session-Id")
+    if not isinstance(response, StreamingResponse):
+        tracer.finish(trace)
+        return response
+
+    chunks = response.body_iterator
+    started = time.perf_counter()
+    finished = False
+
+    def finish() -> None:
+        nonlocal finished
+        if not finished:
+            finished = True
+            tracer.finish(trace)
+
+    async def traced() -> AsyncIterator[Any]:
+        first: Optional[float] = None
+        count = size = 0
+        try:
+            async for chunk in chunks:
+                if first is None:
+                    first = time.perf_counter()
+                count += 1
+                size += len(chunk)
+                yield chunk
+        finally:
+            trace.add(
+                "stream",
+                started,
+                time.perf_counter(),
+                firstChunkMs=round((first - started) * 1000, 3) if first is not None else None,
+                chunks=count,
+                bytes=size,
+            )
+            finish()
+
+    async def after() -> None:
+        # Se o cliente desconecta antes do corpo, traced nunca começa e seu
+        # finally não roda: o stream original ficaria aberto (com o que ele
+        # segura, como a vaga da admissão) e o profiler, ligado
+        if not finished:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            finish()
+
+    response.body_iterator = traced()
+    response.background = BackgroundTask(after)
+    return response
+
+
+def count_requests(body: Any) -> int:
+    """
+    Quantos requests (com id) há no corpo: notifications e responses não
+    entram nos limites, porque destravam trabalho que já está rodando
+    (cancelamento, resposta de elicitation).
+    """
+    items = body if isinstance(body, list) else [body]
+    return sum(1 for item in items if admission_priority(item) is not None)
 
-    # Requests contendo apenas responses/notifications retornam 202 Accepted
-    return Response(status_code=202)
+
+def admission_priority(msg: Any) -> Optional[int]:
+    """
+    Prioridade do request na fila de admissão (menor passa na frente:
+    métodos baratos, marcados com priority=0, antes de tools/call), ou
+    None se a mensagem não passa pela admissão.
+    """
+    if not isinstance(msg, dict) or "method" not in msg or "id" not in msg:
+        return None
+    # Método inválido: o dispatch responde -32600 sem executar nada
+    if not isinstance(msg["method"], str):
+        return None
+    entry = method_registry.get(msg["method"])
+    return entry.meta.get("priority", 1) if entry is not None else 0
+
+
+async def admitted(
+    msg: Any, call: Coroutine[Any, Any, RpcResult], trace: Optional[Trace] = None
+) -> RpcResult:
+    """
+    Executa call ocupando uma vaga do admission (levanta Rejected se não
+    houver vaga a tempo). Se o resultado é um stream, a vaga só é liberada
+    quando ele termina: o trabalho de uma tool em streaming acontece
+    enquanto o stream é consumido.
+    """
+    priority = admission_priority(msg)
+    if priority is None:
+        return await call
+    try:
+        with span(trace, "admission", id=msg.get("id")):
+            await admission.acquire(priority)
+    except BaseException:
+        call.close()
+        raise
+    try:
+        result = await call
+    except BaseException:
+        admission.release()
+        raise
+    if is_message_stream(result):
+        return HeldStream(result, admission.release)
+    admission.release()
+    return result
+
+
+def is_message_stream(result: RpcResult) -> bool:
+    return result is not None and not isinstance(result, (dict, PreEncoded, EncodedStream))
+
+
+async def close_stream(stream: AsyncIterator[Any]) -> None:
+    aclose = getattr(stream, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+def rejected_error(msg_id: Any, exc: Rejected) -> Dict[str, Any]:
+    error = make_error(msg_id, -32000, str(exc))
+    error["error"]["data"] = {"retryAfter": exc.retry_after}
+    return error
+
+
+def rejected_response(body: Any, exc: Rejected) -> Response:
+    """
+    429/503 com Retry-After e o erro JSON-RPC de cada request recusado.
+    """
+    if isinstance(body, list):
+        payload: Any = [
+            rejected_error(item["id"], exc)
+            for item in body
+            if admission_priority(item) is not None
+        ]
+    else:
+        payload = rejected_error(body.get("id") if isinstance(body, dict) else None, exc)
+    return json_response(
+        payload,
+        status_code=exc.status_code,
+        headers={"Retry-After": exc.retry_after_header},
+    )
 
 
-async def handle_initialize(msg: Dict[str, Any]) -> JSONResponse:
+@method("initialize", batchable=False, priority=0)
+async def handle_initialize(msg: Dict[str, Any], ctx: CallContext) -> PreEncoded:
     """
     Trata o método initialize.
     Cria uma sessão e devolve capabilities básicas.
     """
-    session_id = str(uuid.uuid4())
-    session_store[session_id] = {}
+    session = session_manager.create()
 
-    response_body = {
-        "jsonrpc": "2.0",
-        "id": msg.get("id"),
-        "result": {
-            "protocolVersion": "2025-03-26",
-            "capabilities": {
-                "logging": {},
-                "prompts": {"listChanged": True},
-                "resources": {"subscribe": True, "listChanged": True},
-                "tools": {"listChanged": True},
-            },
-            "serverInfo": {
-                "name": "ExampleServer",
-                "version": "1.0.0",
-            },
-            "instructions": "Use the tools and resources to help the user.",
+    ctx.response_headers["Mcp-Session-Id"] = session.id
+    return response_cache.reply("initialize", msg.get("id"), build_initialize_result)
+
+
+def build_initialize_result() -> Dict[str, Any]:
+    return {
+        "protocolVersion": "2025-03-26",
+        "capabilities": {
+            "logging": {},
+            "prompts": {"listChanged": True},
+            "resources": {"subscribe": True, "listChanged": True},
+            "tools": {"listChanged": True},
         },
+        "serverInfo": {
+            "name": "ExampleServer",
+            "version": "1.0.0",
+        },
+        "instructions": "Use the tools and resources to help the user.",
     }
 
-    headers = {"Mcp-Session-Id": session_id}
-    return JSONResponse(response_body, headers=headers)
+
+@method("notifications/initialized")
+async def handle_initialized(msg: Dict[str, Any], ctx: CallContext) -> None:
+    """
+    Notification simples: retornamos 202 Accepted sem corpo.
+    """
+    return None
 
 
-async def handle_tools_list(msg: Dict[str, Any]) -> JSONResponse:
+@method("tools/list", priority=0)
+async def handle_tools_list(msg: Dict[str, Any], ctx: CallContext) -> Message:
     """
-    Lista duas tools:
-    - get_weather
-    - register_user (que usa elicitation)
+    Lista as tools registradas no tool_registry, paginando por cursor.
     """
-    response_body = {
-        "jsonrpc": "2.0",
-        "id": msg.get("id"),
-        "result": {
-            "tools": [
-                {
-                    "name": "get_weather",
-                    "description": "Get current weather information for a location",
-                    "inputSchema": {
-                        "type": "object",
-                        "properties": {
-                            "location": {
-                                "type": "string",
-                                "description": "City name or zip code",
-                            },
-                            "forecastDays": {
-                                "type": "integer",
-                                "description": "Number of days for forecast (optional)",
-                            },
-                        },
-                        "required": ["location"],
-                    },
-                },
-                {
-                    "name": "register_user",
-                    "description": "Register a user using elicitation to collect profile data",
-                    "inputSchema": {
-                        "type": "object",
-                        "properties": {
-                            "useElicitation": {
-                                "type": "boolean",
-                                "description": "If true, server will ask user for details using elicitation",
-                            }
-                        },
-                        "required": ["useElicitation"],
-                    },
-                },
-            ],
-            "nextCursor": None,
-        },
+    cursor = (msg.get("params") or {}).get("cursor")
+    # O cursor vira parte da chave do response_cache: tem que ser hashable
+    if cursor is not None and not isinstance(cursor, str):
+        return make_error(msg.get("id"), -32602, "Invalid params: cursor must be a string")
+    try:
+        return response_cache.reply(
+            ("tools/list", cursor),
+            msg.get("id"),
+            lambda: build_tools_list_result(cursor),
+        )
+    except InvalidCursor:
+        return make_error(msg.get("id"), -32602, f"Invalid cursor: {cursor}")
+
+
+def build_tools_list_result(cursor: Optional[str]) -> Dict[str, Any]:
+    entries, next_cursor = tool_registry.page(cursor, PAGE_SIZE)
+    return {
+        "tools": [entry.describe() for entry in entries],
+        "nextCursor": next_cursor,
     }
-    return JSONResponse(response_body)
 
 
-async def handle_tools_call(msg: Dict[str, Any]):
+@method("tools/call")
+async def handle_tools_call(msg: Dict[str, Any], ctx: CallContext) -> RpcResult:
     """
-    Trata tools/call para:
-    - get_weather (normal e streaming)
-    - register_user (com elicitation)
+    Trata tools/call fazendo o dispatch pelo tool_registry.
     """
     params = msg.get("params") or {}
     name = params.get("name")
     arguments = params.get("arguments") or {}
+    if not isinstance(name, str):
+        return make_error(msg.get("id"), -32602, "Invalid params: name must be a string")
+
+    entry = tool_registry.get(name)
+    if entry is not None:
+        # Argumentos inválidos nunca chegam ao handler (nem abrem um stream)
+        error = entry.validate(arguments)
+        if error is not None:
+            return make_error(msg.get("id"), -32602, f"Invalid params: {error}")
+        if entry.cache is not None:
+            return await call_tool_cached(entry, msg, arguments, ctx)
+        return await run_tool(entry, msg, arguments, ctx)
 
-    if name == "get_weather":
-        return await handle_get_weather(msg, arguments)
+    # Tool não encontrada
+    return make_error(msg.get("id"), -32601, f"Tool not found: {name}")
 
-    if name == "register_user":
-        return await handle_register_user(msg, arguments)
 
-    # Tool não encontrada
-    response_body = {
-        "jsonrpc": "2.0",
-        "id": msg.get("id"),
-        "error": {
-            "code": -32601,
-            "message": f"Tool not found: {name}",
-        },
-    }
-    return JSONResponse(response_body, status_code=200)
+# Execuções de tools em andamento, por (sessão, id do request), para
+# notifications/cancelled
+running_calls: Dict[Tuple[Optional[str], Any], asyncio.Future] = {}
+cancel_requested: Set[Tuple[Optional[str], Any]] = set()
 
 
-async def handle_get_weather(msg: Dict[str, Any], arguments: Dict[str, Any]):
+async def run_tool(
+    entry: ToolEntry, msg: Dict[str, Any], arguments: Dict[str, Any], ctx: CallContext
+) -> RpcResult:
+    """
+    Executa a tool, registrando as métricas da execução.
+    """
+    tool_calls.inc(entry.name)
+    started = time.perf_counter()
+    try:
+        result = await execute_tool(entry, msg, arguments, ctx)
+    finally:
+        ended = time.perf_counter()
+        tool_latency.observe(ended - started, entry.name)
+        if ctx.trace is not None:
+            ctx.trace.add(
+                "tool", started, ended, tool=entry.name, execution=entry.meta.get("execution", "async")
+            )
+    if isinstance(result, dict) and is_failure(result):
+        tool_errors.inc(entry.name)
+    return result
+
+
+async def execute_tool(
+    entry: ToolEntry, msg: Dict[str, Any], arguments: Dict[str, Any], ctx: CallContext
+) -> RpcResult:
+    """
+    Executa o handler da tool respeitando max_concurrency. Se o resultado é
+    um stream, a vaga só é liberada quando ele termina.
+    """
+    if entry.limit is None:
+        return await call_handler(entry, msg, arguments, ctx)
+    await entry.limit.acquire()
+    try:
+        result = await call_handler(entry, msg, arguments, ctx)
+    except BaseException:
+        entry.limit.release()
+        raise
+    if is_message_stream(result):
+        return HeldStream(result, entry.limit.release)
+    entry.limit.release()
+    return result
+
+
+async def call_handler(
+    entry: ToolEntry, msg: Dict[str, Any], arguments: Dict[str, Any], ctx: CallContext
+) -> RpcResult:
+    """
+    Chama o handler com o timeout da tool. A execução pode ser cancelada pelo
+    cliente com notifications/cancelled (o cancelamento chega até o pool, ver
+    executors.py). Falhas viram um resultado com isError, como pede o MCP
+    para erros de tool.
+
+    Timeout e cancelamento valem até o handler devolver o resultado: uma
+    tool em streaming já devolveu o stream quando começa a produzir, e o
+    resto da execução não é interrompido por eles.
+    """
+    msg_id = msg.get("id")
+    key = (ctx.session_id, msg_id)
+    call = asyncio.ensure_future(entry.handler(msg, arguments, ctx))
+    running_calls[key] = call
+    try:
+        return await asyncio.wait_for(call, entry.meta.get("timeout"))
+    except asyncio.TimeoutError:
+        return make_tool_result(
+            msg_id, f"Tool {entry.name} timed out after {entry.meta['timeout']}s", is_error=True
+        )
+    except asyncio.CancelledError:
+        if key not in cancel_requested:
+            raise
+        return make_error(msg_id, -32800, "Request cancelled")
+    except Exception as exc:
+        return make_tool_result(msg_id, f"Tool {entry.name} failed: {exc}", is_error=True)
+    finally:
+        running_calls.pop(key, None)
+        cancel_requested.discard(key)
+
+
+@method("notifications/cancelled")
+async def handle_cancelled(msg: Dict[str, Any], ctx: CallContext) -> None:
+    """
+    O cliente desistiu de um request: cancela a execução da tool, se ainda
+    estiver rodando.
+    """
+    params = msg.get("params")
+    request_id = params.get("requestId") if isinstance(params, dict) else None
+    # Params ou requestId inválidos são ignorados, como pede a especificação
+    if not isinstance(request_id, (str, int)) or isinstance(request_id, bool):
+        return None
+    key = (ctx.session_id, request_id)
+    call = running_calls.get(key)
+    if call is not None and not call.done():
+        cancel_requested.add(key)
+        call.cancel()
+    return None
+
+
+# Dias de previsão por pedaço do resultado em streaming
+FORECAST_BATCH_DAYS = 500
+# Cada dia são ~20 bytes do resultado, que o cache de tools guarda inteiro
+FORECAST_MAX_DAYS = 100_000
+
+
+@tool(
+    "get_weather",
+    description="Get current weather information for a location",
+    schema={
+        "type": "object",
+        "properties": {
+            "location": {
+                "type": "string",
+                "description": "City name or zip code",
+            },
+            "forecastDays": {
+                "type": "integer",
+                "maximum": FORECAST_MAX_DAYS,
+                "description": "Number of days for forecast (optional)",
+            },
+        },
+        "required": ["location"],
+    },
+    # Determinística no demo: chamadas iguais reaproveitam o resultado
+    cache_ttl=60,
+)
+async def handle_get_weather(
+    msg: Dict[str, Any], arguments: Dict[str, Any], ctx: CallContext
+) -> RpcResult:
     """
     Implementação da tool get_weather.
     - Se forecastDays não é enviado: resposta HTTP normal (JSON único).
@@ -235,46 +2201,49 @@ async def handle_get_weather(msg: Dict[str, Any], arguments: Dict[str, Any]):
                 "isError": False,
             },
         }
-        return JSONResponse(response_body)
+        return response_body
 
-    # Resposta em streaming SSE
-    async def event_gen():
-        log_msg = {
+    # Resposta em streaming SSE: os dias saem em lotes, à medida que são
+    # gerados, então a memória não depende de forecastDays
+    async def forecast_output() -> AsyncIterator[Any]:
+        days = int(forecast_days)
+        yield {
             "jsonrpc": "2.0",
             "method": "notifications/log",
             "params": {
                 "level": "info",
-                "message": f"Starting {forecast_days}-day forecast for {location}",
+                "message": f"Starting {days}-day forecast for {location}",
                 "timestamp": "2025-12-11T00:00:00Z",
             },
         }
-        yield make_sse_event(log_msg)
-        await asyncio.sleep(0.5)
-
-        forecast_lines = []
-        for day in range(1, int(forecast_days) + 1):
-            forecast_lines.append(f"Day {day}: 25°C, clear")
-
-        content_text = (
-            f"{forecast_days}-day forecast for {location}:\n"
-            + "\n".join(forecast_lines)
-        )
-        result_msg = {
-            "jsonrpc": "2.0",
-            "id": msg.get("id"),
-            "result": {
-                "content": [
-                    {"type": "text", "text": content_text}
-                ],
-                "isError": False,
-            },
-        }
-        yield make_sse_event(result_msg)
-
-    return StreamingResponse(event_gen(), media_type="text/event-stream")
-
-
-async def handle_register_user(msg: Dict[str, Any], arguments: Dict[str, Any]):
+        yield ToolProgress(0, days)
+        yield f"{days}-day forecast for {location}:\n"
+        for start in range(1, days + 1, FORECAST_BATCH_DAYS):
+            end = min(start + FORECAST_BATCH_DAYS - 1, days)
+            lines = "\n".join(f"Day {day}: 25°C, clear" for day in range(start, end + 1))
+            yield lines + "\n" if end < days else lines
+            yield ToolProgress(end, days)
+
+    return stream_tool_output(msg, ctx, forecast_output())
+
+
+@tool(
+    "register_user",
+    description="Register a user using elicitation to collect profile data",
+    schema={
+        "type": "object",
+        "properties": {
+            "useElicitation": {
+                "type": "boolean",
+                "description": "If true, server will ask user for details using elicitation",
+            }
+        },
+        "required": ["useElicitation"],
+    },
+)
+async def handle_register_user(
+    msg: Dict[str, Any], arguments: Dict[str, Any], ctx: CallContext
+) -> RpcResult:
     """
     Implementação da tool register_user com elicitation.
     """
@@ -293,15 +2262,16 @@ async def handle_register_user(msg: Dict[str, Any], arguments: Dict[str, Any]):
                 "isError": True,
             },
         }
-        return JSONResponse(response_body, status_code=200)
+        return response_body
 
     call_id = msg.get("id")
 
     async def event_gen_register():
-        elic_id = 100
-        loop = asyncio.get_event_loop()
-        fut: asyncio.Future = loop.create_future()
-        elicitation_futures[elic_id] = fut
+        try:
+            elic_id, fut = pending_requests.create(ctx.session_id)
+        except PendingRequestsFull as exc:
+            yield make_tool_result(call_id, f"Cannot start elicitation: {exc}", is_error=True)
+            return
 
         # Primeiro, o servidor cria uma elicitation
         create_msg = {
@@ -331,14 +2301,29 @@ async def handle_register_user(msg: Dict[str, Any], arguments: Dict[str, Any]):
                 },
             },
         }
-        yield make_sse_event(create_msg)
-
-        # Espera o client responder a elicitation
-        result = await fut
-
-        full_name = result["content"]["fullName"]
-        email = result["content"]["email"]
-        accept_terms = result["content"]["acceptTerms"]
+        # O finally também roda se o cliente desconectar (o stream é
+        # cancelado), então a entrada pendente nunca fica para trás.
+        try:
+            yield create_msg
+
+            # Espera o client responder a elicitation
+            try:
+                response = await asyncio.wait_for(fut, ELICITATION_TIMEOUT)
+            except asyncio.TimeoutError:
+                yield make_tool_result(call_id, "Elicitation timed out", is_error=True)
+                return
+        finally:
+            pending_requests.discard(ctx.session_id, elic_id)
+
+        result = response.get("result") or {}
+        content = result.get("content") or {}
+        if "error" in response or result.get("action") != "accept":
+            yield make_tool_result(call_id, "Registration cancelled by the user", is_error=True)
+            return
+
+        full_name = content.get("fullName")
+        email = content.get("email")
+        accept_terms = content.get("acceptTerms")
 
         text = (
             "User registered successfully:\n"
@@ -357,69 +2342,200 @@ async def handle_register_user(msg: Dict[str, Any], arguments: Dict[str, Any]):
                 "isError": False,
             },
         }
-        yield make_sse_event(final_msg)
+        yield final_msg
 
-        # Limpa a future da elicitation
-        del elicitation_futures[elic_id]
+    return event_gen_register()
 
-    return StreamingResponse(event_gen_register(), media_type="text/event-stream")
 
-
-async def handle_resources_list(msg: Dict[str, Any]) -> JSONResponse:
+@method("resources/list", priority=0)
+async def handle_resources_list(msg: Dict[str, Any], ctx: CallContext) -> Message:
     """
-    Lista um resource simples: resource://docs/terms.
+    Lista os resources registrados no resource_registry, paginando por cursor.
     """
-    response_body = {
-        "jsonrpc": "2.0",
-        "id": msg.get("id"),
-        "result": {
-            "resources": [
-                {
-                    "uri": "resource://docs/terms",
-                    "name": "Terms of Service",
-                    "description": "Human readable terms of service",
-                    "mimeType": "text/markdown",
-                }
-            ],
-            "nextCursor": None,
-        },
+    cursor = (msg.get("params") or {}).get("cursor")
+    if cursor is not None and not isinstance(cursor, str):
+        return make_error(msg.get("id"), -32602, "Invalid params: cursor must be a string")
+    try:
+        return response_cache.reply(
+            ("resources/list", cursor),
+            msg.get("id"),
+            lambda: build_resources_list_result(cursor),
+        )
+    except InvalidCursor:
+        return make_error(msg.get("id"), -32602, f"Invalid cursor: {cursor}")
+
+
+def build_resources_list_result(cursor: Optional[str]) -> Dict[str, Any]:
+    resources, next_cursor = resource_registry.page(cursor, PAGE_SIZE)
+    return {
+        "resources": resources,
+        "nextCursor": next_cursor,
     }
-    return JSONResponse(response_body)
 
 
-async def handle_resources_read(msg: Dict[str, Any]) -> JSONResponse:
+# O crivo do count_primes ocupa limit bytes no worker
+COUNT_PRIMES_MAX_LIMIT = 100_000_000
+
+
+@tool(
+    "count_primes",
+    description="Count the prime numbers below a limit (CPU-bound demo)",
+    schema={
+        "type": "object",
+        "properties": {
+            "limit": {
+                "type": "integer",
+                "description": "Upper bound (exclusive)",
+                "maximum": COUNT_PRIMES_MAX_LIMIT,
+            },
+        },
+        "required": ["limit"],
+    },
+    # CPU pura: roda em outro processo para não travar o event loop
+    execution="process",
+    max_concurrency=4,
+    timeout=30,
+    cache_ttl=3600,
+)
+def count_primes(arguments: Dict[str, Any]) -> str:
+    limit = int(arguments.get("limit", 0))
+    if limit < 3:
+        return f"0 primes below {limit}"
+    sieve = bytearray([1]) * limit
+    sieve[0:2] = b"\x00\x00"
+    for n in range(2, int(limit**0.5) + 1):
+        if sieve[n]:
+            sieve[n * n :: n] = bytes(len(range(n * n, limit, n)))
+    return f"{sum(sieve)} primes below {limit}"
+
+
+register_resource(
+    "resource://docs/terms",
+    name="Terms of Service",
+    description="Human readable terms of service",
+    mime_type="text/markdown",
+    path=os.path.join(RESOURCE_DIR, "terms.md"),
+)
+
+# Diretório extra (opcional) exposto inteiro como resource://files/<caminho>
+if os.environ.get("MCP_EXTRA_RESOURCE_DIR"):
+    register_resource_directory(os.environ["MCP_EXTRA_RESOURCE_DIR"], "resource://files/")
+
+
+@method("resources/read")
+async def handle_resources_read(msg: Dict[str, Any], ctx: CallContext) -> Message:
     """
-    Lê o conteúdo de resource://docs/terms.
+    Lê o conteúdo de um resource registrado.
+
+    Cada resposta leva o ETag do conteúdo em result._meta.etag. Se o cliente
+    mandar params._meta.ifNoneMatch com o ETag atual, a resposta vem sem
+    contents e com _meta.notModified = true.
     """
     params = msg.get("params") or {}
     uri = params.get("uri")
-
-    if uri != "resource://docs/terms":
-        response_body = {
+    if_none_match = request_meta(msg).get("ifNoneMatch")
+
+    if not isinstance(uri, str):
+        return make_error(msg.get("id"), -32602, "Invalid params: uri must be a string")
+    if uri not in resource_store:
+        return make_error(msg.get("id"), -32602, f"Unknown resource URI: {uri}")
+
+    try:
+        info = resource_store.stat(uri)
+    except OSError as exc:
+        return make_error(msg.get("id"), -32603, f"Resource unavailable: {uri} ({exc})")
+
+    if resource_store.is_small(info):
+        data, etag = resource_store.read_small(info)
+        if etag == if_none_match:
+            return resource_not_modified(msg.get("id"), etag)
+        content = {"uri": uri, "mimeType": info.file.mime_type}
+        if is_text_mime(info.file.mime_type):
+            content["text"] = data.decode("utf-8", errors="replace")
+        else:
+            content["blob"] = base64.b64encode(data).decode("ascii")
+        return {
             "jsonrpc": "2.0",
             "id": msg.get("id"),
-            "error": {
-                "code": -32602,
-                "message": f"Unknown resource URI: {uri}",
+            "result": {
+                "contents": [content],
+                "_meta": {"etag": etag},
             },
         }
-        return JSONResponse(response_body, status_code=200)
 
-    text = "# Terms of Service\n\nYou agree to use this service responsibly."
-    response_body = {
+    etag = await asyncio.to_thread(resource_store.etag, info)
+    if etag == if_none_match:
+        return resource_not_modified(msg.get("id"), etag)
+    return EncodedStream(iter_large_resource(msg.get("id"), info, etag))
+
+
+@method("resources/subscribe", priority=0)
+async def handle_resources_subscribe(msg: Dict[str, Any], ctx: CallContext) -> Message:
+    """
+    Inscreve a sessão em uma URI: quando o arquivo mudar, o servidor manda
+    notifications/resources/updated pelo stream GET /mcp.
+    """
+    uri = (msg.get("params") or {}).get("uri")
+    if not isinstance(uri, str):
+        return make_error(msg.get("id"), -32602, "Invalid params: uri must be a string")
+    if uri not in resource_store:
+        return make_error(msg.get("id"), -32602, f"Unknown resource URI: {uri}")
+    subscribe_resource(ctx.session_id, uri)
+    return {"jsonrpc": "2.0", "id": msg.get("id"), "result": {}}
+
+
+@method("resources/unsubscribe", priority=0)
+async def handle_resources_unsubscribe(msg: Dict[str, Any], ctx: CallContext) -> Message:
+    uri = (msg.get("params") or {}).get("uri")
+    if not isinstance(uri, str):
+        return make_error(msg.get("id"), -32602, "Invalid params: uri must be a string")
+    unsubscribe_resource(ctx.session_id, uri)
+    return {"jsonrpc": "2.0", "id": msg.get("id"), "result": {}}
+
+
+def resource_not_modified(msg_id: Any, etag: str) -> Dict[str, Any]:
+    return {
         "jsonrpc": "2.0",
-        "id": msg.get("id"),
+        "id": msg_id,
         "result": {
-            "contents": [
-                {
-                    "uri": uri,
-                    "mimeType": "text/markdown",
-                    "text": text,
-                }
-            ]
+            "contents": [],
+            "_meta": {"etag": etag, "notModified": True},
         },
     }
-    return JSONResponse(response_body)
+
+
+def iter_large_resource(msg_id: Any, info: ResourceInfo, etag: str) -> Iterator[bytes]:
+    """
+    Serializa a response de resources/read de um arquivo grande aos pedaços:
+    o conteúdo sai do mmap e vai sendo escapado direto para dentro da string
+    JSON de "text" (ou "blob", em base64).
+    """
+    mime_type = info.file.mime_type
+    field_name = "text" if is_text_mime(mime_type) else "blob"
+    yield (
+        b'{"jsonrpc":"2.0","id":' + codec.dumps(msg_id)
+        + b',"result":{"contents":[{"uri":' + codec.dumps(info.file.uri)
+        + b',"mimeType":' + codec.dumps(mime_type)
+        + b',"' + field_name.encode("ascii") + b'":"'
+    )
+
+    chunks = resource_store.iter_chunks(info)
+    if field_name == "text":
+        # Um caractere UTF-8 pode ficar dividido entre dois pedaços
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        for chunk in chunks:
+            text = decoder.decode(chunk)
+            if text:
+                yield codec.dumps(text)[1:-1]
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield codec.dumps(tail)[1:-1]
+    else:
+        # Pedaços com tamanho múltiplo de 3: o base64 concatenado é válido
+        for chunk in chunks:
+            yield base64.b64encode(chunk)
+
+    yield b'"}],"_meta":{"etag":' + codec.dumps(etag) + b"}}}"
 
 
 @app.get("/mcp")
@@ -427,29 +2543,159 @@ async def mcp_get(request: Request):
     """
     Endpoint GET /mcp usado para notificações assíncronas via SSE.
     """
-    async def gen():
-        notif1 = {
-            "jsonrpc": "2.0",
-            "method": "notifications/tools/list_changed",
-        }
-        yield make_sse_event(notif1)
-        await asyncio.sleep(1.0)
-        notif2 = {
-            "jsonrpc": "2.0",
-            "method": "notifications/resources/list_changed",
-        }
-        yield make_sse_event(notif2)
+    checked = check_session(request)
+    if isinstance(checked, Response):
+        return checked
+
+    session_id = checked.id
+    try:
+        rate_limiter.check(session_id)
+        stream_counter.check()
+    except Rejected as exc:
+        return json_response(
+            rejected_error(None, exc),
+            status_code=exc.status_code,
+            headers={"Retry-After": exc.retry_after_header},
+        )
+
+    # Retomada de um stream (POST ou GET) cuja conexão caiu
+    last_event_id = request.headers.get("Last-Event-ID")
+    if last_event_id:
+        found = replay_store.find(last_event_id, session_id)
+        if found is None:
+            return json_response(
+                make_error(None, -32002, f"Cannot resume stream from event {last_event_id}"),
+                status_code=410,
+            )
+        stream, after = found
+        if isinstance(stream.source, Subscription):
+            events = notification_events(stream, after)
+        else:
+            events = replay_events(stream, after)
+        return StreamingResponse(stream_counter.count(events), media_type="text/event-stream")
+
+    stream = replay_store.create(session_id)
+    stream.source = notification_hub.subscribe(session_id)
+    return StreamingResponse(
+        stream_counter.count(notification_events(stream, -1)),
+        media_type="text/event-stream",
+    )
+
+
+async def notification_events(stream: ReplayStream, after: int) -> AsyncIterator[bytes]:
+    """
+    Stream GET /mcp: repassa as notifications da Subscription, guardando
+    cada uma no replay_store. Se a conexão cair, a Subscription continua
+    acumulando até o cliente retomar (ou até o stream expirar).
+    """
+    subscription: Subscription = stream.source
+    stream.attach()
+    try:
+        # Abre o stream na hora (o cliente vê os headers e o 200 sem
+        # esperar a primeira notification)
+        yield b": connected\n\n"
+        seq = after
+        while True:
+            missed = stream.since(seq)
+            if missed:
+                seq = missed[-1][0]
+                yield b"".join(event for _, event in missed)
+                stream.ack(seq)
+                continue
+            if subscription.closed:
+                break
+            events = await subscription.get(SSE_KEEPALIVE)
+            for event in events:
+                stream.append(event)
+            if events or subscription.closed:
+                continue
+            # Nada no intervalo: confere se a sessão ainda vale e manda um
+            # comentário SSE para manter a conexão (e proxies) de pé
+            if session_manager.get(stream.session_id) is None:
+                notification_hub.unsubscribe(subscription)
+                break
+            yield b": keepalive\n\n"
+    finally:
+        stream.detach()
+        if subscription.closed:
+            replay_store.discard(stream)
+
+
+@app.get("/metrics")
+async def metrics_endpoint() -> Response:
+    """
+    Métricas do servidor no formato texto do Prometheus.
+    """
+    return Response(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
 
-    return StreamingResponse(gen(), media_type="text/event-stream")
+@app.delete("/mcp")
+async def mcp_delete(request: Request):
+    """
+    Encerra a sessão explicitamente (DELETE com o Mcp-Session-Id).
+    """
+    checked = check_session(request)
+    if isinstance(checked, Response):
+        return checked
+    session_manager.delete(checked.id)
+    notification_hub.close_session(checked.id)
+    rate_limiter.forget(checked.id)
+    unsubscribe_session(checked.id)
+    return Response(status_code=204)
+
+
+# Mesmos endpoints, sem o FastAPI no caminho (raw_asgi.py): server.py --app raw
+raw_app = RawASGIApp(
+    {
+        ("POST", "/mcp"): mcp_post,
+        ("GET", "/mcp"): mcp_get,
+        ("DELETE", "/mcp"): mcp_delete,
+        ("GET", "/metrics"): lambda request: metrics_endpoint(),
+    },
+    lifespan=lifespan,
+)
 
 
 def main():
+    import argparse
+    import tempfile
+
     import uvicorn
 
+    parser = argparse.ArgumentParser(description="Servidor MCP Streamable HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processos do servidor; com mais de 1, sessões vão para SQLite "
+        "e elicitations são roteadas entre workers por Unix sockets",
+    )
+    parser.add_argument(
+        "--app",
+        choices=("fastapi", "raw"),
+        default="fastapi",
+        help="raw: a aplicação ASGI enxuta (raw_asgi.py), sem o overhead do FastAPI",
+    )
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        # Os workers herdam o ambiente: todos usam o mesmo arquivo de sessões
+        # e o mesmo diretório de sockets.
+        os.environ.setdefault("MCP_SESSION_BACKEND", "sqlite")
+        if os.environ["MCP_SESSION_BACKEND"] == "memory":
+            parser.error("--workers > 1 precisa de MCP_SESSION_BACKEND=sqlite")
+        os.environ.setdefault("MCP_WORKER_BUS_DIR", tempfile.mkdtemp(prefix="mcp-workers-"))
+
     uvicorn.run(
-        "server:app",
-        host="127.0.0.1",
-        port=8000,
+        "server:raw_app" if args.app == "raw" else "server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
         reload=False,
     )
 
@@ -0,0 +1,264 @@
+"""
+Sessões MCP (Mcp-Session-Id) com expiração e memória limitada.
+
+- Sessões expiram depois de ttl segundos sem uso (idle TTL).
+- O número de sessões é limitado a max_sessions: ao passar disso, a menos
+  usada recentemente é descartada (LRU).
+- Um sweeper assíncrono remove periodicamente as sessões expiradas.
+
+O armazenamento é plugável:
+
+- MemorySessionBackend: dict em memória, do próprio processo.
+- SQLiteSessionBackend: arquivo SQLite, sobrevive a restarts e pode ser
+  compartilhado por vários workers na mesma máquina.
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class Session:
+    __slots__ = ("id", "created_at", "last_seen", "data")
+
+    def __init__(
+        self,
+        id: str,
+        created_at: float,
+        last_seen: float,
+        data: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.id = id
+        self.created_at = created_at
+        self.last_seen = last_seen
+        self.data = data if data is not None else {}
+
+
+class SessionBackend:
+    """
+    Interface de armazenamento de sessões.
+    """
+
+    def add(self, session: Session) -> None:
+        raise NotImplementedError
+
+    def get(self, session_id: str) -> Optional[Session]:
+        raise NotImplementedError
+
+    def touch(self, session: Session) -> None:
+        """
+        Persiste session.last_seen (e marca a sessão como recém-usada).
+        """
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    def delete_idle(self, last_seen_before: float) -> int:
+        """
+        Remove as sessões sem uso desde last_seen_before. Devolve quantas.
+        """
+        raise NotImplementedError
+
+    def trim(self, max_sessions: int) -> int:
+        """
+        Remove as sessões menos usadas até sobrarem max_sessions.
+        """
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemorySessionBackend(SessionBackend):
+    def __init__(self) -> None:
+        # Ordem de uso: a primeira é a menos usada recentemente
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+
+    def add(self, session: Session) -> None:
+        self._sessions[session.id] = session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        return self._sessions.get(session_id)
+
+    def touch(self, session: Session) -> None:
+        if session.id in self._sessions:
+            self._sessions.move_to_end(session.id)
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def delete_idle(self, last_seen_before: float) -> int:
+        # last_seen só cresce e touch move para o fim, então as ociosas estão
+        # no começo: paramos na primeira sessão ativa.
+        removed = 0
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_seen >= last_seen_before:
+                break
+            del self._sessions[session.id]
+            removed += 1
+        return removed
+
+    def trim(self, max_sessions: int) -> int:
+        removed = 0
+        while len(self._sessions) > max_sessions:
+            self._sessions.popitem(last=False)
+            removed += 1
+        return removed
+
+    def count(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    Sessões em um arquivo SQLite (modo WAL), compartilhável entre processos.
+
+    As operações são curtas e locais, então rodam direto no event loop.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        # Antes de tudo: vários workers podem abrir o arquivo ao mesmo tempo
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Em WAL, NORMAL não faz fsync a cada commit
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                data TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)"
+        )
+
+    def add(self, session: Session) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+            (session.id, session.created_at, session.last_seen, json.dumps(session.data)),
+        )
+
+    def get(self, session_id: str) -> Optional[Session]:
+        row = self._conn.execute(
+            "SELECT id, created_at, last_seen, data FROM sessions WHERE id = ?",
+            (session_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return Session(row[0], row[1], row[2], json.loads(row[3]))
+
+    def touch(self, session: Session) -> None:
+        self._conn.execute(
+            "UPDATE sessions SET last_seen = ? WHERE id = ?",
+            (session.last_seen, session.id),
+        )
+
+    def delete(self, session_id: str) -> bool:
+        cursor = self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+    def delete_idle(self, last_seen_before: float) -> int:
+        cursor = self._conn.execute(
+            "DELETE FROM sessions WHERE last_seen < ?", (last_seen_before,)
+        )
+        return cursor.rowcount
+
+    def trim(self, max_sessions: int) -> int:
+        cursor = self._conn.execute(
+            """
+            DELETE FROM sessions WHERE id IN (
+                SELECT id FROM sessions ORDER BY last_seen DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (max_sessions,),
+        )
+        return cursor.rowcount
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class SessionManager:
+    """
+    Cria, valida e expira sessões sobre um SessionBackend.
+    """
+
+    def __init__(
+        self,
+        backend: SessionBackend,
+        ttl: float = 1800.0,
+        max_sessions: int = 10_000,
+        sweep_interval: float = 60.0,
+    ) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        # Só persiste last_seen se mudou mais que isso: evita uma escrita no
+        # backend a cada request da mesma sessão.
+        self.touch_interval = min(ttl / 10, 30.0)
+
+    def create(self) -> Session:
+        now = time.time()
+        session = Session(str(uuid.uuid4()), now, now)
+        self.backend.add(session)
+        if self.backend.count() > self.max_sessions:
+            self.backend.trim(self.max_sessions)
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """
+        Devolve a sessão se ela existe e não expirou, renovando o TTL.
+        """
+        session = self.backend.get(session_id)
+        if session is None:
+            return None
+
+        now = time.time()
+        if now - session.last_seen > self.ttl:
+            self.backend.delete(session_id)
+            return None
+
+        if now - session.last_seen > self.touch_interval:
+            session.last_seen = now
+            self.backend.touch(session)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        return self.backend.delete(session_id)
+
+    def sweep(self) -> int:
+        removed = self.backend.delete_idle(time.time() - self.ttl)
+        removed += self.backend.trim(self.max_sessions)
+        return removed
+
+    async def run_sweeper(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.sweep()
+
+
+def make_backend(kind: str, path: str) -> SessionBackend:
+    if kind == "memory":
+        return MemorySessionBackend()
+    if kind == "sqlite":
+        return SQLiteSessionBackend(path)
+    raise ValueError(f"Unknown session backend: {kind}")
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+import codec
+import server
+
+HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json, text/event-stream",
+}
+
+
+async def asgi_post(
+    payload: Any,
+    session_id: Optional[str] = None,
+    app: Any = None,
+    extra_headers: Optional[Dict[str, str]] = None,
+) -> Tuple[int, Dict[str, str], bytes]:
+    """
+    POST /mcp direto na app ASGI (server.raw_app por padrão), lendo a
+    resposta inteira.
+    """
+    headers = dict(HEADERS, **(extra_headers or {}))
+    if session_id is not None:
+        headers["Mcp-Session-Id"] = session_id
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/mcp",
+        "raw_path": b"/mcp",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+    pending = [{"type": "http.request", "body": codec.dumps(payload), "more_body": False}]
+    finished = asyncio.Event()
+    start: Dict[str, Any] = {}
+    chunks: List[bytes] = []
+
+    async def receive() -> Dict[str, Any]:
+        if pending:
+            return pending.pop()
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    await (app or server.raw_app)(scope, receive, send)
+    finished.set()
+    response_headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in start["headers"]}
+    return start["status"], response_headers, b"".join(chunks)
+
+
+async def open_session() -> str:
+    _, headers, _ = await asgi_post(
+        {
+            "jsonrpc": "2.0",
+            "id": 0,
+            "method": "initialize",
+            "params": {"protocolVersion": "2025-03-26", "capabilities": {}, "clientInfo": {"name": "test"}},
+        }
+    )
+    return headers["mcp-session-id"]
+
+
+def call(name: str, arguments: Dict[str, Any], msg_id: Any = 1) -> Dict[str, Any]:
+    return {
+        "jsonrpc": "2.0",
+        "id": msg_id,
+        "method": "tools/call",
+        "params": {"name": name, "arguments": arguments},
+    }
@@ -0,0 +1,172 @@
+import asyncio
+
+import pytest
+
+import server
+from admission import AdmissionController, HeldStream, Rejected, StreamCounter
+from conftest import asgi_post, call, open_session
+
+
+@pytest.fixture
+def one_slot(monkeypatch):
+    controller = AdmissionController(max_in_flight=1, queue_timeout=0.05)
+    monkeypatch.setattr(server, "admission", controller)
+    return controller
+
+
+@pytest.fixture
+def gated_method():
+    """
+    Método test/stream: responde em stream, com a response só depois do
+    gate liberado.
+    """
+    gate = {}
+
+    async def handler(msg, ctx):
+        async def messages():
+            await gate["event"].wait()
+            yield {"jsonrpc": "2.0", "id": msg["id"], "result": {}}
+
+        return messages()
+
+    server.register_method("test/stream", handler)
+    yield gate
+    server.method_registry.pop("test/stream")
+
+
+def test_stream_holds_admission_slot_until_done(one_slot, gated_method):
+    async def scenario():
+        gated_method["event"] = gate = asyncio.Event()
+        ctx = server.CallContext()
+        msg = {"jsonrpc": "2.0", "id": 1, "method": "test/stream"}
+        stream = await server.admitted(msg, server.dispatch(msg, ctx))
+        assert one_slot.in_flight == 1
+
+        other = {"jsonrpc": "2.0", "id": 2, "method": "test/stream"}
+        with pytest.raises(Rejected):
+            await server.admitted(other, server.dispatch(other, ctx))
+
+        gate.set()
+        assert [message["id"] async for message in stream] == [1]
+        assert one_slot.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_closed_stream_releases_slot():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1)
+        await controller.acquire()
+
+        async def messages():
+            yield 1
+
+        held = HeldStream(messages(), controller.release)
+        await held.aclose()
+        await held.aclose()
+        return controller.in_flight
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_post_sse_counts_against_stream_limit(monkeypatch, one_slot):
+    counter = StreamCounter(max_streams=1)
+    monkeypatch.setattr(server, "stream_counter", counter)
+
+    async def scenario():
+        session_id = await open_session()
+        counter.open = 1  # um GET /mcp já aberto
+        streaming = call("get_weather", {"location": "Recife", "forecastDays": 3})
+        status, headers, body = await asgi_post(streaming, session_id)
+        assert status == 503
+        assert "retry-after" in headers
+        assert server.codec.loads(body)["error"]["code"] == -32000
+        assert one_slot.in_flight == 0
+
+        # Sem stream, o mesmo request passa
+        status, _, _ = await asgi_post(call("get_weather", {"location": "Recife"}), session_id)
+        assert status == 200
+
+        counter.open = 0
+        streaming = call("get_weather", {"location": "Natal", "forecastDays": 3})
+        status, headers, _ = await asgi_post(streaming, session_id)
+        assert status == 200
+        assert headers["content-type"].startswith("text/event-stream")
+        assert counter.open == 0
+        assert one_slot.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def limited_stream_tool():
+    gate = {}
+
+    async def handler(msg, arguments, ctx):
+        async def output():
+            yield "started\n"
+            await gate["event"].wait()
+            yield "done"
+
+        return server.stream_tool_output(msg, ctx, output())
+
+    server.register_tool(
+        "test_limited", handler, description="test", schema={"type": "object"}, max_concurrency=1
+    )
+    yield gate
+    server.unregister_tool("test_limited")
+
+
+def test_streaming_tool_holds_max_concurrency(limited_stream_tool):
+    async def scenario():
+        limited_stream_tool["event"] = asyncio.Event()
+        ctx = server.CallContext()
+        first = await server.dispatch(call("test_limited", {}, msg_id=1), ctx)
+        second = asyncio.ensure_future(server.dispatch(call("test_limited", {}, msg_id=2), ctx))
+        await asyncio.sleep(0.05)
+        assert not second.done()
+
+        limited_stream_tool["event"].set()
+        async for _ in first:
+            pass
+        stream = await asyncio.wait_for(second, 1)
+        async for _ in stream:
+            pass
+
+    asyncio.run(scenario())
+
+
+def test_timed_out_waiters_do_not_pile_up():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queued=10, queue_timeout=0.001)
+        await controller.acquire()
+        for _ in range(20):
+            results = await asyncio.gather(
+                *(controller.acquire() for _ in range(10)), return_exceptions=True
+            )
+            assert all(isinstance(result, Rejected) for result in results)
+        assert controller.queued == 0
+        assert len(controller._waiters) <= 10 + 8
+        controller.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("method", [["tools/list"], {"a": 1}])
+def test_non_string_method_is_not_a_server_error(method):
+    async def scenario():
+        session_id = await open_session()
+        request = {"jsonrpc": "2.0", "id": 1, "method": method}
+        ok = {"jsonrpc": "2.0", "id": 2, "method": "tools/list"}
+        single = await asgi_post(request, session_id)
+        batch = await asgi_post([request, ok], session_id)
+        return single, batch
+
+    (status, _, body), (batch_status, _, batch_body) = asyncio.run(scenario())
+    assert status == 200
+    assert server.codec.loads(body)["error"]["code"] == -32600
+    assert batch_status == 200
+    replies = {reply["id"]: reply for reply in server.codec.loads(batch_body)}
+    assert replies[1]["error"]["code"] == -32600
+    assert "result" in replies[2]
@@ -0,0 +1,39 @@
+import httpx
+import pytest
+
+import codec
+from client import RequestTimer, rpc_extensions
+
+URL = "http://127.0.0.1:8000/mcp"
+
+
+def reply(request):
+    return httpx.Response(200, json={"jsonrpc": "2.0", "id": 1, "result": {}})
+
+
+@pytest.fixture
+def no_decoding(monkeypatch):
+    def loads(data):
+        raise AssertionError("o corpo do request não deveria ser decodificado")
+
+    monkeypatch.setattr(codec, "loads", loads)
+
+
+def test_timer_labels_requests_without_decoding_the_body(no_decoding):
+    timer = RequestTimer()
+    with httpx.Client(transport=httpx.MockTransport(reply), event_hooks=timer.sync_hooks()) as http:
+        for payload in (
+            {"jsonrpc": "2.0", "id": 1, "method": "tools/call"},
+            [{"jsonrpc": "2.0", "id": 2, "method": "tools/list"}],
+            {"jsonrpc": "2.0", "id": 3, "result": {}},
+        ):
+            http.post(URL, content=codec.dumps(payload), extensions=rpc_extensions(payload))
+        http.post(URL, content=b"{}")
+        http.get(URL)
+    assert {method: stats["count"] for method, stats in timer.summary().items()} == {
+        "tools/call": 1,
+        "batch": 1,
+        "response": 1,
+        "unknown": 1,
+        "GET stream": 1,
+    }
@@ -0,0 +1,56 @@
+import asyncio
+import gzip
+
+import pytest
+
+import codec
+import compression
+import server
+from conftest import asgi_post, open_session
+
+PREFIX = b'{"jsonrpc":"2.0","result":' + codec.dumps({"items": list(range(2000))}) + b',"id":'
+
+
+def test_gzip_prefixed_matches_whole_body():
+    finish = compression.prefixed("gzip", PREFIX)
+    for tail in (b"1}", b'"a-b"}', b"}"):
+        assert gzip.decompress(finish(tail)) == PREFIX + tail
+
+
+@pytest.mark.skipif("zstd" not in compression.available(), reason="zstandard não instalado")
+def test_zstd_prefixed_matches_whole_body():
+    import zstandard
+
+    finish = compression.prefixed("zstd", PREFIX)
+    reader = zstandard.ZstdDecompressor().stream_reader(finish(b"7}"), read_across_frames=True)
+    assert reader.read() == PREFIX + b"7}"
+
+
+def test_brotli_is_not_prefixed():
+    assert compression.prefixed("br", PREFIX) is None
+
+
+def test_cached_list_is_not_recompressed(monkeypatch):
+    calls = []
+    compress = compression.compress
+    monkeypatch.setattr(
+        compression, "compress", lambda encoding, data: calls.append(len(data)) or compress(encoding, data)
+    )
+    monkeypatch.setattr(server, "COMPRESS_MIN_BYTES", 0)
+
+    async def scenario():
+        session_id = await open_session()
+        replies = []
+        for msg_id in (10, "abc"):
+            request = {"jsonrpc": "2.0", "id": msg_id, "method": "tools/list", "params": {}}
+            replies.append(await asgi_post(request, session_id, extra_headers={"Accept-Encoding": "gzip"}))
+        return replies
+
+    server.response_cache.invalidate("tools/list")
+    for (status, headers, body), msg_id in zip(asyncio.run(scenario()), (10, "abc")):
+        assert status == 200
+        assert headers["content-encoding"] == "gzip"
+        message = codec.loads(gzip.decompress(body))
+        assert message["id"] == msg_id
+        assert message["result"]["tools"]
+    assert calls == []
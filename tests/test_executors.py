@@ -0,0 +1,39 @@
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from executors import ToolExecutor
+
+
+def test_process_pool_recovers_after_worker_dies():
+    executor = ToolExecutor(process_workers=1)
+
+    async def scenario():
+        with pytest.raises(BrokenProcessPool):
+            await executor.run("process", os._exit, 1)
+        return await executor.run("process", pow, 2, 10)
+
+    try:
+        assert asyncio.run(scenario()) == 1024
+    finally:
+        executor.shutdown()
+
+
+def test_broken_pool_is_replaced_before_submit():
+    executor = ToolExecutor(process_workers=1)
+
+    async def scenario():
+        # O worker morre fora de uma chamada do executor: o pool fica quebrado
+        broken = executor._pool("process")
+        with pytest.raises(BrokenProcessPool):
+            await asyncio.wrap_future(broken.submit(os._exit, 1))
+        return broken, await executor.run("process", pow, 3, 2)
+
+    try:
+        broken, result = asyncio.run(scenario())
+        assert result == 9
+        assert executor._processes is not broken
+    finally:
+        executor.shutdown()
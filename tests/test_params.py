@@ -0,0 +1,121 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import codec
+import server
+from conftest import asgi_post, open_session
+from tracing import Tracer
+
+
+def request(method, params, msg_id=1):
+    return {"jsonrpc": "2.0", "id": msg_id, "method": method, "params": params}
+
+
+def post(payload):
+    async def scenario():
+        session_id = await open_session()
+        return await asgi_post(payload, session_id)
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("method", ["tools/list", "resources/list"])
+@pytest.mark.parametrize("cursor", [{}, [], 1, {"a": [1]}])
+def test_list_rejects_non_string_cursor(method, cursor):
+    status, _, body = post(request(method, {"cursor": cursor}))
+    assert status == 200
+    assert codec.loads(body)["error"]["code"] == -32602
+
+
+@pytest.mark.parametrize("method", ["tools/list", "resources/list"])
+def test_list_rejects_unknown_cursor(method):
+    status, _, body = post(request(method, {"cursor": "não é base64"}))
+    assert status == 200
+    assert codec.loads(body)["error"]["code"] == -32602
+
+
+@pytest.mark.parametrize("name", [None, ["get_weather"], {"a": 1}, 1])
+def test_tools_call_rejects_non_string_name(name):
+    status, _, body = post(request("tools/call", {"name": name, "arguments": {}}))
+    assert status == 200
+    assert codec.loads(body)["error"]["code"] == -32602
+
+
+@pytest.mark.parametrize("uri", [None, {}, ["resource://docs/terms"]])
+def test_resources_read_rejects_non_string_uri(uri):
+    status, _, body = post(request("resources/read", {"uri": uri}))
+    assert status == 200
+    assert codec.loads(body)["error"]["code"] == -32602
+
+
+@pytest.mark.parametrize("method", ["resources/subscribe", "resources/unsubscribe"])
+@pytest.mark.parametrize("uri", [None, {}, ["resource://docs/terms"]])
+def test_subscriptions_reject_non_string_uri(method, uri):
+    status, _, body = post(request(method, {"uri": uri}))
+    assert status == 200
+    assert codec.loads(body)["error"]["code"] == -32602
+    assert all(isinstance(key, str) for key in server.resource_subscribers)
+
+
+@pytest.mark.parametrize("request_id", [{}, [1], None, True])
+def test_cancelled_ignores_invalid_request_id(request_id):
+    notification = {
+        "jsonrpc": "2.0",
+        "method": "notifications/cancelled",
+        "params": {"requestId": request_id},
+    }
+    status, _, _ = post(notification)
+    assert status == 202
+
+
+@pytest.mark.parametrize("params", [[1], "x", 1])
+def test_cancelled_ignores_non_object_params(params):
+    notification = {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": params}
+    status, _, _ = post(notification)
+    assert status == 202
+
+
+def test_count_primes_limit_has_maximum():
+    limit = server.COUNT_PRIMES_MAX_LIMIT + 1
+    status, _, body = post(request("tools/call", {"name": "count_primes", "arguments": {"limit": limit}}))
+    assert status == 200
+    assert codec.loads(body)["error"]["code"] == -32602
+
+
+def test_forecast_days_has_maximum():
+    arguments = {"location": "Recife", "forecastDays": server.FORECAST_MAX_DAYS + 1}
+    status, _, body = post(request("tools/call", {"name": "get_weather", "arguments": arguments}))
+    assert status == 200
+    assert codec.loads(body)["error"]["code"] == -32602
+
+
+@pytest.mark.parametrize("method", [["tools/list"], {"a": 1}, 1])
+def test_dispatch_rejects_non_string_method(method):
+    message = asyncio.run(server.dispatch({"jsonrpc": "2.0", "id": 1, "method": method}, server.CallContext()))
+    assert message["error"]["code"] == -32600
+
+
+def test_trace_of_non_string_method(monkeypatch):
+    monkeypatch.setattr(
+        server,
+        "tracer",
+        Tracer(
+            sample_rate=1, methods=["tools/list"], profile_every=1, profile_methods=["tools/list"]
+        ),
+    )
+    request = SimpleNamespace(headers={})
+    assert server.start_trace({"jsonrpc": "2.0", "id": 1, "method": ["tools/list"]}, request, 0.0) is None
+
+
+@pytest.mark.parametrize("meta", ["x", [1], 1])
+def test_non_object_meta_is_ignored(meta):
+    status, _, body = post(request("resources/read", {"uri": "resource://docs/terms", "_meta": meta}))
+    assert status == 200
+    assert "contents" in codec.loads(body)["result"]
+
+    arguments = {"location": "Recife", "forecastDays": 2}
+    status, _, body = post(request("tools/call", {"name": "get_weather", "arguments": arguments, "_meta": meta}))
+    assert status == 200
+    assert b'"result"' in body
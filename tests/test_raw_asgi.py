@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from starlette.responses import StreamingResponse
+
+import server
+from admission import HeldStream
+from raw_asgi import send_response, send_stream
+from tracing import Tracer
+
+
+class TaskWithoutUncancel(asyncio.Task):
+    """
+    Task como a do Python 3.10, que não tem uncancel().
+    """
+
+    @property
+    def uncancel(self):
+        raise AttributeError("uncancel")
+
+
+async def endless():
+    while True:
+        yield b"data: x\n\n"
+        await asyncio.sleep(0.01)
+
+
+async def disconnect_after_first_chunk():
+    sent = []
+    connected = asyncio.Event()
+
+    async def send(message):
+        sent.append(message)
+        connected.set()
+
+    async def receive():
+        await connected.wait()
+        return {"type": "http.disconnect"}
+
+    chunks = endless()
+    await send_stream(chunks, receive, send)
+    return sent, chunks
+
+
+@pytest.mark.parametrize("task_class", [asyncio.Task, TaskWithoutUncancel])
+def test_disconnect_stops_stream(task_class):
+    async def scenario():
+        asyncio.get_running_loop().set_task_factory(
+            lambda loop, coro, **kwargs: task_class(coro, loop=loop, **kwargs)
+        )
+        task = asyncio.ensure_future(disconnect_after_first_chunk())
+        sent, chunks = await asyncio.wait_for(task, 1)
+        assert sent and all(message.get("more_body") for message in sent)
+        # O stream foi fechado e a task não ficou marcada como cancelada
+        assert chunks.ag_frame is None
+        assert not task.cancelled()
+
+    asyncio.run(scenario())
+
+
+async def disconnected_send(message):
+    raise OSError("cliente desconectou")
+
+
+async def never_receive():
+    await asyncio.Event().wait()
+
+
+def test_profile_ends_when_body_never_starts(monkeypatch, tmp_path):
+    tracer = Tracer(
+        profile_every=1,
+        directory=str(tmp_path / "traces"),
+        profile_directory=str(tmp_path / "profiles"),
+    )
+    monkeypatch.setattr(server, "tracer", tracer)
+
+    async def scenario():
+        trace = tracer.start("tools/call", 1, None)
+        response = server.traced_response(StreamingResponse(endless()), trace)
+        with pytest.raises(OSError):
+            await send_response(response, never_receive, disconnected_send)
+
+    asyncio.run(scenario())
+    assert tracer.profiled == 1
+    assert not tracer._profiling
+
+
+@pytest.mark.parametrize("traced", [False, True])
+def test_failed_start_closes_stream(monkeypatch, tmp_path, traced):
+    monkeypatch.setattr(server, "tracer", Tracer(sample_rate=1, directory=str(tmp_path)))
+    released = []
+
+    async def scenario():
+        response = StreamingResponse(HeldStream(endless(), lambda: released.append(True)))
+        if traced:
+            response = server.traced_response(response, server.tracer.start("tools/call", 1, None))
+        with pytest.raises(OSError):
+            await send_response(response, never_receive, disconnected_send)
+        # Ainda com o response vivo: o release não depende do __del__
+        assert released == [True]
+
+    asyncio.run(scenario())
@@ -0,0 +1,76 @@
+import asyncio
+
+import server
+from replay import ReplayStream
+
+EVENT = b"data: " + b"x" * 200 + b"\n\n"
+
+
+def buffered(stream: ReplayStream):
+    events = stream.since(-1)
+    return len(events), sum(len(event) for _, event in events)
+
+
+def test_stalled_reader_does_not_pin_memory():
+    stream = ReplayStream("s", max_events=100, max_bytes=10_000)
+    stream.attach()
+    for _ in range(5000):
+        stream.append(EVENT)
+    count, size = buffered(stream)
+    assert count <= 100
+    assert size <= 10_000
+    # O leitor recomeça no evento mais antigo que sobrou
+    assert stream.since(-1)[-1][0] == 4999
+
+
+def test_slow_reader_gets_every_event():
+    async def scenario():
+        stream = ReplayStream("s", max_events=10, max_bytes=2_000)
+        stream.attach()
+
+        async def produce():
+            for _ in range(500):
+                stream.append(EVENT)
+                await stream.wait_for_room()
+            stream.finish()
+
+        producer = asyncio.create_task(produce())
+        received = []
+        seq = -1
+        while True:
+            events = stream.since(seq)
+            if events:
+                received.extend(s for s, _ in events)
+                seq = events[-1][0]
+                await asyncio.sleep(0)
+                stream.ack(seq)
+            elif stream.done:
+                break
+            else:
+                await stream.wait()
+        await producer
+        return received
+
+    assert asyncio.run(scenario()) == list(range(500))
+
+
+def test_get_stream_acks_delivered_notifications():
+    async def scenario():
+        stream = server.replay_store.create("test-session")
+        subscription = server.notification_hub.subscribe("test-session")
+        stream.source = subscription
+        events = server.notification_events(stream, -1)
+        try:
+            assert await events.__anext__() == b": connected\n\n"
+            for _ in range(5000):
+                subscription.push(None, EVENT)
+                await events.__anext__()
+            return buffered(stream)
+        finally:
+            await events.aclose()
+            server.notification_hub.unsubscribe(subscription)
+            server.replay_store.discard(stream)
+
+    count, size = asyncio.run(scenario())
+    assert count <= server.replay_store.max_events
+    assert size <= server.replay_store.max_bytes
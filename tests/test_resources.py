@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+import codec
+import server
+from conftest import asgi_post, call, open_session
+
+# Maior que SMALL_RESOURCE_BYTES e que um pedaço do mmap: vira EncodedStream
+TEXT = "linha com acentuação — e aspas \"\n" * 40_000
+
+
+@pytest.fixture
+def large_resource(tmp_path):
+    path = tmp_path / "large.txt"
+    path.write_text(TEXT, encoding="utf-8")
+    uri = "resource://test/large"
+    server.register_resource(
+        uri, name="large", description="test", mime_type="text/plain", path=str(path)
+    )
+    yield uri
+    server.unregister_resource(uri)
+
+
+def read(uri, msg_id):
+    return {"jsonrpc": "2.0", "id": msg_id, "method": "resources/read", "params": {"uri": uri}}
+
+
+def sse_messages(body):
+    messages = []
+    for event in body.decode("utf-8").split("\n\n"):
+        data = [line[6:] for line in event.split("\n") if line.startswith("data: ")]
+        if data:
+            messages.append(codec.loads("\n".join(data)))
+    return messages
+
+
+def text_of(message):
+    return message["result"]["contents"][0]["text"]
+
+
+def test_large_resource_in_batch(large_resource):
+    async def scenario():
+        session_id = await open_session()
+        batch = [read(large_resource, 1), read("resource://docs/terms", 2)]
+        return await asgi_post(batch, session_id)
+
+    status, headers, body = asyncio.run(scenario())
+    assert status == 200
+    assert "content-length" not in headers
+    replies = {reply["id"]: reply for reply in codec.loads(body)}
+    assert text_of(replies[1]) == TEXT
+    assert "etag" in replies[1]["result"]["_meta"]
+    assert text_of(replies[2])
+
+
+def test_large_resource_in_sse_batch(large_resource):
+    async def scenario():
+        session_id = await open_session()
+        batch = [
+            read(large_resource, 1),
+            call("get_weather", {"location": "Recife", "forecastDays": 2}, msg_id=2),
+        ]
+        return await asgi_post(batch, session_id)
+
+    status, headers, body = asyncio.run(scenario())
+    assert status == 200
+    assert headers["content-type"].startswith("text/event-stream")
+    replies = {m["id"]: m for m in sse_messages(body) if "id" in m}
+    assert text_of(replies[1]) == TEXT
+    assert "result" in replies[2]
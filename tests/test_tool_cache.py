@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+import codec
+import server
+from conftest import asgi_post, call, open_session
+
+
+@pytest.fixture
+def gated_tool():
+    """
+    Tool test_gated, com cache: responde em streaming (não guardável) e só
+    termina quando o gate é liberado.
+    """
+    state = {"started": []}
+
+    async def handler(msg, arguments, ctx):
+        async def output():
+            state["started"].append(msg["id"])
+            yield "started\n"
+            await state["gate"].wait()
+            yield "done"
+
+        return server.stream_tool_output(msg, ctx, output())
+
+    server.register_tool(
+        "test_gated", handler, description="test", schema={"type": "object"}, cache_ttl=60
+    )
+    yield state
+    server.unregister_tool("test_gated")
+
+
+def tools_call(msg_id):
+    return {
+        "jsonrpc": "2.0",
+        "id": msg_id,
+        "method": "tools/call",
+        "params": {"name": "test_gated", "arguments": {}},
+    }
+
+
+async def drain(stream):
+    messages = []
+    async for message in stream:
+        if isinstance(message, server.StreamedMessage):
+            async for _ in message.lines:
+                pass
+        messages.append(message)
+    return messages
+
+
+def test_uncacheable_stream_releases_identical_calls(gated_tool):
+    async def scenario():
+        gated_tool["gate"] = asyncio.Event()
+        first = await server.dispatch(tools_call(1), server.CallContext())
+        reader = asyncio.create_task(drain(first))
+        # O segundo não espera o primeiro terminar: executa em paralelo
+        second = await asyncio.wait_for(server.dispatch(tools_call(2), server.CallContext()), 1)
+        other = asyncio.create_task(drain(second))
+        for _ in range(100):
+            if len(gated_tool["started"]) == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert gated_tool["started"] == [1, 2]
+        gated_tool["gate"].set()
+        await asyncio.wait_for(asyncio.gather(reader, other), 1)
+
+    asyncio.run(scenario())
+
+
+def test_closed_stream_releases_identical_calls(gated_tool):
+    async def scenario():
+        gated_tool["gate"] = asyncio.Event()
+        gated_tool["gate"].set()
+        first = await server.dispatch(tools_call(1), server.CallContext())
+        waiting = asyncio.create_task(server.dispatch(tools_call(2), server.CallContext()))
+        await asyncio.sleep(0)
+        # Fechado sem ser lido (ex.: 503 por streams demais)
+        await first.aclose()
+        second = await asyncio.wait_for(waiting, 1)
+        await asyncio.wait_for(drain(second), 1)
+        assert gated_tool["started"] == [2]
+
+    asyncio.run(scenario())
+
+
+def test_identical_streaming_calls_in_one_batch():
+    async def scenario():
+        session_id = await open_session()
+        arguments = {"location": "Olinda", "forecastDays": 3}
+        batch = [call("get_weather", arguments, msg_id=1), call("get_weather", arguments, msg_id=2)]
+        return await asyncio.wait_for(asgi_post(batch, session_id), 5)
+
+    status, headers, body = asyncio.run(scenario())
+    assert status == 200
+    assert headers["content-type"].startswith("text/event-stream")
+    replies = [
+        codec.loads("\n".join(line[6:] for line in event.split("\n") if line.startswith("data: ")))
+        for event in body.decode("utf-8").split("\n\n")
+        if "data: " in event
+    ]
+    assert sorted(m["id"] for m in replies if "result" in m) == [1, 2]
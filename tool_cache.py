@@ -0,0 +1,156 @@
+"""
+Cache de resultados de tools, por argumentos.
+
+Para tools determinísticas (ou que mudam devagar): a chave é o JSON canônico
+dos argumentos (chaves ordenadas), então {"a": 1, "b": 2} e {"b": 2, "a": 1}
+caem na mesma entrada.
+
+- Entradas expiram ttl segundos depois de criadas.
+- O cache é LRU, limitado por número de entradas e por bytes.
+- Chamadas idênticas concorrentes compartilham uma única execução
+  (proteção contra stampede): a primeira executa, as outras esperam o
+  resultado dela.
+
+Os valores são opacos para o cache; quem chama informa o tamanho em bytes.
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+def cache_key(arguments: Dict[str, Any]) -> str:
+    return json.dumps(arguments, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+class InFlight(Generic[V]):
+    """
+    Uma execução em andamento, compartilhada pelas chamadas idênticas.
+    """
+
+    __slots__ = ("value", "_done")
+
+    def __init__(self) -> None:
+        self.value: Optional[V] = None
+        self._done = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def resolve(self, value: Optional[V]) -> None:
+        self.value = value
+        self._done.set()
+
+    async def wait(self) -> Optional[V]:
+        """
+        Resultado da execução, ou None se ela falhou ou não é reaproveitável.
+        """
+        await self._done.wait()
+        return self.value
+
+
+class ToolResultCache(Generic[V]):
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: int = 256,
+        max_bytes: int = 16 * 1024 * 1024,
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (expira em, valor, bytes), em ordem de uso
+        self._entries: "OrderedDict[str, Tuple[float, V, int]]" = OrderedDict()
+        self._bytes = 0
+        self._in_flight: Dict[str, InFlight[V]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, size = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._bytes -= size
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def running(self, key: str) -> bool:
+        return key in self._in_flight
+
+    def join(self, key: str) -> Tuple[InFlight[V], bool]:
+        """
+        Execução em andamento para key. Devolve (execução, é_a_primeira):
+        quem recebe True executa e chama finish; os demais esperam.
+        """
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            self.shared += 1
+            return flight, False
+        self.misses += 1
+        flight = InFlight()
+        self._in_flight[key] = flight
+        return flight, True
+
+    def finish(
+        self,
+        key: str,
+        flight: InFlight[V],
+        value: Optional[V],
+        size: int = 0,
+        store: bool = True,
+    ) -> None:
+        """
+        Encerra a execução e entrega value a quem espera. Se store, também o
+        guarda (store=False para erros: vale para as chamadas simultâneas,
+        mas a próxima tenta de novo). Só a primeira chamada para flight vale.
+        """
+        if flight.done:
+            return
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+        flight.resolve(value)
+        if value is not None and store:
+            self.put(key, value, size)
+
+    def put(self, key: str, value: V, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[2]
+        self._entries[key] = (time.monotonic() + self.ttl, value, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, _, old_size) = self._entries.popitem(last=False)
+            self._bytes -= old_size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "evictions": self.evictions,
+        }
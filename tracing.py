@@ -0,0 +1,192 @@
+"""
+Tracing e profiling opcionais dos requests JSON-RPC.
+
+Um trace é uma lista de spans (fases com início e fim) de um POST /mcp:
+leitura e parse do corpo, espera na admissão, handler, tool, serialização e
+envio do SSE. Cada trace leva o método, o id JSON-RPC e o Mcp-Session-Id,
+para cruzar com os logs do cliente.
+
+- Tracing: uma fração dos requests (sample_rate), opcionalmente só de alguns
+  métodos, é gravada como uma linha JSON em traces-<pid>.jsonl. Com
+  slow_ms, só os traces que levaram pelo menos isso.
+- Profiling: a cada profile_every requests dos métodos escolhidos, um cProfile roda
+  do início ao fim do request e é gravado em <trace id>.prof (pstats,
+  snakeviz). O cProfile vê a thread inteira: o que outras tasks fizeram no
+  event loop enquanto isso também entra. Um profile por vez.
+
+Requests fora da amostra não criam trace: o custo é um random() e, com
+profiling, um contador.
+"""
+
+import cProfile
+import json
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Collection, Dict, Iterator, List, Optional, Tuple
+
+
+class Trace:
+    __slots__ = ("trace_id", "method", "rpc_id", "session_id", "started", "spans", "profile")
+
+    def __init__(
+        self,
+        method: str,
+        rpc_id: Any,
+        session_id: Optional[str],
+        started: Optional[float] = None,
+    ) -> None:
+        self.trace_id = uuid.uuid4().hex
+        self.method = method
+        self.rpc_id = rpc_id
+        self.session_id = session_id
+        self.started = time.perf_counter() if started is None else started
+        # (nome, início, fim, atributos), em segundos desde started
+        self.spans: List[Tuple[str, float, float, Optional[Dict[str, Any]]]] = []
+        self.profile: Optional[cProfile.Profile] = None
+
+    def add(self, name: str, start: float, end: float, **attributes: Any) -> None:
+        """
+        Registra um span com início e fim já medidos (time.perf_counter()).
+        """
+        self.spans.append(
+            (name, start - self.started, end - self.started, attributes or None)
+        )
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter(), **attributes)
+
+    def to_dict(self, duration: float) -> Dict[str, Any]:
+        spans = []
+        for name, start, end, attributes in self.spans:
+            span: Dict[str, Any] = {
+                "name": name,
+                "startMs": round(start * 1000, 3),
+                "durationMs": round((end - start) * 1000, 3),
+            }
+            if attributes:
+                span["attributes"] = attributes
+            spans.append(span)
+        return {
+            "traceId": self.trace_id,
+            "method": self.method,
+            "id": self.rpc_id,
+            "sessionId": self.session_id,
+            "timestamp": time.time() - duration,
+            "durationMs": round(duration * 1000, 3),
+            "profiled": self.profile is not None,
+            "spans": spans,
+        }
+
+
+@contextmanager
+def span(trace: Optional[Trace], name: str, **attributes: Any) -> Iterator[None]:
+    """
+    trace.span(name), ou nada se o request não está sendo traçado.
+    """
+    if trace is None:
+        yield
+        return
+    with trace.span(name, **attributes):
+        yield
+
+
+class Tracer:
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        methods: Collection[str] = (),
+        slow_ms: float = 0.0,
+        directory: str = "traces",
+        profile_every: int = 0,
+        profile_methods: Collection[str] = (),
+        profile_directory: str = "profiles",
+    ) -> None:
+        """
+        sample_rate: fração dos requests traçados (0 desliga); methods
+        restringe a alguns métodos (vazio: todos). profile_every: profila
+        um a cada N requests de profile_methods (0 desliga).
+        """
+        self.sample_rate = sample_rate
+        self.methods = frozenset(methods)
+        self.slow_ms = slow_ms
+        self.directory = directory
+        self.profile_every = profile_every
+        self.profile_methods = frozenset(profile_methods)
+        self.profile_directory = profile_directory
+        self._profile_seen = 0
+        self._profiling = False
+        self._file: Optional[Any] = None
+        self.traced = 0
+        self.profiled = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.profile_every > 0
+
+    def _should_profile(self, method: str) -> bool:
+        if not self.profile_every or self._profiling:
+            return False
+        if self.profile_methods and method not in self.profile_methods:
+            return False
+        self._profile_seen += 1
+        return self._profile_seen % self.profile_every == 0
+
+    def start(
+        self,
+        method: str,
+        rpc_id: Any,
+        session_id: Optional[str],
+        started: Optional[float] = None,
+    ) -> Optional[Trace]:
+        """
+        Começa o trace do request (started: quando ele chegou, se foi
+        antes), ou devolve None se ele ficou fora da amostra. Quem recebe um
+        trace precisa chamar finish.
+        """
+        profile = self._should_profile(method)
+        if not profile:
+            if not self.sample_rate or (self.methods and method not in self.methods):
+                return None
+            if self.sample_rate < 1 and random.random() >= self.sample_rate:
+                return None
+        trace = Trace(method, rpc_id, session_id, started)
+        if profile:
+            self._profiling = True
+            trace.profile = cProfile.Profile()
+            trace.profile.enable()
+        return trace
+
+    def finish(self, trace: Trace) -> None:
+        duration = time.perf_counter() - trace.started
+        if trace.profile is not None:
+            trace.profile.disable()
+            self._profiling = False
+            os.makedirs(self.profile_directory, exist_ok=True)
+            trace.profile.dump_stats(
+                os.path.join(self.profile_directory, f"{trace.trace_id}.prof")
+            )
+            self.profiled += 1
+        elif self.slow_ms and duration * 1000 < self.slow_ms:
+            return
+        self._write(trace.to_dict(duration))
+        self.traced += 1
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"traces-{os.getpid()}.jsonl")
+            self._file = open(path, "a", encoding="utf-8", buffering=1)
+        self._file.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
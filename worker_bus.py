@@ -0,0 +1,88 @@
+"""
+Troca de mensagens entre workers do servidor na mesma máquina.
+
+Cada worker escuta em um Unix socket próprio dentro de um diretório
+compartilhado (<dir>/worker-<id>.sock). Para mandar algo a outro worker
+basta saber o id dele: não há broker central nem serviço externo.
+
+O protocolo é uma mensagem JSON por linha (o codec gera JSON compacto, que
+nunca contém quebra de linha crua).
+"""
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+import codec
+
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class WorkerBus:
+    def __init__(self, directory: str, worker_id: Optional[str] = None) -> None:
+        self.directory = directory
+        self.worker_id = worker_id or str(os.getpid())
+        self.path = self.socket_path(self.worker_id)
+        self._server: Optional[asyncio.AbstractServer] = None
+        # Conexões abertas para outros workers, reaproveitadas entre envios.
+        # O lock por worker serializa conexão e escrita no mesmo socket.
+        self._writers: Dict[str, asyncio.StreamWriter] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Conexões recebidas de outros workers
+        self._incoming: Set[asyncio.StreamWriter] = set()
+
+    def socket_path(self, worker_id: str) -> str:
+        return os.path.join(self.directory, f"worker-{worker_id}.sock")
+
+    async def start(self, handler: MessageHandler) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        async def on_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            self._incoming.add(writer)
+            try:
+                while line := await reader.readline():
+                    await handler(codec.loads(line))
+            finally:
+                self._incoming.discard(writer)
+                writer.close()
+
+        self._server = await asyncio.start_unix_server(on_connection, path=self.path)
+
+    async def stop(self) -> None:
+        for writer in list(self._writers.values()) + list(self._incoming):
+            writer.close()
+        self._writers.clear()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def send(self, worker_id: str, message: Dict[str, Any]) -> bool:
+        """
+        Entrega message ao worker worker_id. Devolve False se ele não está
+        mais no ar.
+        """
+        data = codec.dumps(message) + b"\n"
+        lock = self._locks.setdefault(worker_id, asyncio.Lock())
+        async with lock:
+            # Uma reconexão: a conexão guardada pode ter caído desde o último envio
+            for _ in range(2):
+                try:
+                    writer = self._writers.get(worker_id)
+                    if writer is None or writer.is_closing():
+                        _, writer = await asyncio.open_unix_connection(
+                            self.socket_path(worker_id)
+                        )
+                        self._writers[worker_id] = writer
+                    writer.write(data)
+                    await writer.drain()
+                    return True
+                except OSError:
+                    stale = self._writers.pop(worker_id, None)
+                    if stale is not None:
+                        stale.close()
+        return False